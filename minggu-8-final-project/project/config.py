@@ -21,6 +21,17 @@ class RecognitionConfig:
     use_teachable_machine: bool = True  # Use Teachable Machine model
     active_model_id: str = None  # Active model ID (auto-detect if None)
     teachable_confidence: float = 0.7  # Confidence threshold for TM model
+    teachable_batch_size: int = 8  # Max faces per TM forward pass
+    teachable_backend: str = "keras"  # "keras" or "tflite" (XNNPACK, converted once per model)
+    teachable_num_threads: int = 0  # TFLite interpreter threads (0 = TFLite default)
+    teachable_variant: str = ""  # Quantized TFLite variant: "", "dynamic", "float16" or "int8"
+    teachable_warmup: bool = True  # Run dummy batches at load so the first face is not slow
+    
+    # Gallery search settings (MediaPipe encoding mode)
+    index_type: str = "brute_force"  # "brute_force" (exact), "ivf" or "prototype" (approximate)
+    index_n_probe: int = 8  # IVF partitions scanned per face (higher = better recall)
+    index_shortlist_k: int = 5  # Persons re-ranked after prototype shortlist
+    mesh_mode: str = "per_roi"  # "per_roi" (Face Mesh per face), "full_frame" or "union_roi" (one pass per frame)
 
 
 @dataclass
@@ -30,6 +41,9 @@ class PerformanceConfig:
     max_detection_size: int = 640  # Max frame size for detection
     cache_encodings: bool = True  # Cache face encodings in memory
     max_cache_size: int = 100  # Maximum cached encodings
+    model_cache_size: int = 3  # Loaded TM models kept in memory for instant switching
+    model_cache_memory_mb: int = 512  # Memory budget of the loaded model cache
+    preload_next_model: bool = True  # Load the next likely model in the background
 
 
 @dataclass
@@ -10,17 +10,33 @@ This package contains all core modules from Week 1-6:
 - recognition_service (Week 5): Recognition pipeline
 - attendance_system (Week 6): Attendance logging
 - teachable_recognizer (Week 8): Teachable Machine integration
+- face_index (Week 8): Exact / approximate gallery search indexes
+- encoding_store (Week 8): Memory-mapped binary encodings store
+- face_tracker (Week 8): Box tracking and per-track identity cache
+- camera_broker (Week 8): Shared camera capture for all windows
+- recognition_pipeline (Week 8): Latest-frame-wins capture/inference pipeline
+- concurrency (Week 8): Per-thread graph pool and lock-free statistics
 """
 
 __version__ = "1.0.0"
 __author__ = "Face Recognition Team"
 
-# Import core modules for easy access (with error handling)
-try:
-    from .teachable_recognizer import TeachableMachineRecognizer
-except ImportError:
-    TeachableMachineRecognizer = None
-
 __all__ = [
     'TeachableMachineRecognizer',
 ]
+
+
+def __getattr__(name):
+    """
+    Import heavy core modules on first access (importing TensorFlow takes seconds)
+    
+    Returns None for TeachableMachineRecognizer if TensorFlow is not installed.
+    """
+    if name == 'TeachableMachineRecognizer':
+        try:
+            from .teachable_recognizer import TeachableMachineRecognizer
+        except ImportError:
+            TeachableMachineRecognizer = None
+        globals()[name] = TeachableMachineRecognizer
+        return TeachableMachineRecognizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -28,13 +28,16 @@ class AttendanceSystem:
     File-based attendance system with CSV logging
     """
     
-    def __init__(self, dataset_path: str = "dataset", log_dir: str = "logs"):
+    def __init__(self, dataset_path: str = "dataset", log_dir: str = "logs",
+                 recognition_service: Optional[RecognitionService] = None):
         """
         Initialize attendance system
         
         Args:
             dataset_path: Path to dataset folder
             log_dir: Directory for attendance logs
+            recognition_service: Shared RecognitionService (None = create one on
+                first use of process_camera_attendance)
         """
         self.dataset_path = Path(dataset_path)
         self.log_dir = Path(log_dir)
@@ -48,8 +51,8 @@ class AttendanceSystem:
         self.photo_dir = self.log_dir / "photos"
         self.photo_dir.mkdir(exist_ok=True)
         
-        # Initialize recognition service
-        self.recognition = RecognitionService(dataset_path=str(dataset_path))
+        # Recognition engine: injected by the caller or created lazily
+        self._recognition = recognition_service
         
         # Today's attendance cache
         self.today_cache = {}
@@ -60,6 +63,17 @@ class AttendanceSystem:
         print(f"   Log directory: {self.log_dir}")
         print(f"   Attendance file: {self.attendance_file.name}")
     
+    @property
+    def recognition(self) -> RecognitionService:
+        """Recognition service (created on first access if none was injected)"""
+        if self._recognition is None:
+            self._recognition = RecognitionService(dataset_path=str(self.dataset_path))
+        return self._recognition
+    
+    @recognition.setter
+    def recognition(self, recognition_service: RecognitionService):
+        self._recognition = recognition_service
+    
     def _init_attendance_file(self):
         """Initialize CSV file with headers"""
         if not self.attendance_file.exists():
@@ -0,0 +1,260 @@
+"""
+Camera Broker Module
+Week 8 Final Project - Shared Camera Access
+
+One broker per camera device owns the cv2.VideoCapture and runs a single
+capture thread. Any number of subscribers (GUI windows) receive the latest
+frame as the same read-only array (no per-subscriber copy or decode).
+
+Subscriptions mimic the parts of cv2.VideoCapture the GUI uses
+(isOpened / read / release), so a window swaps one for the other.
+"""
+
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+
+class FrameSubscription:
+    """
+    A subscriber's view of a camera broker
+    """
+    
+    def __init__(self, broker: "CameraBroker"):
+        self._broker = broker
+        self._last_seq = 0
+        self._active = True
+    
+    def isOpened(self) -> bool:
+        """Check if the subscription still receives frames"""
+        return self._active and self._broker.is_running
+    
+    def read(self, timeout: float = 2.0) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Wait for a frame newer than the last one read
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            Tuple of (success, read-only BGR frame shared with other subscribers)
+        """
+        if not self._active:
+            return False, None
+        
+        seq, frame = self._broker.wait_for_frame(self._last_seq, timeout)
+        if frame is None:
+            return False, None
+        
+        self._last_seq = seq
+        return True, frame
+    
+    def release(self):
+        """Unsubscribe (the device is closed when the last subscriber leaves)"""
+        if self._active:
+            self._active = False
+            self._broker.unsubscribe(self)
+
+
+class CameraBroker:
+    """
+    Owns one camera device and fans its latest frame out to subscribers
+    """
+    
+    def __init__(self, camera_id: int = 0):
+        """
+        Initialize camera broker (the device is opened on first subscribe)
+        
+        Args:
+            camera_id: Camera device ID
+        """
+        self.camera_id = camera_id
+        
+        self._cap = None
+        self._thread = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._device_lock = threading.Lock()  # serializes opening and closing the device
+        self._frame_ready = threading.Condition(self._lock)
+        self._frame = None
+        self._seq = 0
+        self._running = False
+    
+    @property
+    def is_running(self) -> bool:
+        """Check if the capture thread is delivering frames"""
+        return self._running
+    
+    @property
+    def subscriber_count(self) -> int:
+        """Number of active subscribers"""
+        return len(self._subscribers)
+    
+    def _open_capture(self):
+        """Open the camera device (override point for other sources)"""
+        return cv2.VideoCapture(self.camera_id)
+    
+    def subscribe(self) -> FrameSubscription:
+        """
+        Subscribe to frames, opening the camera for the first subscriber
+        
+        Returns:
+            FrameSubscription
+        
+        Raises:
+            RuntimeError: If the camera cannot be opened
+        """
+        with self._device_lock:
+            # A stopped capture thread still owns its device until it exits;
+            # the device is never opened a second time alongside it
+            if not self._join_capture_thread():
+                raise RuntimeError(f"Camera {self.camera_id} is still closing")
+            
+            with self._lock:
+                if not self._running:
+                    cap = self._open_capture()
+                    if cap is None or not cap.isOpened():
+                        raise RuntimeError(f"Cannot open camera {self.camera_id}")
+                    
+                    self._cap = cap
+                    self._frame = None
+                    self._running = True
+                    self._thread = threading.Thread(target=self._capture_loop, args=(cap,), daemon=True)
+                    self._thread.start()
+                    print(f"📷 Camera {self.camera_id} opened (shared)")
+                
+                subscription = FrameSubscription(self)
+                subscription._last_seq = self._seq
+                self._subscribers.add(subscription)
+                return subscription
+    
+    def unsubscribe(self, subscription: FrameSubscription):
+        """
+        Remove a subscriber; the camera is released when none are left
+        
+        Args:
+            subscription: Subscription returned by subscribe()
+        """
+        with self._device_lock:
+            with self._lock:
+                self._subscribers.discard(subscription)
+                if self._subscribers or not self._running:
+                    return
+                
+                # Detach the device: the capture thread stops publishing and
+                # releases it once its current read returns
+                self._running = False
+                self._cap = None
+                self._frame_ready.notify_all()
+            
+            self._join_capture_thread()
+    
+    def _join_capture_thread(self, timeout: float = 2.0) -> bool:
+        """
+        Wait for a stopped capture thread to release its device
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if no stopped capture thread is left running
+        """
+        thread = self._thread
+        if thread is None or self._running or thread is threading.current_thread():
+            return True
+        
+        thread.join(timeout=timeout)
+        if thread.is_alive():
+            return False
+        self._thread = None
+        return True
+    
+    def wait_for_frame(self, last_seq: int, timeout: float = 2.0) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Block until a frame newer than last_seq is available
+        
+        Args:
+            last_seq: Sequence number of the caller's previous frame
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            Tuple of (sequence number, frame or None on timeout / camera stopped)
+        """
+        deadline = time.time() + timeout
+        with self._frame_ready:
+            while self._running and self._seq <= last_seq:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._frame_ready.wait(remaining)
+            
+            if self._seq <= last_seq or self._frame is None:
+                return last_seq, None
+            return self._seq, self._frame
+    
+    def _capture_loop(self, cap):
+        """Single capture thread: read, publish, repeat"""
+        try:
+            while self._running and self._cap is cap:
+                ret, frame = cap.read()
+                if not ret:
+                    print(f"⚠️  Camera {self.camera_id}: read failed, stopping")
+                    break
+                
+                # Shared between subscribers: make it read-only
+                frame.flags.writeable = False
+                with self._frame_ready:
+                    if self._cap is not cap:
+                        break  # camera was closed and reopened meanwhile
+                    self._frame = frame
+                    self._seq += 1
+                    self._frame_ready.notify_all()
+        finally:
+            cap.release()
+            with self._frame_ready:
+                if self._cap is cap:
+                    self._cap = None
+                    self._running = False
+                self._frame_ready.notify_all()
+
+
+# One broker per camera device, shared by all windows
+_brokers: Dict[int, CameraBroker] = {}
+_brokers_lock = threading.Lock()
+
+
+def get_camera_broker(camera_id: int = 0) -> CameraBroker:
+    """
+    Get the shared broker of a camera device
+    
+    Args:
+        camera_id: Camera device ID
+    
+    Returns:
+        CameraBroker (created on first use)
+    """
+    with _brokers_lock:
+        if camera_id not in _brokers:
+            _brokers[camera_id] = CameraBroker(camera_id)
+        return _brokers[camera_id]
+
+
+# Example usage
+if __name__ == "__main__":
+    print("Camera Broker Module - Week 8 Final Project")
+    print("="*60)
+    
+    broker = get_camera_broker(0)
+    try:
+        preview = broker.subscribe()
+        recognition = broker.subscribe()
+        ok_a, frame_a = preview.read()
+        ok_b, frame_b = recognition.read()
+        print(f"✅ {broker.subscriber_count} subscribers, frame {frame_a.shape}, "
+              f"read-only: {not frame_a.flags.writeable}")
+        preview.release()
+        recognition.release()
+    except RuntimeError as e:
+        print(f"⚠️  {e}")
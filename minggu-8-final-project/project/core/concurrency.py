@@ -0,0 +1,157 @@
+"""
+Concurrency Helpers Module
+Week 8 Final Project - Thread-Safe Recognition Engine
+
+Building blocks that let several GUI threads share one RecognitionService:
+- PerThreadPool: one instance of a non-thread-safe resource (MediaPipe graph)
+  per calling thread; instances of exited threads (or released ones) are
+  handed to new threads
+- ThreadLocalCounters: statistics each thread updates in its own shard,
+  summed on read (no lock on the hot path)
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class PerThreadPool:
+    """
+    Pool of per-thread instances created by a factory
+    """
+    
+    def __init__(self, factory: Callable[[], object]):
+        """
+        Initialize pool
+        
+        Args:
+            factory: Callable creating a new instance (called once per thread,
+                unless an instance of an exited thread can be reused)
+        """
+        self._factory = factory
+        self._local = threading.local()
+        self._owners: List[Tuple[threading.Thread, object]] = []
+        self._lock = threading.Lock()  # only taken the first time a thread calls get()
+    
+    def get(self):
+        """
+        Get the calling thread's instance
+        
+        Returns:
+            Instance owned by the current thread
+        """
+        instance = getattr(self._local, 'instance', None)
+        if instance is not None:
+            return instance
+        
+        current = threading.current_thread()
+        with self._lock:
+            # Reuse a released instance or one whose thread has exited (e.g. a stopped pipeline)
+            for i, (owner, candidate) in enumerate(self._owners):
+                if owner is None or not owner.is_alive():
+                    self._owners[i] = (current, candidate)
+                    instance = candidate
+                    break
+            else:
+                instance = self._factory()
+                self._owners.append((current, instance))
+        
+        self._local.instance = instance
+        return instance
+    
+    def release(self):
+        """
+        Hand the calling thread's instance back to the pool
+        
+        The next thread calling get() for the first time takes it over, without
+        waiting for the calling thread to exit. The calling thread gets a fresh
+        (or another free) instance if it calls get() again.
+        """
+        instance = getattr(self._local, 'instance', None)
+        if instance is None:
+            return
+        
+        self._local.instance = None
+        with self._lock:
+            for i, (owner, candidate) in enumerate(self._owners):
+                if candidate is instance:
+                    self._owners[i] = (None, candidate)
+                    break
+    
+    def __len__(self) -> int:
+        """Number of instances created so far"""
+        return len(self._owners)
+
+
+class ThreadLocalCounters:
+    """
+    Numeric counters sharded per thread
+    """
+    
+    def __init__(self, initial: Optional[Dict[str, float]] = None):
+        """
+        Initialize counters
+        
+        Args:
+            initial: Starting values (also defines the keys always reported)
+        """
+        self._initial = dict(initial or {})
+        self._local = threading.local()
+        self._shards: List[Dict[str, float]] = []
+        self._lock = threading.Lock()  # only taken to register a new thread's shard
+    
+    def _shard(self) -> Dict[str, float]:
+        """Counters of the calling thread (written by that thread only)"""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+    
+    def add(self, name: str, value: float = 1):
+        """
+        Add to a counter
+        
+        Args:
+            name: Counter name
+            value: Amount to add
+        """
+        shard = self._shard()
+        shard[name] = shard.get(name, 0) + value
+    
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Sum all threads' counters
+        
+        Returns:
+            Dictionary of counter totals
+        """
+        totals = dict(self._initial)
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for name, value in shard.copy().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+
+# Example usage
+if __name__ == "__main__":
+    print("Concurrency Helpers Module - Week 8 Final Project")
+    print("="*60)
+    
+    pool = PerThreadPool(object)
+    counters = ThreadLocalCounters({'calls': 0})
+    
+    def worker():
+        for _ in range(10000):
+            pool.get()
+            counters.add('calls')
+    
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    print(f"✅ {counters.snapshot()['calls']} calls from 4 threads, {len(pool)} instance(s) created")
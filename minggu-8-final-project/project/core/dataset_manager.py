@@ -3,7 +3,8 @@ Dataset Manager Module (File-Based Version)
 Week 4 Project Module - Progressive Web Application
 
 This module manages face dataset collection and organization using FILES.
-Stores data in local filesystem with JSON metadata and pickle encodings.
+Stores data in local filesystem with JSON metadata and a memory-mapped
+binary encodings store (legacy encodings.pkl is migrated on load).
 Builds on Week 2's face_detector.py and Week 3's face_recognizer.py.
 """
 
@@ -13,10 +14,24 @@ import os
 import sys
 import pickle
 import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
+# MediaPipe detector from core/: unlike the Week 2/3 detectors it downscales
+# frames to max_detection_size before detection
+try:
+    from .face_detector import FaceDetector
+except ImportError:
+    try:
+        # Fallback for direct execution (imported before the Week paths shadow it)
+        from face_detector import FaceDetector
+    except ImportError:
+        print("⚠️  Warning: Could not import face_detector")
+        FaceDetector = None
+
 # Add Week 2 and Week 3 paths
 week2_path = os.path.join(os.path.dirname(__file__), '..', '..', 'minggu-2-face-detection', 'project')
 week3_path = os.path.join(os.path.dirname(__file__), '..', '..', 'minggu-3-face-recognition', 'project')
@@ -24,32 +39,44 @@ sys.path.insert(0, week2_path)
 sys.path.insert(0, week3_path)
 
 try:
-    from face_detector import FaceDetector
     from face_recognizer import FaceRecognizer
 except ImportError:
-    print("⚠️  Warning: Could not import face_detector or face_recognizer")
-    FaceDetector = None
+    print("⚠️  Warning: Could not import face_recognizer")
     FaceRecognizer = None
 
+try:
+    from .face_index import normalize_rows, compute_prototypes
+    from .encoding_store import EncodingStore
+except ImportError:
+    # Fallback for direct execution
+    from face_index import normalize_rows, compute_prototypes
+    from encoding_store import EncodingStore
+
 
 class DatasetManager:
     """
     Manage face datasets for recognition system using local files
     """
     
-    def __init__(self, dataset_path: str = "dataset"):
+    def __init__(self, dataset_path: str = "dataset", max_detection_size: int = 640):
         """
         Initialize dataset manager with local file storage
         
         Args:
             dataset_path: Path to dataset folder (default: "dataset")
+            max_detection_size: Longest side of the downscaled detection input
+                used by capture_faces (PerformanceConfig.max_detection_size)
         """
         self.dataset_path = Path(dataset_path)
+        self.max_detection_size = max_detection_size
         self.dataset_path.mkdir(parents=True, exist_ok=True)
         
         # Metadata file
         self.metadata_file = self.dataset_path / "metadata.json"
-        self.encodings_file = self.dataset_path / "encodings.pkl"
+        self.encodings_file = self.dataset_path / "encodings.pkl"  # legacy format
+        self.encoding_store = EncodingStore(self.dataset_path)
+        self.encoding_errors = {}  # rel image path -> error of the last generate_encodings()
+        self.encoding_stats = {}  # reused / encoded / failed / removed image counts of the last run
         
         # Load existing metadata
         self.metadata = self._load_metadata()
@@ -132,7 +159,7 @@ class DatasetManager:
         if FaceDetector is None:
             raise ImportError("FaceDetector not available. Check Week 2 module.")
         
-        detector = FaceDetector()
+        detector = FaceDetector(max_detection_size=self.max_detection_size)
         
         # Open camera
         cap = cv2.VideoCapture(camera_id)
@@ -193,20 +220,24 @@ class DatasetManager:
         print(f"\n✅ Capture complete: {captured} photos saved")
         return captured
     
-    def generate_encodings(self, model_name: str = 'Facenet512') -> int:
+    def generate_encodings(self, model_name: str = 'Facenet512', with_prototypes: bool = False,
+                           prototypes_per_person: int = 1, incremental: bool = True,
+                           workers: int = 1) -> int:
         """
-        Generate face encodings for all persons and save to pickle
+        Generate face encodings for all persons and save to the binary store
         
         Args:
             model_name: DeepFace model name
+            with_prototypes: Also store per-person prototypes for two-stage matching
+            prototypes_per_person: 1 = centroid, more = k-means medoids per person
+            incremental: Reuse stored encodings of unchanged images (keyed by path,
+                size, mtime and content hash); only new or changed images are encoded
+            workers: Number of worker processes (one FaceMesh each); 1 = in-process
             
         Returns:
             Total number of encodings generated
         """
-        if FaceRecognizer is None:
-            raise ImportError("FaceRecognizer not available. Check Week 3 module.")
-        
-        recognizer = FaceRecognizer(model=model_name)
+        cache = self._load_encoding_cache(model_name) if incremental else {}
         
         encodings_data = {
             "model": model_name,
@@ -215,86 +246,259 @@ class DatasetManager:
             "names": [],
             "metadata": []
         }
-        
-        total_count = 0
+        image_cache = {}
+        self.encoding_errors = {}
+        reused_count = 0
+        encoded_count = 0
         
         print(f"\n🔧 Generating encodings with {model_name}...")
+        if cache:
+            print(f"   Incremental mode: {len(cache)} images cached")
         
+        # Pass 1: scan images, resolve unchanged ones from the cache
+        persons = []
+        results = {}
+        pending = []
         for person_id, person_info in self.metadata["persons"].items():
             person_folder = self.dataset_path / person_id
             
             if not person_folder.exists():
                 continue
             
-            image_files = list(person_folder.glob("*.jpg")) + list(person_folder.glob("*.png"))
+            image_files = sorted(list(person_folder.glob("*.jpg")) + list(person_folder.glob("*.png")))
             
             if not image_files:
                 print(f"   ⚠️  {person_info['name']}: No images found")
                 continue
             
-            print(f"\n   👤 {person_info['name']} ({len(image_files)} images)")
-            
-            person_encodings = 0
+            rel_paths = []
             for img_file in image_files:
+                rel_path = img_file.relative_to(self.dataset_path).as_posix()
                 try:
-                    # Load image
-                    image = cv2.imread(str(img_file))
-                    if image is None:
-                        continue
-                    
-                    # Generate encoding
-                    encoding = recognizer.encode_face(image)
-                    
-                    if encoding is not None:
-                        encodings_data["encodings"].append(encoding)
-                        encodings_data["names"].append(person_info["name"])
-                        encodings_data["metadata"].append({
-                            "person_id": person_id,
-                            "employee_id": person_info.get("employee_id"),
-                            "department": person_info.get("department"),
-                            "image_file": img_file.name
-                        })
-                        person_encodings += 1
-                        total_count += 1
-                        print(f"      ✅ {img_file.name}")
-                    
-                except Exception as e:
-                    print(f"      ⚠️  {img_file.name}: {e}")
+                    cached = cache.get(rel_path)
+                    entry = self._image_signature(img_file, cached)
+                except OSError as e:
+                    self.encoding_errors[rel_path] = str(e)
+                    continue
+                
+                rel_paths.append(rel_path)
+                image_cache[rel_path] = entry
+                if cached is not None and cached["sha1"] == entry["sha1"]:
+                    # Unchanged image: reuse stored encoding (None = no face found)
+                    results[rel_path] = cached["encoding"]
+                    reused_count += 1
+                else:
+                    pending.append(rel_path)
+            
+            persons.append((person_id, person_info, rel_paths))
+        
+        # Pass 2: encode new or changed images
+        if pending:
+            print(f"\n   Encoding {len(pending)} images "
+                  f"({workers} worker{'s' if workers > 1 else ''})...")
+            for rel_path, encoding, error in self._encode_images(pending, workers):
+                if error is not None:
+                    self.encoding_errors[rel_path] = error
+                else:
+                    results[rel_path] = encoding
+                    encoded_count += 1
+        
+        # Pass 3: merge in person / file order (independent of worker scheduling)
+        total_count = 0
+        for person_id, person_info, rel_paths in persons:
+            person_encodings = 0
+            for rel_path in rel_paths:
+                if rel_path not in results:
+                    # Failed images are not cached so the next run retries them
+                    image_cache.pop(rel_path, None)
+                    continue
+                
+                encoding = results[rel_path]
+                image_cache[rel_path]["row"] = -1
+                if encoding is None:
+                    continue
+                
+                image_cache[rel_path]["row"] = len(encodings_data["encodings"])
+                encodings_data["encodings"].append(encoding)
+                encodings_data["names"].append(person_info["name"])
+                encodings_data["metadata"].append({
+                    "person_id": person_id,
+                    "employee_id": person_info.get("employee_id"),
+                    "department": person_info.get("department"),
+                    "image_file": Path(rel_path).name
+                })
+                person_encodings += 1
             
             # Update metadata
             self.metadata["persons"][person_id]["encoding_count"] = person_encodings
-            print(f"   ✅ Generated {person_encodings} encodings")
-        
-        # Save encodings to pickle
-        with open(self.encodings_file, 'wb') as f:
-            pickle.dump(encodings_data, f)
+            total_count += person_encodings
+            print(f"   👤 {person_info['name']}: {person_encodings}/{len(rel_paths)} images encoded")
+        
+        # Per-person prototypes (shortlist stage of PrototypeIndex)
+        if with_prototypes and encodings_data["encodings"]:
+            prototypes, prototype_names = compute_prototypes(
+                normalize_rows(encodings_data["encodings"]),
+                encodings_data["names"],
+                per_person=prototypes_per_person
+            )
+            encodings_data["prototypes"] = prototypes
+            encodings_data["prototype_names"] = prototype_names.tolist()
+            print(f"\n✅ Computed {len(prototypes)} prototypes "
+                  f"({prototypes_per_person} per person)")
+        
+        # Save encodings to the memory-mapped binary store
+        self.encoding_store.save(
+            encodings_data["encodings"],
+            encodings_data["names"],
+            encodings_data["metadata"],
+            model=encodings_data["model"],
+            generated_at=encodings_data["generated_at"],
+            prototypes=encodings_data.get("prototypes"),
+            prototype_names=encodings_data.get("prototype_names"),
+            extra={"image_cache": image_cache}
+        )
         
         self._save_metadata()
         
+        # Cached images whose file is gone (failed images are not counted as removed)
+        removed_count = len(set(cache) - set(image_cache) - set(self.encoding_errors))
+        self.encoding_stats = {
+            "reused": reused_count,
+            "encoded": encoded_count,
+            "failed": len(self.encoding_errors),
+            "removed": removed_count
+        }
+        
         print(f"\n✅ Total encodings generated: {total_count}")
-        print(f"   Saved to: {self.encodings_file}")
+        if incremental:
+            print(f"   Reused: {reused_count} | Encoded: {encoded_count} | "
+                  f"Removed: {removed_count}")
+        if self.encoding_errors:
+            print(f"   ⚠️  {len(self.encoding_errors)} images failed (see encoding_errors)")
+        print(f"   Saved to: {self.encoding_store.matrix_file}")
         
         return total_count
     
-    def load_encodings(self) -> Tuple[List, List, List]:
+    def _encode_images(self, rel_paths: List[str], workers: int = 1):
+        """
+        Encode images in-process or across a process pool
+        
+        Args:
+            rel_paths: Image paths relative to the dataset folder
+            workers: Number of worker processes (1 = in-process)
+            
+        Yields:
+            (rel_path, encoding or None, error message or None), in input order
+        """
+        if FaceRecognizer is None:
+            raise ImportError("FaceRecognizer not available. Check Week 3 module.")
+        
+        paths = [str(self.dataset_path / rel_path) for rel_path in rel_paths]
+        total = len(paths)
+        
+        if workers <= 1 or total == 1:
+            recognizer = FaceRecognizer()
+            outputs = (_encode_image_file(path, recognizer) for path in paths)
+            for done, (rel_path, output) in enumerate(zip(rel_paths, outputs), 1):
+                _print_encoding_progress(done, total, rel_path, *output)
+                yield (rel_path, *output)
+            return
+        
+        chunksize = max(1, total // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_encoding_worker) as pool:
+            outputs = pool.map(_encode_image_file, paths, chunksize=chunksize)
+            for done, (rel_path, output) in enumerate(zip(rel_paths, outputs), 1):
+                _print_encoding_progress(done, total, rel_path, *output)
+                yield (rel_path, *output)
+    
+    def _load_encoding_cache(self, model_name: str) -> Dict[str, Dict]:
+        """
+        Load per-image cache entries from the encodings store
+        
+        Args:
+            model_name: Model the cached encodings must have been generated with
+            
+        Returns:
+            Dict of relative image path -> {size, mtime, sha1, encoding (None = no face)}
+        """
+        data = self.encoding_store.load(mmap=False)
+        if data is None or "image_cache" not in data["meta"]:
+            return {}
+        
+        if data["model"] != model_name:
+            print(f"   ⚠️  Stored encodings use {data['model']}, regenerating all")
+            return {}
+        
+        # Copy rows out: the store files are replaced when saving
+        matrix = np.array(data["matrix"])
+        cache = {}
+        for rel_path, entry in data["meta"]["image_cache"].items():
+            row = entry.get("row", -1)
+            if row >= len(matrix):
+                continue
+            cache[rel_path] = {
+                "size": entry["size"],
+                "mtime": entry["mtime"],
+                "sha1": entry["sha1"],
+                "encoding": matrix[row] if row >= 0 else None
+            }
+        return cache
+    
+    @staticmethod
+    def _image_signature(img_file: Path, cached: Optional[Dict] = None) -> Dict:
+        """
+        Cache key of an image file
+        
+        Args:
+            img_file: Image path
+            cached: Previous cache entry; its hash is reused when size and mtime match
+            
+        Returns:
+            Dict with size, mtime (ns) and sha1 of file content
+        """
+        stat = img_file.stat()
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        
+        if cached is not None and cached["size"] == entry["size"] and cached["mtime"] == entry["mtime"]:
+            entry["sha1"] = cached["sha1"]
+        else:
+            entry["sha1"] = hashlib.sha1(img_file.read_bytes()).hexdigest()
+        return entry
+    
+    def migrate_encodings(self) -> int:
         """
-        Load encodings from pickle file
+        One-shot migration of legacy encodings.pkl to the binary store
         
         Returns:
-            Tuple of (encodings, names, metadata)
+            Number of encodings migrated (0 if there is no pickle)
         """
         if not self.encodings_file.exists():
+            print("⚠️  No encodings.pkl to migrate")
+            return 0
+        
+        return self.encoding_store.migrate_from_pickle(self.encodings_file)
+    
+    def load_encodings(self) -> Tuple[List, List, List]:
+        """
+        Load encodings from the binary store (memory-mapped)
+        
+        Returns:
+            Tuple of (encodings, names, metadata); encodings rows are L2-normalized
+        """
+        if self.encodings_file.exists() and self.encodings_file.stat().st_mtime > self.encoding_store.mtime():
+            self.migrate_encodings()
+        
+        data = self.encoding_store.load()
+        
+        if data is None:
             print("⚠️  No encodings file found. Run generate_encodings() first.")
             return [], [], []
         
-        with open(self.encodings_file, 'rb') as f:
-            data = pickle.load(f)
-        
-        print(f"✅ Loaded {len(data['encodings'])} encodings")
+        print(f"✅ Loaded {data['matrix'].shape[0]} encodings")
         print(f"   Model: {data['model']}")
         print(f"   Generated: {data['generated_at']}")
         
-        return data["encodings"], data["names"], data["metadata"]
+        return data["matrix"], data["names"], data["metadata"]
     
     def get_person_list(self) -> List[Dict]:
         """Get list of all persons in dataset"""
@@ -317,7 +521,7 @@ class DatasetManager:
             "total_images": total_images,
             "total_encodings": total_encodings,
             "dataset_path": str(self.dataset_path.absolute()),
-            "has_encodings": self.encodings_file.exists()
+            "has_encodings": self.encoding_store.exists() or self.encodings_file.exists()
         }
     
     def export_metadata(self, output_file: str = None) -> str:
@@ -341,6 +545,52 @@ class DatasetManager:
         return str(output_file)
 
 
+# Per-process recognizer for encoding workers (one FaceMesh per worker)
+_worker_recognizer = None
+
+
+def _init_encoding_worker():
+    """Process pool initializer: create this worker's FaceRecognizer"""
+    global _worker_recognizer
+    cv2.setNumThreads(1)  # workers already use every core
+    _worker_recognizer = FaceRecognizer()
+
+
+def _encode_image_file(path: str, recognizer=None) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """
+    Decode and encode one image file
+    
+    Args:
+        path: Image file path
+        recognizer: FaceRecognizer to use (default: this worker's recognizer)
+        
+    Returns:
+        Tuple of (encoding or None if no face, error message or None)
+    """
+    try:
+        image = cv2.imread(path)
+        if image is None:
+            return None, "cannot read image"
+        
+        encoding = (recognizer or _worker_recognizer).encode_face(image)
+        if encoding is not None:
+            encoding = np.asarray(encoding, dtype=np.float32)
+        return encoding, None
+    except Exception as e:
+        return None, str(e)
+
+
+def _print_encoding_progress(done: int, total: int, rel_path: str,
+                             encoding: Optional[np.ndarray], error: Optional[str]):
+    """Print one progress line for an encoded image"""
+    if error is not None:
+        print(f"      [{done}/{total}] ⚠️  {rel_path}: {error}")
+    elif encoding is None:
+        print(f"      [{done}/{total}] ⚠️  {rel_path}: no face found")
+    else:
+        print(f"      [{done}/{total}] ✅ {rel_path}")
+
+
 # Example usage
 if __name__ == "__main__":
     print("Dataset Manager Module - Week 4 Project (File-Based)")
@@ -354,7 +604,10 @@ if __name__ == "__main__":
     print("   manager.add_person('Alice', 'EMP001', 'IT')")
     print("   manager.capture_faces('alice', target_count=20)")
     print("   manager.generate_encodings()")
+    print("   manager.generate_encodings(incremental=False)  # full rebuild")
+    print("   manager.generate_encodings(workers=os.cpu_count())")
     print("   encodings, names, metadata = manager.load_encodings()")
+    print("   manager.migrate_encodings()  # encodings.pkl → binary store")
     print("   manager.get_person_list()")
     print("   manager.get_statistics()")
     print("   manager.export_metadata()")
@@ -0,0 +1,335 @@
+"""
+Encoding Store Module
+Week 8 Final Project - Binary Gallery Storage
+
+This module stores face encodings in a binary, memory-mappable format
+(replaces the pickle of Python lists in encodings.pkl):
+- encodings.<N>.npy: float32 matrix (num_encodings, dim), rows L2-normalized
+- person_codes.<N>.npy: int32 person code per row
+- encodings_meta.json: persons table, image file per row, model info, and the
+  names of the current data files (version N)
+
+encodings.<N>.npy is opened with np.load(mmap_mode='r'), so several recognition
+processes share the same OS pages and startup does not copy the gallery.
+A save never overwrites a data file that may be mapped (Windows refuses to
+replace a mapped file): it writes version N+1 and then switches the sidecar.
+Old versions are deleted once no process maps them any more.
+"""
+
+import os
+import re
+import json
+import pickle
+import numpy as np
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from .face_index import normalize_rows
+except ImportError:
+    # Fallback for direct execution
+    from face_index import normalize_rows
+
+
+# Per-row metadata keys kept in the persons table (image_file is stored per row)
+PERSON_KEYS = ("person_id", "employee_id", "department")
+
+# Data files of one store version: role -> file name prefix
+DATA_FILES = {"matrix": "encodings", "codes": "person_codes", "prototypes": "prototypes"}
+
+
+class _RowNames(Sequence):
+    """Read-only per-row names, resolved from person codes on access"""
+    
+    def __init__(self, person_codes: np.ndarray, persons: List[Dict]):
+        self._codes = person_codes
+        self._persons = persons
+    
+    def __len__(self) -> int:
+        return len(self._codes)
+    
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return self._persons[int(self._codes[idx])]["name"]
+
+
+class _RowMetadata(_RowNames):
+    """Read-only per-row metadata dicts, built on access"""
+    
+    def __init__(self, person_codes: np.ndarray, persons: List[Dict], image_files: List[str]):
+        super().__init__(person_codes, persons)
+        self._image_files = image_files
+    
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        person = self._persons[int(self._codes[idx])]
+        row = {key: person.get(key) for key in PERSON_KEYS}
+        row["image_file"] = self._image_files[idx] if idx < len(self._image_files) else None
+        return row
+
+
+class EncodingStore:
+    """
+    Memory-mapped binary storage for a face encodings gallery
+    """
+    
+    def __init__(self, dataset_path: str = "dataset"):
+        """
+        Initialize encoding store
+        
+        Args:
+            dataset_path: Path to dataset folder (default: "dataset")
+        """
+        self.dataset_path = Path(dataset_path)
+        self.meta_file = self.dataset_path / "encodings_meta.json"
+    
+    def _read_meta(self) -> Optional[Dict]:
+        """Sidecar contents (None if missing or unreadable)"""
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _data_path(self, meta: Optional[Dict], role: str) -> Path:
+        """Data file of a role ('matrix', 'codes', 'prototypes') for a sidecar"""
+        files = (meta or {}).get("files")
+        if files and files.get(role):
+            return self.dataset_path / files[role]
+        # Stores written before versioned data files
+        return self.dataset_path / f"{DATA_FILES[role]}.npy"
+    
+    @property
+    def matrix_file(self) -> Path:
+        """Current encodings matrix file"""
+        return self._data_path(self._read_meta(), "matrix")
+    
+    def exists(self) -> bool:
+        """Check if a complete store is present"""
+        meta = self._read_meta()
+        return meta is not None and self._data_path(meta, "matrix").exists() \
+            and self._data_path(meta, "codes").exists()
+    
+    def mtime(self) -> float:
+        """Modification time of the store (0 if missing)"""
+        return self.meta_file.stat().st_mtime if self.exists() else 0.0
+    
+    def save(self, encodings, names: List[str], metadata: List[Dict] = None,
+             model: str = None, generated_at: str = None,
+             prototypes=None, prototype_names: List[str] = None,
+             extra: Dict = None) -> int:
+        """
+        Save a gallery to the binary store
+        
+        Args:
+            encodings: List or matrix of face encodings
+            names: Person name per encoding
+            metadata: Metadata dict per encoding (person_id, employee_id, department, image_file)
+            model: Model name used to generate encodings
+            generated_at: ISO timestamp (default: now)
+            prototypes: Optional per-person prototypes matrix
+            prototype_names: Person name per prototype
+            extra: Additional JSON-serializable info for the sidecar
+        
+        Returns:
+            Number of encodings saved
+        """
+        self.dataset_path.mkdir(parents=True, exist_ok=True)
+        metadata = metadata or [{} for _ in names]
+        
+        # Persons table: one entry per person_id (per name for rows without an id),
+        # so two registered people sharing a name keep their own metadata
+        persons = []
+        person_index = {}
+        person_codes = np.empty(len(names), dtype=np.int32)
+        for i, (name, meta) in enumerate(zip(names, metadata)):
+            person_id = meta.get("person_id")
+            key = ("id", person_id) if person_id is not None else ("name", name)
+            if key not in person_index:
+                person_index[key] = len(persons)
+                persons.append({"name": name, **{k: meta.get(k) for k in PERSON_KEYS}})
+            person_codes[i] = person_index[key]
+        
+        # Recognition / prototype labels are names, mapped separately from persons
+        labels = list(dict.fromkeys(names))
+        label_index = {name: i for i, name in enumerate(labels)}
+        
+        if len(names) > 0:
+            matrix = normalize_rows(encodings)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        
+        # New data files go next to the current ones; mapped files are never replaced
+        version = self._next_version()
+        files = {role: f"{prefix}.{version}.npy" for role, prefix in DATA_FILES.items()}
+        
+        meta = {
+            "version": 2,
+            "data_version": version,
+            "model": model,
+            "generated_at": generated_at or datetime.now().isoformat(),
+            "num_encodings": int(matrix.shape[0]),
+            "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "persons": persons,
+            "labels": labels,
+            "image_files": [m.get("image_file") for m in metadata],
+            **(extra or {})
+        }
+        
+        if prototypes is not None and prototype_names is not None:
+            meta["prototype_codes"] = [label_index.get(n, -1) for n in prototype_names]
+            np.save(self.dataset_path / files["prototypes"], normalize_rows(prototypes))
+        else:
+            del files["prototypes"]
+        
+        np.save(self.dataset_path / files["matrix"], matrix)
+        np.save(self.dataset_path / files["codes"], person_codes)
+        meta["files"] = files
+        
+        # Sidecar is written last: switching it publishes the new version and its
+        # mtime marks the store as complete (the sidecar itself is never mapped)
+        tmp_file = self.meta_file.with_suffix(".json.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_file, self.meta_file)
+        
+        self.remove_stale_files()
+        return int(matrix.shape[0])
+    
+    def _next_version(self) -> int:
+        """Version number for new data files (never reuses an existing file name)"""
+        version = ((self._read_meta() or {}).get("data_version") or 0) + 1
+        while any((self.dataset_path / f"{prefix}.{version}.npy").exists() for prefix in DATA_FILES.values()):
+            version += 1
+        return version
+    
+    def remove_stale_files(self) -> int:
+        """
+        Delete data files of previous versions
+        
+        Files still memory-mapped by a running process cannot be deleted on
+        Windows; they are skipped and removed by a later save.
+        
+        Returns:
+            Number of files deleted
+        """
+        meta = self._read_meta()
+        if meta is None:
+            return 0
+        
+        current = {self._data_path(meta, role).name for role in DATA_FILES}
+        pattern = re.compile(r"^(%s)(\.\d+|\.tmp)?\.npy$" % "|".join(DATA_FILES.values()))
+        removed = 0
+        for path in self.dataset_path.iterdir():
+            if not pattern.match(path.name) or path.name in current:
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass  # still mapped by a reader
+        return removed
+    
+    def load(self, mmap: bool = True) -> Optional[Dict]:
+        """
+        Load the gallery
+        
+        Args:
+            mmap: Memory-map encodings.npy read-only instead of reading it into memory
+        
+        Returns:
+            Dict with matrix, person_codes, label_codes (name code per row), names,
+            metadata (lazy per-row sequences), persons, labels, model, generated_at and
+            optional prototypes/prototype_codes (label codes)/prototype_names;
+            None if the store does not exist
+        """
+        meta = self._read_meta()
+        if meta is None or not self._data_path(meta, "matrix").exists():
+            return None
+        
+        mmap_mode = 'r' if mmap else None
+        matrix = np.load(self._data_path(meta, "matrix"), mmap_mode=mmap_mode)
+        person_codes = np.load(self._data_path(meta, "codes"))
+        persons = meta.get("persons", [])
+        
+        # Stores written before the labels table keyed persons by name
+        labels = meta.get("labels") or [p["name"] for p in persons]
+        label_index = {}
+        for i, name in enumerate(labels):
+            label_index.setdefault(name, i)
+        person_labels = np.array([label_index[p["name"]] for p in persons], dtype=np.int32)
+        
+        data = {
+            "matrix": matrix,
+            "person_codes": person_codes,
+            "label_codes": person_labels[person_codes] if len(persons) else person_codes.copy(),
+            "persons": persons,
+            "labels": labels,
+            "names": _RowNames(person_codes, persons),
+            "metadata": _RowMetadata(person_codes, persons, meta.get("image_files", [])),
+            "model": meta.get("model"),
+            "generated_at": meta.get("generated_at"),
+            "meta": meta
+        }
+        
+        prototypes_file = self._data_path(meta, "prototypes")
+        if "prototype_codes" in meta and prototypes_file.exists():
+            codes = meta["prototype_codes"]
+            data["prototypes"] = np.load(prototypes_file, mmap_mode=mmap_mode)
+            data["prototype_codes"] = np.asarray(codes, dtype=np.int32)
+            data["prototype_names"] = [labels[c] if c >= 0 else None for c in codes]
+        
+        return data
+    
+    def migrate_from_pickle(self, pickle_file) -> int:
+        """
+        One-shot migration from an encodings.pkl file
+        
+        Args:
+            pickle_file: Path to encodings.pkl
+        
+        Returns:
+            Number of encodings migrated
+        """
+        with open(pickle_file, 'rb') as f:
+            data = pickle.load(f)
+        
+        count = self.save(
+            data["encodings"],
+            data["names"],
+            data.get("metadata"),
+            model=data.get("model"),
+            generated_at=data.get("generated_at"),
+            prototypes=data.get("prototypes"),
+            prototype_names=data.get("prototype_names")
+        )
+        
+        print(f"✅ Migrated {count} encodings: {pickle_file} → {self.matrix_file.name}")
+        return count
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+    
+    print("Encoding Store Module - Week 8 Final Project")
+    print("="*60)
+    
+    dataset_path = Path(sys.argv[1] if len(sys.argv) > 1 else "dataset")
+    store = EncodingStore(dataset_path)
+    pickle_file = dataset_path / "encodings.pkl"
+    
+    if pickle_file.exists() and pickle_file.stat().st_mtime > store.mtime():
+        store.migrate_from_pickle(pickle_file)
+    
+    data = store.load()
+    if data is None:
+        print(f"⚠️  No encodings found in {dataset_path}")
+    else:
+        print(f"✅ {data['matrix'].shape[0]} encodings, {len(data['persons'])} persons")
+        print(f"   Model: {data['model']}")
+        print(f"   Generated: {data['generated_at']}")
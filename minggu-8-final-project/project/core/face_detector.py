@@ -10,14 +10,19 @@ Builds on Week 1's image_utils.py for preprocessing.
 import cv2
 import numpy as np
 import os
+import importlib.util
 from typing import List, Tuple, Optional, Dict
 
+# Checked without importing: MediaPipe itself is loaded by FaceDetector()
+MEDIAPIPE_AVAILABLE = importlib.util.find_spec("mediapipe") is not None
+if not MEDIAPIPE_AVAILABLE:
+    print("⚠️  MediaPipe not available. Install: pip install mediapipe")
+
 try:
-    import mediapipe as mp
-    MEDIAPIPE_AVAILABLE = True
+    from .image_utils import prepare_detection_input
 except ImportError:
-    MEDIAPIPE_AVAILABLE = False
-    print("⚠️  MediaPipe not available. Install: pip install mediapipe")
+    # Fallback for direct execution
+    from image_utils import prepare_detection_input
 
 
 class FaceDetector:
@@ -26,13 +31,16 @@ class FaceDetector:
     Provides fast and accurate face detection suitable for real-time applications
     """
     
-    def __init__(self, model_selection: int = 1, min_detection_confidence: float = 0.7):
+    def __init__(self, model_selection: int = 1, min_detection_confidence: float = 0.7,
+                 max_detection_size: int = 640):
         """
         Initialize face detector with MediaPipe
         
         Args:
             model_selection: 0 for short-range (within 2m), 1 for full-range (within 5m)
             min_detection_confidence: Minimum confidence threshold (0.0-1.0)
+            max_detection_size: Longest side of the downscaled detection input
+                (None or 0 = detect at full resolution)
         """
         if not MEDIAPIPE_AVAILABLE:
             raise ImportError(
@@ -40,6 +48,8 @@ class FaceDetector:
                 "Install with: pip install mediapipe==0.10.8"
             )
         
+        import mediapipe as mp
+        
         self.mp_face_detection = mp.solutions.face_detection
         self.mp_drawing = mp.solutions.drawing_utils
         
@@ -50,6 +60,7 @@ class FaceDetector:
         
         self.model_selection = model_selection
         self.min_detection_confidence = min_detection_confidence
+        self.max_detection_size = max_detection_size
     
     def detect_faces(self, image: np.ndarray, 
                     return_confidence: bool = False) -> List[Tuple[int, int, int, int]]:
@@ -64,10 +75,9 @@ class FaceDetector:
             List of face bounding boxes as (x, y, w, h)
             If return_confidence=True, returns list of ((x, y, w, h), confidence)
         """
-        # Convert BGR to RGB for MediaPipe
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        # Detect faces
+        # Detect faces on a downscaled RGB copy; boxes are relative so they
+        # map straight back to full-resolution coordinates below
+        rgb_image, _ = prepare_detection_input(image, self.max_detection_size)
         results = self.face_detection.process(rgb_image)
         
         if not results.detections:
@@ -116,7 +126,7 @@ class FaceDetector:
             - confidence: Detection confidence score (0.0-1.0)
             - keypoints: Face keypoints (6 points: eyes, nose, mouth)
         """
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        rgb_image, _ = prepare_detection_input(image, self.max_detection_size)
         results = self.face_detection.process(rgb_image)
         
         if not results.detections:
@@ -0,0 +1,578 @@
+"""
+Face Index Module
+Week 8 Final Project - Gallery Search
+
+This module provides nearest-neighbour indexes over face encodings (NumPy only).
+- BruteForceIndex: exact search, one matrix product against the whole gallery
+- IVFIndex: approximate search, k-means partitions + probing the closest lists
+- PrototypeIndex: two-stage search, shortlist persons by prototype, re-rank raw encodings
+
+Indexes store structure only (centroids, inverted lists). The encodings matrix
+itself comes from the encodings store and is attached when building/loading the index.
+All distances are cosine distances (1 - cosine similarity), same as recognition.
+"""
+
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """
+    Convert vectors to a contiguous float32 matrix with L2-normalized rows
+    
+    Args:
+        vectors: 1-D vector, 2-D matrix, or list of 1-D vectors
+    
+    Returns:
+        Matrix of shape (num_vectors, dim)
+    """
+    if isinstance(vectors, np.ndarray):
+        matrix = np.array(np.atleast_2d(vectors), dtype=np.float32, order='C')
+    else:
+        matrix = np.array(np.vstack(vectors), dtype=np.float32, order='C')
+    matrix /= (np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-6)
+    return matrix
+
+
+def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k smallest distances (sorted, last axis)"""
+    k = min(k, distances.shape[-1])
+    if k == distances.shape[-1]:
+        return np.argsort(distances, axis=-1)
+    
+    part = np.argpartition(distances, k - 1, axis=-1)[..., :k]
+    order = np.argsort(np.take_along_axis(distances, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class BruteForceIndex:
+    """
+    Exact nearest-neighbour search over a normalized encodings matrix
+    """
+    
+    index_type = 'brute_force'
+    
+    def __init__(self):
+        """Initialize empty index"""
+        self.matrix = None
+    
+    def __len__(self) -> int:
+        return 0 if self.matrix is None else self.matrix.shape[0]
+    
+    def build(self, matrix: np.ndarray) -> 'BruteForceIndex':
+        """
+        Build index over a gallery matrix
+        
+        Args:
+            matrix: L2-normalized float32 matrix (num_encodings, dim)
+        
+        Returns:
+            self
+        """
+        self.matrix = matrix
+        return self
+    
+    def attach(self, matrix: np.ndarray, state: Dict[str, np.ndarray]) -> 'BruteForceIndex':
+        """
+        Attach gallery matrix to a previously built structure (from save_index)
+        
+        Args:
+            matrix: L2-normalized float32 matrix (num_encodings, dim)
+            state: Arrays returned by get_state()
+        
+        Returns:
+            self
+        """
+        self.matrix = matrix
+        return self
+    
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """Arrays needed to restore the index structure (empty = nothing to persist)"""
+        return {}
+    
+    def get_build_params(self) -> Dict:
+        """Parameters that change the built structure"""
+        return {}
+    
+    def search(self, queries, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest gallery rows for each query
+        
+        Args:
+            queries: Query encodings (num_queries, dim) or a single encoding
+            k: Number of neighbours per query
+        
+        Returns:
+            Tuple of (indices, distances), both shaped (num_queries, k).
+            Missing neighbours have index -1 and distance inf.
+        """
+        queries = normalize_rows(queries)
+        num_queries = queries.shape[0]
+        
+        if len(self) == 0:
+            return (np.full((num_queries, k), -1, dtype=np.int64),
+                    np.full((num_queries, k), np.inf, dtype=np.float32))
+        
+        distances = 1.0 - queries @ self.matrix.T
+        top = _top_k(distances, k)
+        
+        indices = np.full((num_queries, k), -1, dtype=np.int64)
+        top_distances = np.full((num_queries, k), np.inf, dtype=np.float32)
+        indices[:, :top.shape[1]] = top
+        top_distances[:, :top.shape[1]] = np.take_along_axis(distances, top, axis=1)
+        return indices, top_distances
+
+
+class IVFIndex(BruteForceIndex):
+    """
+    Approximate search with an inverted file (IVF) over k-means partitions
+    
+    The gallery is split into n_lists clusters. A query only scans the
+    n_probe closest clusters: higher n_probe = better recall, slower search.
+    """
+    
+    index_type = 'ivf'
+    
+    def __init__(self, n_lists: int = None, n_probe: int = 8, n_iter: int = 10,
+                 max_train_size: int = 100000, seed: int = 0):
+        """
+        Initialize IVF index
+        
+        Args:
+            n_lists: Number of k-means partitions (default: sqrt(num_encodings))
+            n_probe: Partitions scanned per query (recall/latency knob)
+            n_iter: k-means iterations
+            max_train_size: Max encodings sampled to train k-means
+            seed: Random seed for reproducible partitions
+        """
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.max_train_size = max_train_size
+        self.seed = seed
+        
+        self.centroids = None
+        self.list_ids = None
+        self.list_offsets = None
+    
+    def build(self, matrix: np.ndarray) -> 'IVFIndex':
+        """
+        Train k-means partitions and fill the inverted lists
+        
+        Args:
+            matrix: L2-normalized float32 matrix (num_encodings, dim)
+        
+        Returns:
+            self
+        """
+        self.matrix = matrix
+        num_rows = matrix.shape[0]
+        
+        if num_rows == 0:
+            self.centroids = np.zeros((0, 0), dtype=np.float32)
+            self.list_ids = np.zeros(0, dtype=np.int64)
+            self.list_offsets = np.zeros(1, dtype=np.int64)
+            return self
+        
+        n_lists = self.n_lists or int(np.sqrt(num_rows))
+        n_lists = max(1, min(n_lists, num_rows))
+        
+        rng = np.random.default_rng(self.seed)
+        if num_rows > self.max_train_size:
+            train = matrix[rng.choice(num_rows, self.max_train_size, replace=False)]
+        else:
+            train = matrix
+        
+        self.centroids = self._train_kmeans(train, n_lists, rng)
+        assignments = self._assign(matrix)
+        
+        # Inverted lists: row ids grouped by partition, with CSR-style offsets
+        self.list_ids = np.argsort(assignments, kind='stable').astype(np.int64)
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return self
+    
+    def _train_kmeans(self, train: np.ndarray, n_lists: int, rng) -> np.ndarray:
+        """Spherical k-means on normalized vectors"""
+        centroids = train[rng.choice(train.shape[0], n_lists, replace=False)].copy()
+        
+        for _ in range(self.n_iter):
+            assignments = self._assign(train, centroids)
+            
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, train)
+            counts = np.bincount(assignments, minlength=n_lists)
+            
+            # Re-seed empty partitions with random training vectors
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = train[rng.choice(train.shape[0], int(empty.sum()))]
+            
+            centroids = normalize_rows(sums)
+        
+        return centroids
+    
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray = None,
+                chunk_size: int = 16384) -> np.ndarray:
+        """Closest centroid per vector, computed in chunks to bound memory"""
+        if centroids is None:
+            centroids = self.centroids
+        
+        assignments = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk_size):
+            scores = vectors[start:start + chunk_size] @ centroids.T
+            assignments[start:start + chunk_size] = np.argmax(scores, axis=1)
+        return assignments
+    
+    def attach(self, matrix: np.ndarray, state: Dict[str, np.ndarray]) -> 'IVFIndex':
+        """Attach gallery matrix to saved centroids and inverted lists"""
+        self.matrix = matrix
+        self.centroids = state['centroids']
+        self.list_ids = state['list_ids']
+        self.list_offsets = state['list_offsets']
+        return self
+    
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {
+            'centroids': self.centroids,
+            'list_ids': self.list_ids,
+            'list_offsets': self.list_offsets
+        }
+    
+    def get_build_params(self) -> Dict:
+        return {'n_lists': self.n_lists, 'seed': self.seed}
+    
+    def search(self, queries, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate k-nearest search scanning the n_probe closest partitions
+        
+        Args:
+            queries: Query encodings (num_queries, dim) or a single encoding
+            k: Number of neighbours per query
+        
+        Returns:
+            Tuple of (indices, distances), both shaped (num_queries, k).
+            Missing neighbours have index -1 and distance inf.
+        """
+        queries = normalize_rows(queries)
+        num_queries = queries.shape[0]
+        
+        indices = np.full((num_queries, k), -1, dtype=np.int64)
+        distances = np.full((num_queries, k), np.inf, dtype=np.float32)
+        
+        if len(self) == 0 or self.centroids.shape[0] == 0:
+            return indices, distances
+        
+        n_probe = max(1, min(self.n_probe, self.centroids.shape[0]))
+        probe_lists = _top_k(1.0 - queries @ self.centroids.T, n_probe)
+        
+        for qi, lists in enumerate(probe_lists):
+            candidates = np.concatenate([
+                self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists
+            ])
+            if candidates.size == 0:
+                continue
+            
+            candidate_distances = 1.0 - self.matrix[candidates] @ queries[qi]
+            top = _top_k(candidate_distances, k)
+            indices[qi, :top.size] = candidates[top]
+            distances[qi, :top.size] = candidate_distances[top]
+        
+        return indices, distances
+
+
+def compute_prototypes(matrix: np.ndarray, labels, per_person: int = 1,
+                       n_iter: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute per-person prototypes from normalized encodings
+    
+    With per_person=1 the prototype is the person's centroid. With more, each
+    person's encodings are clustered with k-means and the medoid (the real
+    encoding closest to each cluster centre) is used.
+    
+    Args:
+        matrix: L2-normalized float32 matrix (num_encodings, dim)
+        labels: Person label per row (int codes or names)
+        per_person: Prototypes per person
+        n_iter: k-means iterations (per_person > 1)
+        seed: Random seed
+    
+    Returns:
+        Tuple of (prototypes, prototype_labels)
+    """
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(seed)
+    prototypes = []
+    prototype_labels = []
+    
+    for label in np.unique(labels):
+        rows = matrix[labels == label]
+        
+        if per_person <= 1 or rows.shape[0] <= per_person:
+            centres = normalize_rows(rows.mean(axis=0)) if per_person <= 1 else rows
+        else:
+            centres = IVFIndex(n_lists=per_person, n_iter=n_iter)._train_kmeans(rows, per_person, rng)
+            # Medoids: snap each centre to its closest real encoding
+            centres = rows[np.unique(np.argmax(centres @ rows.T, axis=1))]
+        
+        prototypes.append(centres)
+        prototype_labels.extend([label] * centres.shape[0])
+    
+    return normalize_rows(prototypes), np.asarray(prototype_labels)
+
+
+class PrototypeIndex(BruteForceIndex):
+    """
+    Two-stage search over per-person prototypes
+    
+    Stage 1 scores the few prototypes of every person and keeps the
+    shortlist_k closest persons. Stage 2 re-ranks only those persons'
+    raw encodings, so returned distances are the same as exact search.
+    """
+    
+    index_type = 'prototype'
+    
+    def __init__(self, labels=None, prototypes=None, prototype_labels=None,
+                 shortlist_k: int = 5, per_person: int = 1):
+        """
+        Initialize prototype index
+        
+        Args:
+            labels: Person label per gallery row (required)
+            prototypes: Precomputed prototypes (computed from the gallery if None)
+            prototype_labels: Person label per prototype
+            shortlist_k: Persons kept after stage 1 (recall/latency knob)
+            per_person: Prototypes per person when computing them here
+        """
+        super().__init__()
+        self.labels = None if labels is None else np.asarray(labels)
+        self.prototypes = None if prototypes is None else normalize_rows(prototypes)
+        self.prototype_labels = None if prototype_labels is None else np.asarray(prototype_labels)
+        self.shortlist_k = shortlist_k
+        self.per_person = per_person
+        
+        self.prototype_codes = None
+        self.person_ids = None
+        self.person_offsets = None
+    
+    def build(self, matrix: np.ndarray) -> 'PrototypeIndex':
+        """
+        Group gallery rows by person and prepare prototypes
+        
+        Args:
+            matrix: L2-normalized float32 matrix (num_encodings, dim)
+        
+        Returns:
+            self
+        """
+        if self.labels is None or len(self.labels) != matrix.shape[0]:
+            raise ValueError("PrototypeIndex needs one label per gallery row")
+        
+        self.matrix = matrix
+        if self.prototypes is None or self.prototype_labels is None:
+            self.prototypes, self.prototype_labels = compute_prototypes(
+                matrix, self.labels, self.per_person
+            )
+        
+        # Map labels (names or ids) to dense codes 0..num_persons-1
+        # (prototypes of persons no longer in the gallery are dropped)
+        persons, codes = np.unique(self.labels, return_inverse=True)
+        known = np.isin(self.prototype_labels, persons)
+        self.prototypes = self.prototypes[known]
+        self.prototype_codes = np.searchsorted(persons, self.prototype_labels[known])
+        
+        # Rows grouped by person, with CSR-style offsets
+        self.person_ids = np.argsort(codes, kind='stable').astype(np.int64)
+        counts = np.bincount(codes, minlength=len(persons))
+        self.person_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return self
+    
+    def search(self, queries, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Shortlist persons by prototype, then re-rank their raw encodings
+        
+        Args:
+            queries: Query encodings (num_queries, dim) or a single encoding
+            k: Number of neighbours per query
+        
+        Returns:
+            Tuple of (indices, distances), both shaped (num_queries, k).
+            Missing neighbours have index -1 and distance inf.
+        """
+        queries = normalize_rows(queries)
+        num_queries = queries.shape[0]
+        
+        indices = np.full((num_queries, k), -1, dtype=np.int64)
+        distances = np.full((num_queries, k), np.inf, dtype=np.float32)
+        
+        if len(self) == 0 or self.prototypes.shape[0] == 0:
+            return indices, distances
+        
+        # Stage 1: closest persons by their best prototype
+        prototype_distances = 1.0 - queries @ self.prototypes.T
+        
+        for qi in range(num_queries):
+            ranked_codes = self.prototype_codes[np.argsort(prototype_distances[qi])]
+            _, first_seen = np.unique(ranked_codes, return_index=True)
+            shortlist = ranked_codes[np.sort(first_seen)][:self.shortlist_k]
+            
+            # Stage 2: exact distances against the shortlisted persons' encodings
+            candidates = np.concatenate([
+                self.person_ids[self.person_offsets[c]:self.person_offsets[c + 1]] for c in shortlist
+            ])
+            candidate_distances = 1.0 - self.matrix[candidates] @ queries[qi]
+            top = _top_k(candidate_distances, k)
+            indices[qi, :top.size] = candidates[top]
+            distances[qi, :top.size] = candidate_distances[top]
+        
+        return indices, distances
+
+
+INDEX_TYPES = {
+    BruteForceIndex.index_type: BruteForceIndex,
+    IVFIndex.index_type: IVFIndex,
+    PrototypeIndex.index_type: PrototypeIndex,
+}
+
+
+def create_index(index_type: str = 'brute_force', **params) -> BruteForceIndex:
+    """
+    Create an (unbuilt) index by type name
+    
+    Args:
+        index_type: 'brute_force' (exact), 'ivf' or 'prototype' (approximate)
+        **params: Backend parameters (e.g. n_lists, n_probe for 'ivf')
+    
+    Returns:
+        Index instance
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}. Use one of {list(INDEX_TYPES)}")
+    return INDEX_TYPES[index_type](**params)
+
+
+def save_index(index: BruteForceIndex, index_path, source_file=None):
+    """
+    Save index structure to .npz (the encodings matrix is not duplicated)
+    
+    Args:
+        index: Built index
+        index_path: Output path (e.g. dataset/encodings_index.npz)
+        source_file: Encodings file the index was built from (for staleness check)
+    """
+    header = {
+        'index_type': index.index_type,
+        'num_rows': len(index),
+        'build_params': index.get_build_params(),
+        'source_mtime': Path(source_file).stat().st_mtime if source_file else None
+    }
+    
+    index_path = Path(index_path)
+    with open(index_path, 'wb') as f:
+        np.savez(f, header=np.array(json.dumps(header)), **index.get_state())
+
+
+def load_index(index_path, matrix: np.ndarray, source_file=None,
+               index_type: str = 'brute_force', **params) -> Optional[BruteForceIndex]:
+    """
+    Load a saved index and attach the gallery matrix
+    
+    Args:
+        index_path: Saved index path
+        matrix: L2-normalized gallery matrix the index was built from
+        source_file: Encodings file, used to detect a stale index
+        index_type: Expected index type
+        **params: Backend parameters (search-time ones like n_probe are applied)
+    
+    Returns:
+        Index, or None if missing or stale
+    """
+    index_path = Path(index_path)
+    if not index_path.exists():
+        return None
+    
+    try:
+        with np.load(index_path, allow_pickle=False) as data:
+            header = json.loads(str(data['header']))
+            state = {key: data[key] for key in data.files if key != 'header'}
+    except Exception as e:
+        print(f"⚠️  Could not read index file: {e}")
+        return None
+    
+    index = create_index(index_type, **params)
+    
+    if header.get('index_type') != index_type or header.get('num_rows') != matrix.shape[0]:
+        return None
+    if source_file and Path(source_file).exists() and header.get('source_mtime') != Path(source_file).stat().st_mtime:
+        return None
+    
+    requested = {key: value for key, value in index.get_build_params().items() if value is not None}
+    saved = header.get('build_params', {})
+    if any(saved.get(key) != value for key, value in requested.items()):
+        return None
+    
+    return index.attach(matrix, state)
+
+
+def load_or_build_index(matrix: np.ndarray, index_path=None, source_file=None,
+                        index_type: str = 'brute_force', **params) -> BruteForceIndex:
+    """
+    Load a persisted index if it is up to date, otherwise build (and save) it
+    
+    Args:
+        matrix: L2-normalized gallery matrix
+        index_path: Where the index is persisted (None = don't persist)
+        source_file: Encodings file the matrix was loaded from
+        index_type: 'brute_force', 'ivf' or 'prototype'
+        **params: Backend parameters
+    
+    Returns:
+        Ready-to-search index
+    """
+    if index_path is not None:
+        index = load_index(index_path, matrix, source_file, index_type, **params)
+        if index is not None:
+            return index
+    
+    index = create_index(index_type, **params).build(matrix)
+    
+    if index_path is not None and index.get_state():
+        try:
+            save_index(index, index_path, source_file)
+            print(f"✅ Saved {index_type} index: {index_path}")
+        except Exception as e:
+            print(f"⚠️  Could not save index: {e}")
+    
+    return index
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+    import time
+    from encoding_store import EncodingStore
+    
+    print("Face Index Module - Week 8 Final Project")
+    print("="*60)
+    
+    store = EncodingStore(sys.argv[1] if len(sys.argv) > 1 else "dataset")
+    data = store.load()
+    if data is None:
+        print(f"❌ Encodings not found: {store.matrix_file}")
+        sys.exit(1)
+    
+    gallery = data["matrix"]
+    index_path = store.dataset_path / "encodings_index.npz"
+    
+    start = time.time()
+    ivf = load_or_build_index(gallery, index_path, store.meta_file, 'ivf')
+    print(f"✅ IVF index ready: {len(ivf)} encodings, "
+          f"{ivf.centroids.shape[0]} lists ({time.time() - start:.2f}s)")
+    
+    exact = BruteForceIndex().build(gallery)
+    exact_ids, _ = exact.search(gallery[:100])
+    approx_ids, _ = ivf.search(gallery[:100])
+    print(f"   Recall@1 (n_probe={ivf.n_probe}): {np.mean(exact_ids[:, 0] == approx_ids[:, 0]):.2%}")
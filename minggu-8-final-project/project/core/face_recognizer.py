@@ -14,7 +14,45 @@ import os
 from typing import List, Tuple, Optional, Dict
 from pathlib import Path
 import cv2
-import mediapipe as mp
+
+try:
+    from .face_index import normalize_rows, create_index, INDEX_TYPES
+except ImportError:
+    # Fallback for direct execution
+    from face_index import normalize_rows, create_index, INDEX_TYPES
+
+
+def landmarks_to_encoding(face_landmarks, out: np.ndarray = None) -> np.ndarray:
+    """
+    Convert Face Mesh landmarks to a float32 encoding (x, y, z per landmark)
+    
+    Args:
+        face_landmarks: NormalizedLandmarkList (legacy solution), list of landmarks
+            (Tasks API) or (num_landmarks, 3) array
+        out: Optional preallocated float32 buffer with num_landmarks * 3 values
+        
+    Returns:
+        Flat float32 encoding (out when given)
+    """
+    landmarks = getattr(face_landmarks, 'landmark', face_landmarks)
+    
+    if isinstance(landmarks, np.ndarray):
+        values = landmarks.reshape(-1)
+        if out is None:
+            return values.astype(np.float32)
+        np.copyto(out.reshape(-1), values, casting='same_kind')
+        return out
+    
+    if out is None:
+        out = np.empty(len(landmarks) * 3, dtype=np.float32)
+    
+    # One strided write per coordinate instead of a Python list grown per landmark
+    xyz = out.reshape(-1, 3)
+    xyz[:, 0] = [landmark.x for landmark in landmarks]
+    xyz[:, 1] = [landmark.y for landmark in landmarks]
+    xyz[:, 2] = [landmark.z for landmark in landmarks]
+    return out
+
 
 class FaceRecognizer:
     """
@@ -22,19 +60,36 @@ class FaceRecognizer:
     Provides 1404-dimensional face encodings (468 landmarks × 3 coords)
     """
     
-    def __init__(self, tolerance: float = 0.6):
+    def __init__(self, tolerance: float = 0.6, index_type: str = 'brute_force',
+                 index_params: Dict = None):
         """
         Initialize face recognizer with MediaPipe
         
         Args:
             tolerance: Distance threshold for face matching (default 0.6)
+            index_type: Search backend, 'brute_force' (exact), 'ivf' or 'prototype'
+                (approximate; prototypes are computed per known name)
+            index_params: Backend parameters, e.g. {'n_probe': 8} for 'ivf',
+                {'shortlist_k': 5, 'per_person': 3} for 'prototype'
+        
+        Raises:
+            ValueError: If index_type is not one of the above
         """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}. Use one of {list(INDEX_TYPES)}")
+        
         self.tolerance = tolerance
         self.known_face_encodings = []
         self.known_face_names = []
         self.known_face_metadata = []
         
-        # Initialize MediaPipe Face Mesh
+        # Search index over known encodings, rebuilt lazily after changes
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self._index = None
+        
+        # Initialize MediaPipe Face Mesh (imported on first use, slow import)
+        import mediapipe as mp
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=True,
@@ -56,7 +111,7 @@ class FaceRecognizer:
             face_location: Optional face location (x, y, w, h) - if None, uses full image
             
         Returns:
-            1404-dimension face encoding, or None if no face found
+            1404-dimension float32 face encoding, or None if no face found
         """
         try:
             # If face_location provided, crop the face region
@@ -79,11 +134,7 @@ class FaceRecognizer:
             face_landmarks = results.multi_face_landmarks[0]
             
             # Extract landmarks as encoding (468 landmarks × 3 coords = 1404-dim)
-            encoding = []
-            for landmark in face_landmarks.landmark:
-                encoding.extend([landmark.x, landmark.y, landmark.z])
-            
-            return np.array(encoding)
+            return landmarks_to_encoding(face_landmarks)
             
         except Exception as e:
             print(f"⚠️  Encoding failed: {e}")
@@ -101,6 +152,21 @@ class FaceRecognizer:
         self.known_face_encodings.append(encoding)
         self.known_face_names.append(name)
         self.known_face_metadata.append(metadata or {})
+        self._index = None
+    
+    def build_index(self):
+        """
+        Build the search index over known encodings
+        
+        Called automatically by recognize_face after the known faces change.
+        """
+        matrix = normalize_rows(self.known_face_encodings)
+        index_params = dict(self.index_params)
+        if self.index_type == 'prototype':
+            # Shortlist by person: one label per known encoding
+            index_params['labels'] = self.known_face_names
+        self._index = create_index(self.index_type, **index_params).build(matrix)
+        return self._index
     
     def recognize_face(self, face_encoding: np.ndarray) -> Tuple[Optional[str], float, Optional[Dict]]:
         """
@@ -115,21 +181,13 @@ class FaceRecognizer:
         if len(self.known_face_encodings) == 0:
             return None, 0.0, None
         
-        # Normalize for cosine similarity
-        face_norm = face_encoding / (np.linalg.norm(face_encoding) + 1e-6)
+        if self._index is None:
+            self.build_index()
         
-        # Calculate cosine distances
-        best_distance = float('inf')
-        best_match_index = -1
-        
-        for idx, known_encoding in enumerate(self.known_face_encodings):
-            known_norm = known_encoding / (np.linalg.norm(known_encoding) + 1e-6)
-            similarity = np.dot(face_norm, known_norm)
-            distance = 1.0 - similarity
-            
-            if distance < best_distance:
-                best_distance = distance
-                best_match_index = idx
+        # Cosine distance search over the index
+        best_matches, best_distances = self._index.search(face_encoding, k=1)
+        best_match_index = int(best_matches[0, 0])
+        best_distance = float(best_distances[0, 0])
         
         # Check if match is good enough
         if best_match_index >= 0 and best_distance <= self.tolerance:
@@ -267,6 +325,7 @@ class FaceRecognizer:
         self.known_face_metadata = database['metadata']
         self.tolerance = database.get('tolerance', 0.6)
         self.model = database.get('model', 'Facenet512')
+        self._index = None
         
         print(f"✅ Database loaded: {len(self.known_face_names)} faces from {filepath}")
     
@@ -303,6 +362,7 @@ class FaceRecognizer:
             del self.known_face_names[idx]
             del self.known_face_metadata[idx]
         
+        self._index = None
         return True
     
     def get_statistics(self) -> Dict:
@@ -0,0 +1,345 @@
+"""
+Face Tracker Module
+Week 8 Final Project - Frame Skipping
+
+Keeps face boxes alive between detection frames so detection and recognition
+only run every N frames (PerformanceConfig.frame_skip):
+- Detection frames: detected boxes are associated to existing tracks by IoU
+- Frames in between: each track is moved by template matching inside a small
+  search window, downscaled so the face is about 64 px wide (sub-millisecond
+  per face, independent of camera resolution)
+
+Each track also caches its identity: recognition results are accumulated as
+decayed confidence votes, and a confirmed track is only recognized again
+periodically or when its face crop changes noticeably.
+"""
+
+import time
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+def box_iou(boxes_a, boxes_b) -> np.ndarray:
+    """
+    IoU matrix between two sets of (x, y, w, h) boxes
+    
+    Args:
+        boxes_a: (M, 4) boxes
+        boxes_b: (N, 4) boxes
+    
+    Returns:
+        (M, N) IoU matrix
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    
+    inter_w = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    inter_h = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    inter = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return inter / (union + 1e-6)
+
+
+class TrackIdentity:
+    """
+    Identity of a track accumulated over several recognitions
+    
+    Every recognition adds its confidence as a vote for its name; older votes
+    decay, so a changed identity takes over after a few recognitions.
+    """
+    
+    def __init__(self, decay: float = 0.6):
+        self.decay = decay
+        self.votes: Dict[str, float] = {}
+        self.weight = 0.0  # decayed number of recognitions
+        self.hits = 0
+        self.latest: Dict[str, Dict] = {}  # last result per name (metadata, distance)
+        self.verified_at = 0.0
+        self.template = None  # face appearance at the last recognition
+    
+    @property
+    def name(self) -> Optional[str]:
+        """Leading name (None before the first recognition)"""
+        return max(self.votes, key=self.votes.get) if self.votes else None
+    
+    @property
+    def confidence(self) -> float:
+        """Decayed average confidence of the leading name"""
+        return self.votes[self.name] / self.weight if self.votes else 0.0
+    
+    def add(self, result: Dict):
+        """Accumulate one recognition result"""
+        name = result.get('name', 'Unknown')
+        for key in self.votes:
+            self.votes[key] *= self.decay
+        self.votes[name] = self.votes.get(name, 0.0) + float(result.get('confidence', 0.0))
+        self.weight = self.weight * self.decay + 1.0
+        self.latest[name] = result
+        self.hits += 1
+    
+    def summary(self) -> Dict:
+        """Result dict of the leading name with accumulated confidence"""
+        name = self.name
+        return dict(self.latest[name], name=name, confidence=self.confidence)
+
+
+class FaceTrack:
+    """
+    A tracked face: current box, last recognition result, appearance template
+    and cached identity
+    """
+    
+    def __init__(self, track_id: int, bbox: Tuple[int, int, int, int], result: Dict,
+                 identity_decay: float = 0.6):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.result = result
+        self.template = None  # grayscale face patch at tracking scale
+        self.scale = 1.0  # tracking scale (template px / frame px)
+        self.frames_since_detection = 0
+        self.missed = 0  # consecutive detection frames without a matching detection
+        self.identity = TrackIdentity(identity_decay)
+
+
+class FaceTracker:
+    """
+    IoU association on detection frames, template tracking in between
+    """
+    
+    def __init__(self, iou_threshold: float = 0.3, min_match_score: float = 0.5,
+                 search_margin: float = 0.5, template_size: int = 64, max_missed: int = 2,
+                 reverify_interval: float = 3.0, min_similarity: float = 0.7,
+                 confirm_confidence: float = 0.5, confirm_hits: int = 2,
+                 identity_decay: float = 0.6):
+        """
+        Initialize face tracker
+        
+        Args:
+            iou_threshold: Minimum IoU to continue a track with a new detection
+            min_match_score: Minimum normalized correlation to keep a track between detections
+            search_margin: Search window growth around the last box (fraction of box size)
+            template_size: Width of the downscaled face template in pixels
+            max_missed: Detection frames a lost track (and its identity) is kept for
+            reverify_interval: Seconds after which a confirmed identity is recognized again
+            min_similarity: Face crop correlation below which a confirmed identity is re-verified
+            confirm_confidence: Accumulated confidence needed to confirm an identity
+            confirm_hits: Recognitions needed to confirm an identity
+            identity_decay: Weight kept by older recognition votes per new recognition
+        """
+        self.iou_threshold = iou_threshold
+        self.min_match_score = min_match_score
+        self.search_margin = search_margin
+        self.template_size = template_size
+        self.max_missed = max_missed
+        self.reverify_interval = reverify_interval
+        self.min_similarity = min_similarity
+        self.confirm_confidence = confirm_confidence
+        self.confirm_hits = confirm_hits
+        self.identity_decay = identity_decay
+        
+        self.tracks: List[FaceTrack] = []
+        self.lost_tracks: List[FaceTrack] = []  # recently missed, may be matched again
+        self.frame_index = 0  # frames seen, used by callers to schedule detection
+        self._next_id = 1
+    
+    def reset(self):
+        """Drop all tracks"""
+        self.tracks = []
+        self.lost_tracks = []
+        self.frame_index = 0
+    
+    @staticmethod
+    def _gray_patch(image: np.ndarray, x1: int, y1: int, x2: int, y2: int, scale: float) -> np.ndarray:
+        """Crop a frame region, downscale it and convert it to grayscale"""
+        patch = image[y1:y2, x1:x2]
+        if scale < 1.0:
+            patch = cv2.resize(patch, (max(1, int(round(patch.shape[1] * scale))),
+                                       max(1, int(round(patch.shape[0] * scale)))),
+                               interpolation=cv2.INTER_LINEAR)  # same sampling for template and window
+        return cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY) if patch.ndim == 3 else patch
+    
+    def _set_template(self, track: FaceTrack, image: np.ndarray):
+        """Store the downscaled appearance of a track's box"""
+        h, w = image.shape[:2]
+        x, y, bw, bh = track.bbox
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(w, x + bw), min(h, y + bh)
+        
+        track.template = None
+        if x2 - x1 < 8 or y2 - y1 < 8:
+            return
+        
+        track.scale = min(1.0, self.template_size / (x2 - x1))
+        template = self._gray_patch(image, x1, y1, x2, y2, track.scale)
+        if template.shape[0] >= 8 and template.shape[1] >= 8:
+            track.template = template
+    
+    def update(self, image: np.ndarray, detections: List[Tuple[Tuple[int, int, int, int], Optional[Dict]]]) -> List[FaceTrack]:
+        """
+        Update tracks with the detections of a detection frame
+        
+        Detections are authoritative: matched tracks take the new box (and result,
+        if given), unmatched detections start new tracks and unmatched tracks are
+        kept aside for max_missed detection frames before they expire.
+        
+        Args:
+            image: Full-resolution frame (BGR format)
+            detections: List of (bbox, result or None) for every detected face
+        
+        Returns:
+            Current tracks, in detection order
+        """
+        self.frame_index += 1
+        candidates = self.tracks + self.lost_tracks
+        
+        # Greedy one-to-one association, best overlap first
+        assigned = {}
+        if candidates and detections:
+            iou = box_iou([t.bbox for t in candidates], [bbox for bbox, _ in detections])
+            while iou.max() >= self.iou_threshold:
+                track_idx, det_idx = np.unravel_index(int(np.argmax(iou)), iou.shape)
+                assigned[det_idx] = candidates[track_idx]
+                iou[track_idx, :] = -1.0
+                iou[:, det_idx] = -1.0
+        
+        tracks = []
+        for det_idx, (bbox, result) in enumerate(detections):
+            track = assigned.get(det_idx)
+            if track is None:
+                track = FaceTrack(self._next_id, bbox, result, self.identity_decay)
+                self._next_id += 1
+            
+            track.bbox = tuple(int(v) for v in bbox)
+            if result is not None:
+                track.result = result
+            self._set_template(track, image)
+            track.frames_since_detection = 0
+            track.missed = 0
+            tracks.append(track)
+        
+        # Unmatched tracks expire after max_missed detection frames
+        matched = {id(track) for track in tracks}
+        self.lost_tracks = []
+        for track in candidates:
+            if id(track) not in matched:
+                track.missed += 1
+                if track.missed <= self.max_missed:
+                    self.lost_tracks.append(track)
+        
+        self.tracks = tracks
+        return self.tracks
+    
+    def needs_recognition(self, track: FaceTrack, now: float = None) -> bool:
+        """
+        Check whether a track's cached identity must be (re-)verified
+        
+        Args:
+            track: Track updated on this detection frame
+            now: Current time (default: time.time())
+        
+        Returns:
+            True if the face should be recognized on this frame
+        """
+        identity = track.identity
+        now = time.time() if now is None else now
+        
+        confirmed = identity.hits >= self.confirm_hits and (
+            identity.name == 'Unknown' or identity.confidence >= self.confirm_confidence
+        )
+        if not confirmed or now - identity.verified_at >= self.reverify_interval:
+            return True
+        
+        return self.appearance_similarity(identity.template, track.template) < self.min_similarity
+    
+    def record_recognition(self, track: FaceTrack, result: Dict, now: float = None):
+        """
+        Accumulate a recognition result into a track's identity
+        
+        Args:
+            track: Recognized track
+            result: Recognition result dict (name, confidence, ...)
+            now: Current time (default: time.time())
+        """
+        track.identity.add(result)
+        track.identity.verified_at = time.time() if now is None else now
+        track.identity.template = track.template
+        track.result = track.identity.summary()
+    
+    @staticmethod
+    def appearance_similarity(template_a: Optional[np.ndarray], template_b: Optional[np.ndarray]) -> float:
+        """
+        Normalized correlation between two face templates (0 if either is missing)
+        """
+        if template_a is None or template_b is None:
+            return 0.0
+        if template_a.shape != template_b.shape:
+            template_a = cv2.resize(template_a, (template_b.shape[1], template_b.shape[0]),
+                                    interpolation=cv2.INTER_LINEAR)
+        return float(cv2.matchTemplate(template_a, template_b, cv2.TM_CCOEFF_NORMED)[0, 0])
+    
+    def propagate(self, image: np.ndarray) -> List[FaceTrack]:
+        """
+        Move tracks to a frame without detection using template matching
+        
+        Args:
+            image: Full-resolution frame (BGR format)
+        
+        Returns:
+            Tracks still found in this frame
+        """
+        self.frame_index += 1
+        if not self.tracks:
+            return self.tracks
+        
+        frame_h, frame_w = image.shape[:2]
+        
+        tracks = []
+        for track in self.tracks:
+            track.frames_since_detection += 1
+            
+            if track.template is None:
+                tracks.append(track)  # too small to track: keep last box
+                continue
+            
+            # Search window around the last box (full-resolution coordinates)
+            x, y, bw, bh = track.bbox
+            margin_x, margin_y = int(bw * self.search_margin), int(bh * self.search_margin)
+            x1, y1 = max(0, x - margin_x), max(0, y - margin_y)
+            x2, y2 = min(frame_w, x + bw + margin_x), min(frame_h, y + bh + margin_y)
+            
+            window = self._gray_patch(image, x1, y1, x2, y2, track.scale)
+            t_h, t_w = track.template.shape
+            if window.shape[0] < t_h or window.shape[1] < t_w:
+                self.lost_tracks.append(track)  # face left the frame
+                continue
+            
+            scores = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+            _, best_score, _, best_loc = cv2.minMaxLoc(scores)
+            if best_score < self.min_match_score:
+                # Lost: kept with its identity votes so the next detection frame re-associates it
+                self.lost_tracks.append(track)
+                continue
+            
+            new_x = x1 + int(round(best_loc[0] / track.scale))
+            new_y = y1 + int(round(best_loc[1] / track.scale))
+            track.bbox = (new_x, new_y, bw, bh)
+            tracks.append(track)
+        
+        self.tracks = tracks
+        return self.tracks
+
+
+# Example usage
+if __name__ == "__main__":
+    print("Face Tracker Module - Week 8 Final Project")
+    print("="*60)
+    
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 255, size=(720, 1280, 3), dtype=np.uint8), (0, 0), 8)
+    tracker = FaceTracker()
+    tracker.update(frame, [((400, 200, 160, 200), {'name': 'Demo'})])
+    
+    moved = np.roll(frame, (12, 30), axis=(0, 1))
+    track, = tracker.propagate(moved)
+    print(f"✅ Track {track.track_id}: (400, 200) → {track.bbox[:2]} (expected ≈ (430, 212))")
@@ -108,6 +108,32 @@ def preprocess_image(image: np.ndarray, target_size: Tuple[int, int] = (224, 224
     return processed
 
 
+def prepare_detection_input(image: np.ndarray, max_size: int = 640) -> Tuple[np.ndarray, float]:
+    """
+    Downscale a BGR frame for face detection and convert it to RGB
+    
+    Detectors that return relative coordinates (MediaPipe) can be mapped back
+    by multiplying with the original frame size; otherwise divide by scale.
+    
+    Args:
+        image: Input image (BGR format)
+        max_size: Maximum length of the longest side (None or 0 = no downscaling)
+        
+    Returns:
+        Tuple of (RGB image, scale factor applied, <= 1.0)
+    """
+    h, w = image.shape[:2]
+    scale = 1.0
+    
+    if max_size and max(h, w) > max_size:
+        scale = max_size / max(h, w)
+        image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    
+    # Colour conversion after resizing: fewer pixels to convert
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB), scale
+
+
 def convert_to_grayscale(image: np.ndarray) -> np.ndarray:
     """
     Convert BGR image to grayscale
@@ -7,27 +7,53 @@ This module handles:
 - Switching between models
 - Training new models
 - Model versioning with timestamps
+- TFLite conversion of models (cached in each model folder)
+- Quantized model variants with an accuracy/latency comparison report
+- LRU cache of loaded recognizers (instant switching, background preloading)
+- Cached model registry (class lists and file hashes in the metadata)
 """
 
 import os
+import copy
 import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 import shutil
 
 
+def _file_sha256(path: Path) -> str:
+    """SHA-256 of a file, read in 1 MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class ModelManager:
     """
     Manage Teachable Machine models
     """
     
-    def __init__(self, models_dir: str = "models"):
+    def __init__(self, models_dir: str = "models", cache_size: int = 3, cache_memory_mb: float = 512,
+                 registry_check_interval: Optional[float] = 2.0):
         """
         Initialize model manager
         
         Args:
             models_dir: Directory containing models
+            cache_size: Maximum loaded recognizers kept in memory
+            cache_memory_mb: Memory budget of the recognizer cache (estimated from
+                model file sizes)
+            registry_check_interval: Seconds between checks of the model files' mtimes
+                and sizes (models copied in or retrained in place); lookups in between
+                are served from memory. None = only after import/delete or
+                invalidate_registry()
         """
         self.models_dir = Path(models_dir)
         self.models_dir.mkdir(exist_ok=True)
@@ -41,6 +67,23 @@ class ModelManager:
         # Current active model
         self.active_model = None
         
+        # Model registry (model_id -> metadata entry), rebuilt when model files change
+        self._registry = None
+        self._registry_fingerprint = None
+        self._registry_checked = 0.0
+        self._sorted_models = []
+        self._registry_lock = threading.Lock()
+        self.registry_check_interval = registry_check_interval
+        
+        # Loaded recognizers, least recently used first: (model_id, backend, variant) -> recognizer
+        self._recognizers = OrderedDict()
+        self._recognizer_sizes = {}
+        self._loading = {}  # key -> Event, set when a load (e.g. a preload) finishes
+        self._cache_lock = threading.Lock()
+        self.cache_size = max(1, int(cache_size))
+        self.cache_memory_budget = int(cache_memory_mb * 1024 * 1024)
+        self.cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    
     def _load_metadata(self) -> Dict:
         """Load models metadata"""
         if self.metadata_file.exists():
@@ -63,57 +106,139 @@ class ModelManager:
         except Exception as e:
             print(f"Warning: Could not save metadata: {e}")
     
+    def _file_fingerprint(self) -> Dict[str, List[int]]:
+        """
+        Stat the model files of every model folder
+        
+        Returns:
+            Dictionary of model_id -> [model mtime_ns, model size, labels mtime_ns, labels size]
+        """
+        fingerprint = {}
+        for item in self.models_dir.iterdir():
+            if not item.is_dir():
+                continue
+            try:
+                model_stat = (item / "keras_model.h5").stat()
+                labels_stat = (item / "labels.txt").stat()
+            except OSError:
+                continue  # incomplete model folder
+            fingerprint[item.name] = [model_stat.st_mtime_ns, model_stat.st_size,
+                                      labels_stat.st_mtime_ns, labels_stat.st_size]
+        return fingerprint
+    
+    def _refresh_registry(self, force: bool = False) -> Dict[str, Dict]:
+        """
+        Rebuild the model registry if model files changed since the last check
+        
+        Files are stat'ed at most every registry_check_interval seconds, and right
+        after invalidate_registry() (called by import_model and delete_model).
+        Labels are re-read and files re-hashed only for models whose mtime or size
+        changed; cached recognizers of those models are dropped.
+        
+        Args:
+            force: Check the files now
+            
+        Returns:
+            Dictionary of model_id -> model info
+        """
+        registry = self._registry
+        interval = self.registry_check_interval
+        if not force and registry is not None \
+                and (interval is None or time.monotonic() - self._registry_checked < interval):
+            return registry
+        
+        with self._registry_lock:
+            return self._rebuild_registry()
+    
+    def _rebuild_registry(self) -> Dict[str, Dict]:
+        """Re-check the model files and update the registry (registry lock held)"""
+        self._registry_checked = time.monotonic()
+        fingerprint = self._file_fingerprint()
+        if self._registry is not None and fingerprint == self._registry_fingerprint:
+            return self._registry
+        
+        known = {m["id"]: m for m in self.metadata["models"]}
+        changed = False
+        stale = set(self._registry_fingerprint or {}) - set(fingerprint)  # removed from disk
+        registry = {}
+        for model_id, file_stats in fingerprint.items():
+            model_dir = self.models_dir / model_id
+            meta = known.get(model_id)
+            if not meta:
+                # Create metadata for existing model
+                meta = {
+                    "id": model_id,
+                    "name": model_id,
+                    "created_at": datetime.fromtimestamp(file_stats[0] / 1e9).isoformat(),
+                    "model_path": str(model_dir / "keras_model.h5"),
+                    "labels_path": str(model_dir / "labels.txt")
+                }
+                self.metadata["models"].append(meta)
+                changed = True
+            
+            if meta.get("file_stats") != file_stats or "classes" not in meta:
+                # New or retrained model: read classes and hash files once
+                if "file_stats" in meta:
+                    stale.add(model_id)
+                try:
+                    meta["classes"] = self._load_class_names(model_id)
+                except Exception:
+                    meta["classes"] = []
+                meta["num_classes"] = len(meta["classes"])
+                meta["model_sha256"] = _file_sha256(model_dir / "keras_model.h5")
+                meta["labels_sha256"] = _file_sha256(model_dir / "labels.txt")
+                meta["file_stats"] = file_stats
+                changed = True
+            
+            registry[model_id] = meta
+        
+        if changed:
+            self._save_metadata()
+        
+        # Loaded recognizers of retrained / removed models must not be served again
+        for model_id in stale:
+            self.evict_model(model_id)
+        
+        self._sorted_models = sorted(registry.values(), key=lambda x: x.get("created_at", ""), reverse=True)
+        self._registry_fingerprint = fingerprint
+        self._registry = registry
+        return registry
+    
+    def invalidate_registry(self):
+        """Force the next lookup to re-check the model files (e.g. after copying a model into models/)"""
+        self._registry = None
+    
     def list_models(self) -> List[Dict]:
         """
         List all available models
         
         Returns:
-            List of model info dictionaries
+            List of model info dictionaries (copies), newest first
+        """
+        self._refresh_registry()
+        return copy.deepcopy(self._sorted_models)
+    
+    def get_model(self, model_id: str) -> Optional[Dict]:
         """
-        models = []
+        Get model info by ID
         
-        # Scan models directory
-        for item in self.models_dir.iterdir():
-            if item.is_dir():
-                model_file = item / "keras_model.h5"
-                labels_file = item / "labels.txt"
-                
-                if model_file.exists() and labels_file.exists():
-                    # Get metadata
-                    meta = next((m for m in self.metadata["models"] if m["id"] == item.name), None)
-                    
-                    if not meta:
-                        # Create metadata for existing model
-                        meta = {
-                            "id": item.name,
-                            "name": item.name,
-                            "created_at": datetime.fromtimestamp(model_file.stat().st_mtime).isoformat(),
-                            "model_path": str(model_file),
-                            "labels_path": str(labels_file)
-                        }
-                        self.metadata["models"].append(meta)
-                        self._save_metadata()
-                    
-                    # Read classes
-                    try:
-                        with open(labels_file, 'r', encoding='utf-8') as f:
-                            classes = [line.strip().split(maxsplit=1)[-1] for line in f if line.strip()]
-                        meta["classes"] = classes
-                        meta["num_classes"] = len(classes)
-                    except:
-                        meta["classes"] = []
-                        meta["num_classes"] = 0
-                    
-                    models.append(meta)
-        
-        return sorted(models, key=lambda x: x.get("created_at", ""), reverse=True)
-    
-    def get_model_path(self, model_id: str) -> Optional[tuple]:
+        Args:
+            model_id: Model identifier
+            
+        Returns:
+            Model info dictionary (a copy) or None if the model does not exist
+        """
+        return copy.deepcopy(self._refresh_registry().get(model_id))
+    
+    def get_model_path(self, model_id: str, backend: str = "keras", variant: str = None) -> Optional[tuple]:
         """
         Get model and labels path by ID
         
         Args:
             model_id: Model identifier
+            backend: 'keras' (keras_model.h5) or 'tflite' (converted on first use)
+            variant: Quantized variant ('dynamic', 'float16', 'int8') created by
+                create_quantized_variants (implies the tflite backend)
             
         Returns:
             Tuple of (model_path, labels_path) or None
@@ -123,10 +248,447 @@ class ModelManager:
         labels_file = model_dir / "labels.txt"
         
         if model_file.exists() and labels_file.exists():
+            if variant:
+                meta = next((m for m in self.metadata["models"] if m["id"] == model_id), {})
+                variant_file = meta.get("variants", {}).get(variant)
+                if variant_file and Path(variant_file).exists():
+                    return (variant_file, str(labels_file))
+                print(f"⚠️  Quantized variant '{variant}' not found, run create_quantized_variants() first")
+            if backend == "tflite" or variant:
+                tflite_file = self.get_tflite_path(model_id)
+                if tflite_file:
+                    return (tflite_file, str(labels_file))
+                print("⚠️  TFLite model not available, using Keras model")
             return (str(model_file), str(labels_file))
         
         return None
     
+    def get_tflite_path(self, model_id: str) -> Optional[str]:
+        """
+        Get the TFLite version of a model, converting keras_model.h5 once
+        
+        Args:
+            model_id: Model identifier
+            
+        Returns:
+            Path to keras_model.tflite or None if conversion failed
+        """
+        model_file = self.models_dir / model_id / "keras_model.h5"
+        if not model_file.exists():
+            return None
+        
+        try:
+            # Imported here: TensorFlow is only needed when converting
+            try:
+                from .teachable_recognizer import convert_to_tflite
+            except ImportError:
+                # Fallback for direct execution
+                from teachable_recognizer import convert_to_tflite
+            
+            tflite_file = str(convert_to_tflite(model_file))
+        except Exception as e:
+            print(f"Warning: Could not convert model to TFLite: {e}")
+            return None
+        
+        for model in self.metadata["models"]:
+            if model["id"] == model_id and model.get("tflite_path") != tflite_file:
+                model["tflite_path"] = tflite_file
+                self._save_metadata()
+        
+        return tflite_file
+    
+    def _load_class_names(self, model_id: str) -> List[str]:
+        """Class names from a model's labels.txt"""
+        labels_file = self.models_dir / model_id / "labels.txt"
+        with open(labels_file, 'r', encoding='utf-8') as f:
+            return [line.strip().split(maxsplit=1)[-1] for line in f if line.strip()]
+    
+    def _split_dataset_images(self, dataset_dir: Optional[str], holdout_every: int) -> tuple:
+        """
+        Split dataset_export/<person>/ photos into calibration and held-out sets
+        
+        Every holdout_every-th photo of each person is held out of the int8
+        calibration set. dataset_export is what the Teachable Machine model was
+        trained on, so these photos are not held out from training.
+        
+        Args:
+            dataset_dir: Folder with one subfolder per person (default: dataset_export
+                next to the models folder)
+            holdout_every: Hold out one photo in N
+            
+        Returns:
+            Tuple of (calibration image paths, [(held-out image path, person name)])
+        """
+        dataset_dir = Path(dataset_dir) if dataset_dir else self.models_dir.parent / "dataset_export"
+        calibration = []
+        holdout = []
+        
+        if not dataset_dir.exists():
+            return calibration, holdout
+        
+        for person_dir in sorted(p for p in dataset_dir.iterdir() if p.is_dir()):
+            images = sorted(
+                f for f in person_dir.iterdir()
+                if f.suffix.lower() in ('.jpg', '.jpeg', '.png')
+            )
+            for i, image_file in enumerate(images):
+                if i % holdout_every == holdout_every - 1:
+                    holdout.append((str(image_file), person_dir.name))
+                else:
+                    calibration.append(str(image_file))
+        
+        return calibration, holdout
+    
+    def create_quantized_variants(self, model_id: str, dataset_dir: str = None,
+                                  variants: List[str] = None, holdout_every: int = 5) -> Dict[str, str]:
+        """
+        Create post-training quantized TFLite variants of a model
+        
+        Full-int8 is calibrated on the photos of dataset_export/<person>/ that are
+        not held out for compare_variants().
+        
+        Args:
+            model_id: Model identifier
+            dataset_dir: Calibration photos folder (default: dataset_export)
+            variants: Variants to create (default: dynamic, float16, int8)
+            holdout_every: Hold out one photo in N (must match compare_variants)
+            
+        Returns:
+            Dictionary mapping variant name to .tflite path
+        """
+        try:
+            from .teachable_recognizer import convert_to_tflite, QUANTIZATION_VARIANTS
+        except ImportError:
+            # Fallback for direct execution
+            from teachable_recognizer import convert_to_tflite, QUANTIZATION_VARIANTS
+        
+        model_file = self.models_dir / model_id / "keras_model.h5"
+        if not model_file.exists():
+            raise FileNotFoundError(f"Model not found: {model_id}")
+        
+        calibration, _ = self._split_dataset_images(dataset_dir, holdout_every)
+        
+        created = {}
+        for variant in variants or QUANTIZATION_VARIANTS:
+            if variant == "int8" and not calibration:
+                print("⚠️  No calibration photos found, skipping int8 variant")
+                continue
+            try:
+                created[variant] = str(convert_to_tflite(
+                    model_file, variant=variant,
+                    calibration_images=calibration if variant == "int8" else None
+                ))
+            except Exception as e:
+                print(f"Warning: Could not create {variant} variant: {e}")
+        
+        for model in self.metadata["models"]:
+            if model["id"] == model_id:
+                model.setdefault("variants", {}).update(created)
+                self._save_metadata()
+        
+        return created
+    
+    def compare_variants(self, model_id: str, dataset_dir: str = None, holdout_every: int = 5,
+                         accuracy_tolerance: float = 0.02, save_report: bool = True,
+                         eval_dir: str = None) -> Dict:
+        """
+        Compare quantized variants with the original Keras model
+        
+        With eval_dir every photo there is used and accuracy is measured on
+        photos the model has not been trained on. Without it the photos held
+        out of int8 calibration are used; these come from dataset_export, the
+        training data, so the report labels the result as training-set
+        accuracy / agreement with the float model.
+        
+        Args:
+            model_id: Model identifier
+            dataset_dir: Photos folder (default: dataset_export)
+            holdout_every: Hold out one photo in N (must match create_quantized_variants)
+            accuracy_tolerance: Maximum accuracy / agreement drop for a variant
+                to be recommended
+            save_report: Save the report to quantization_report.json in the model folder
+            eval_dir: Folder with one subfolder per person of photos not used
+                for training (default: None, use the training photos)
+            
+        Returns:
+            Report dictionary with the evaluation set, per-variant accuracy,
+            agreement and latency and the fastest variant within tolerance
+        """
+        try:
+            from .teachable_recognizer import TeachableMachineRecognizer, tflite_model_path
+        except ImportError:
+            # Fallback for direct execution
+            from teachable_recognizer import TeachableMachineRecognizer, tflite_model_path
+        
+        import cv2
+        import numpy as np
+        
+        model_dir = self.models_dir / model_id
+        model_file = model_dir / "keras_model.h5"
+        labels_file = model_dir / "labels.txt"
+        class_names = self._load_class_names(model_id)
+        
+        if eval_dir:
+            if not Path(eval_dir).exists():
+                raise FileNotFoundError(f"Evaluation folder not found: {eval_dir}")
+            _, holdout = self._split_dataset_images(eval_dir, 1)
+            evaluation_set = "eval_dir"
+        else:
+            _, holdout = self._split_dataset_images(dataset_dir, holdout_every)
+            evaluation_set = "training"
+        images = [(cv2.imread(path), person) for path, person in holdout]
+        images = [(image, person) for image, person in images if image is not None]
+        if not images:
+            raise ValueError("No evaluation photos found for the comparison")
+        
+        meta = next((m for m in self.metadata["models"] if m["id"] == model_id), {})
+        candidates = {"original": str(model_file)}
+        if tflite_model_path(model_file).exists():
+            candidates["tflite"] = str(tflite_model_path(model_file))
+        for variant, path in meta.get("variants", {}).items():
+            if Path(path).exists():
+                candidates[variant] = path
+        
+        # Threshold 0: every prediction counts, the report compares top-1 classes
+        results = {}
+        reference = None
+        for name, path in candidates.items():
+            recognizer = TeachableMachineRecognizer(path, str(labels_file), confidence_threshold=0.0)
+            
+            predictions = []
+            start_time = time.time()
+            for image, _ in images:
+                scores = recognizer.get_all_predictions(image)
+                predictions.append(np.array([scores.get(c, 0.0) for c in class_names]))
+            latency_ms = (time.time() - start_time) * 1000 / len(images)
+            
+            predictions = np.stack(predictions)
+            top1 = predictions.argmax(axis=1)
+            if reference is None:
+                reference = (predictions, top1)
+            
+            labeled = [(i, class_names.index(person)) for i, (_, person) in enumerate(images) if person in class_names]
+            results[name] = {
+                'path': path,
+                'size_mb': round(Path(path).stat().st_size / 1024 / 1024, 2),
+                'latency_ms': round(latency_ms, 2),
+                'accuracy': round(float(np.mean([top1[i] == label for i, label in labeled])), 4) if labeled else None,
+                'agreement': round(float(np.mean(top1 == reference[1])), 4),
+                'max_score_diff': round(float(np.abs(predictions - reference[0]).max()), 4)
+            }
+        
+        # Fastest variant whose accuracy (or agreement when unlabeled) stays within tolerance
+        original = results["original"]
+        within_tolerance = [
+            name for name, r in results.items()
+            if (r['accuracy'] is None or original['accuracy'] is None
+                or original['accuracy'] - r['accuracy'] <= accuracy_tolerance)
+            and 1.0 - r['agreement'] <= accuracy_tolerance
+        ]
+        recommended = min(within_tolerance, key=lambda name: results[name]['latency_ms'])
+        
+        report = {
+            'model_id': model_id,
+            'generated_at': datetime.now().isoformat(),
+            'evaluation_set': evaluation_set,
+            'evaluation_photos': len(images),
+            'accuracy_tolerance': accuracy_tolerance,
+            'variants': results,
+            'recommended': recommended
+        }
+        
+        if save_report:
+            with open(model_dir / "quantization_report.json", 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        
+        if evaluation_set == "training":
+            print(f"\n📊 Quantization report ({len(images)} training photos, "
+                  f"training-set agreement with the float model):")
+            print("   ⚠️  Not held out from training; pass eval_dir for real accuracy")
+            accuracy_label = "training-set accuracy"
+        else:
+            print(f"\n📊 Quantization report ({len(images)} evaluation photos):")
+            accuracy_label = "accuracy"
+        for name, r in results.items():
+            accuracy = f"{r['accuracy']:.1%}" if r['accuracy'] is not None else "n/a"
+            print(f"   {name:10s} {r['latency_ms']:7.2f} ms  {r['size_mb']:6.2f} MB  "
+                  f"{accuracy_label} {accuracy}  agreement {r['agreement']:.1%}")
+        print(f"✅ Recommended: {recommended}")
+        
+        return report
+    
+    def get_recognizer(self, model_id: str, backend: str = "keras", variant: str = None,
+                       **recognizer_kwargs):
+        """
+        Get a loaded recognizer for a model, from the LRU cache when possible
+        
+        A cache hit returns the same instance without touching the disk, so
+        switching between cached models costs nothing. If another thread is
+        already loading the model (see preload), this waits for that load.
+        
+        Args:
+            model_id: Model identifier
+            backend: 'keras' or 'tflite' (see get_model_path)
+            variant: Quantized TFLite variant (see get_model_path)
+            **recognizer_kwargs: Passed to TeachableMachineRecognizer on a cache miss
+                (confidence_threshold, max_batch_size, num_threads, warmup...)
+            
+        Returns:
+            TeachableMachineRecognizer or None if the model files are missing
+        """
+        # Drops cached recognizers of a model retrained in place (at most one check per interval)
+        self._refresh_registry()
+        
+        key = (model_id, backend, variant or None)
+        while True:
+            with self._cache_lock:
+                recognizer = self._recognizers.get(key)
+                if recognizer is not None:
+                    self._recognizers.move_to_end(key)
+                    self.cache_stats['hits'] += 1
+                    return recognizer
+                
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            loading.wait()
+        
+        try:
+            paths = self.get_model_path(model_id, backend=backend, variant=variant)
+            if not paths:
+                return None
+            
+            recognizer = self._create_recognizer(paths[0], paths[1], **recognizer_kwargs)
+            
+            with self._cache_lock:
+                self._recognizers[key] = recognizer
+                self._recognizer_sizes[key] = Path(paths[0]).stat().st_size
+                self.cache_stats['misses'] += 1
+                self._evict_recognizers()
+            return recognizer
+        finally:
+            with self._cache_lock:
+                self._loading.pop(key).set()
+    
+    def _create_recognizer(self, model_path: str, labels_path: str, **recognizer_kwargs):
+        """Load a TeachableMachineRecognizer (a .tflite path selects the tflite backend)"""
+        # Imported here: TensorFlow is only needed once a model is loaded
+        try:
+            from .teachable_recognizer import TeachableMachineRecognizer
+        except ImportError:
+            # Fallback for direct execution
+            from teachable_recognizer import TeachableMachineRecognizer
+        
+        return TeachableMachineRecognizer(model_path, labels_path, **recognizer_kwargs)
+    
+    def _evict_recognizers(self):
+        """Drop least recently used recognizers over the count / memory budget (lock held)"""
+        while len(self._recognizers) > 1 and (
+                len(self._recognizers) > self.cache_size
+                or sum(self._recognizer_sizes.values()) > self.cache_memory_budget):
+            # Keep the active model and the newest entry
+            key = next((k for k in self._recognizers if k[0] != self.active_model), None)
+            if key is None or key == next(reversed(self._recognizers)):
+                break
+            del self._recognizers[key]
+            del self._recognizer_sizes[key]
+            self.cache_stats['evictions'] += 1
+            print(f"♻️  Unloaded model from cache: {key[0]}")
+    
+    def set_cache_limits(self, cache_size: int = None, cache_memory_mb: float = None):
+        """
+        Change the recognizer cache limits, evicting models over the new limits
+        
+        Args:
+            cache_size: Maximum loaded recognizers (None = unchanged)
+            cache_memory_mb: Memory budget in MB (None = unchanged)
+        """
+        with self._cache_lock:
+            if cache_size is not None:
+                self.cache_size = max(1, int(cache_size))
+            if cache_memory_mb is not None:
+                self.cache_memory_budget = int(cache_memory_mb * 1024 * 1024)
+            self._evict_recognizers()
+    
+    def evict_model(self, model_id: str):
+        """
+        Remove every cached recognizer of a model
+        
+        Args:
+            model_id: Model identifier
+        """
+        with self._cache_lock:
+            for key in [k for k in self._recognizers if k[0] == model_id]:
+                del self._recognizers[key]
+                del self._recognizer_sizes[key]
+    
+    def is_cached(self, model_id: str, backend: str = "keras", variant: str = None) -> bool:
+        """Check if a model is loaded in the recognizer cache"""
+        return (model_id, backend, variant or None) in self._recognizers
+    
+    def get_cache_info(self) -> Dict:
+        """
+        Get recognizer cache information
+        
+        Returns:
+            Dictionary with cached model ids (least recently used first), memory use and hit counts
+        """
+        with self._cache_lock:
+            return {
+                'models': [key[0] for key in self._recognizers],
+                'memory_mb': sum(self._recognizer_sizes.values()) / 1024 / 1024,
+                'memory_budget_mb': self.cache_memory_budget / 1024 / 1024,
+                'cache_size': self.cache_size,
+                **self.cache_stats
+            }
+    
+    def predict_next_model(self) -> Optional[str]:
+        """
+        Guess the model most likely to be activated next
+        
+        Returns:
+            The previously active model, else the newest other model (None if there is none)
+        """
+        active = self.active_model or self.metadata.get("active_model")
+        previous = self.metadata.get("previous_active_model")
+        if previous and previous != active and (self.models_dir / previous / "keras_model.h5").exists():
+            return previous
+        
+        others = [m for m in self.list_models() if m["id"] != active]
+        if not others:
+            return None
+        return max(others, key=lambda m: m.get("created_at", ""))["id"]
+    
+    def preload(self, model_id: str = None, backend: str = "keras", variant: str = None,
+                **recognizer_kwargs) -> Optional[threading.Thread]:
+        """
+        Load a model into the recognizer cache in a background thread
+        
+        Args:
+            model_id: Model identifier (None = predict_next_model())
+            backend: 'keras' or 'tflite'
+            variant: Quantized TFLite variant
+            **recognizer_kwargs: See get_recognizer
+            
+        Returns:
+            The loader thread, or None if there is nothing to load
+        """
+        model_id = model_id or self.predict_next_model()
+        if model_id is None or self.is_cached(model_id, backend, variant):
+            return None
+        
+        def load():
+            try:
+                if self.get_recognizer(model_id, backend, variant, **recognizer_kwargs) is not None:
+                    print(f"✅ Preloaded model: {model_id}")
+            except Exception as e:
+                print(f"⚠️  Could not preload model {model_id}: {e}")
+        
+        thread = threading.Thread(target=load, name=f"preload-{model_id}", daemon=True)
+        thread.start()
+        return thread
+    
     def set_active_model(self, model_id: str) -> bool:
         """
         Set active model
@@ -139,6 +701,9 @@ class ModelManager:
         """
         paths = self.get_model_path(model_id)
         if paths:
+            previous = self.metadata.get("active_model")
+            if previous and previous != model_id:
+                self.metadata["previous_active_model"] = previous
             self.active_model = model_id
             self.metadata["active_model"] = model_id
             self._save_metadata()
@@ -151,8 +716,7 @@ class ModelManager:
             self.active_model = self.metadata.get("active_model")
         
         if self.active_model:
-            models = self.list_models()
-            return next((m for m in models if m["id"] == self.active_model), None)
+            return self.get_model(self.active_model)
         
         # Return first model if no active model
         models = self.list_models()
@@ -199,6 +763,7 @@ class ModelManager:
             "labels_path": str(model_dir / "labels.txt")
         })
         self._save_metadata()
+        self.invalidate_registry()
         
         return model_id
     
@@ -216,6 +781,7 @@ class ModelManager:
         
         if model_dir.exists():
             try:
+                self.evict_model(model_id)
                 shutil.rmtree(model_dir)
                 
                 # Remove from metadata
@@ -227,6 +793,7 @@ class ModelManager:
                     self.active_model = None
                 
                 self._save_metadata()
+                self.invalidate_registry()
                 return True
             except Exception as e:
                 print(f"Error deleting model: {e}")
@@ -277,6 +844,10 @@ def main():
         print(f"\nActive model: {active['name']}")
     else:
         print("\nNo active model")
+    
+    next_model = manager.predict_next_model()
+    if next_model:
+        print(f"Next likely model: {next_model}")
 
 
 if __name__ == "__main__":
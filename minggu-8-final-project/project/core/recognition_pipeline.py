@@ -0,0 +1,302 @@
+"""
+Recognition Pipeline Module
+Week 8 Final Project - Latest-Frame-Wins Video Pipeline
+
+Runs RecognitionService on a video source in three decoupled stages:
+- Capture: a thread that keeps reading the source (the device never backs up)
+- Inference: a thread that always takes the NEWEST captured frame
+- Display: the caller's loop gets the newest frame plus the newest results
+
+Stages are connected by single-slot buffers that overwrite the previous item,
+so stale frames are dropped instead of queued. Display latency is one capture
+period; results lag by at most one inference period, however slow the model.
+read() reports how far the results lag behind the displayed frame
+(result_age / result_frames_behind) and can drop results that are too old.
+"""
+
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+class LatestSlot:
+    """
+    Single-slot buffer: put() overwrites, readers wait for a newer item
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._closed = False
+    
+    @property
+    def seq(self) -> int:
+        """Sequence number of the current item (0 = empty)"""
+        return self._seq
+    
+    @property
+    def closed(self) -> bool:
+        """Check if close() was called"""
+        return self._closed
+    
+    def put(self, item) -> int:
+        """
+        Replace the current item
+        
+        Returns:
+            Sequence number of the new item
+        """
+        with self._cond:
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+            return self._seq
+    
+    def get(self, last_seq: int = 0, timeout: float = None) -> Tuple[int, Optional[object]]:
+        """
+        Wait for an item newer than last_seq
+        
+        Args:
+            last_seq: Sequence number the caller already has
+            timeout: Maximum seconds to wait (None = until closed)
+        
+        Returns:
+            Tuple of (sequence number, item), or (last_seq, None) on timeout / close
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > last_seq or self._closed, timeout):
+                return last_seq, None
+            if self._seq <= last_seq:
+                return last_seq, None
+            return self._seq, self._item
+    
+    def peek(self) -> Tuple[int, Optional[object]]:
+        """Current item without waiting"""
+        with self._cond:
+            return self._seq, self._item
+    
+    def close(self):
+        """Wake up all waiting readers"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class RecognitionPipeline:
+    """
+    Threaded capture → inference → display pipeline around RecognitionService
+    """
+    
+    def __init__(self, recognition_service, frame_source, stream_id: str = "default",
+                 use_tracking: bool = True):
+        """
+        Initialize recognition pipeline
+        
+        Args:
+            recognition_service: RecognitionService (None = preview only, no inference)
+            frame_source: Object with read() -> (ok, frame), e.g. a camera broker
+                subscription or cv2.VideoCapture
+            stream_id: Tracking stream key passed to track_faces()
+            use_tracking: Use track_faces() (frame skip + identity cache) instead of
+                recognize_faces() on every inferred frame
+        """
+        self.recognition_service = recognition_service
+        self.frame_source = frame_source
+        self.stream_id = stream_id
+        self.use_tracking = use_tracking
+        
+        # Slots are recreated by start(): close() is final, so a restarted pipeline needs new ones
+        self._frames = LatestSlot()  # (frame, capture_time)
+        self._results = LatestSlot()  # (results, frame_seq, frame capture_time)
+        self._threads = []
+        self._threads_lock = threading.Lock()  # start() / set_recognition_service() from different threads
+        self._running = False
+        self._last_display_seq = 0
+        
+        # Lag of the results returned by the last read() behind the displayed frame
+        self.result_age = None  # seconds between the two frames' capture times (None = no results)
+        self.result_frames_behind = None  # captured frames between them
+        
+        self.stats = {
+            'frames_captured': 0,
+            'frames_inferred': 0,
+            'frames_dropped': 0,  # captured frames inference never saw
+            'avg_inference_time': 0.0,
+            'last_result_latency': 0.0  # capture → results available, seconds
+        }
+    
+    @property
+    def is_running(self) -> bool:
+        """Check if the pipeline is running"""
+        return self._running
+    
+    def start(self) -> "RecognitionPipeline":
+        """Start capture and inference threads"""
+        with self._threads_lock:
+            if self._running:
+                return self
+            
+            self._running = True
+            self._frames = LatestSlot()
+            self._results = LatestSlot()
+            self._last_display_seq = 0
+            self.result_age = self.result_frames_behind = None
+            
+            # Threads get this run's slots: after a stop() they exit on the closed
+            # slots even if a later start() has set _running again
+            slots = (self._frames, self._results)
+            self._threads = [threading.Thread(target=self._capture_loop, args=slots, daemon=True)]
+            if self.recognition_service is not None:
+                self._threads.append(threading.Thread(target=self._inference_loop, args=slots,
+                                                      name="inference", daemon=True))
+            for thread in self._threads:
+                thread.start()
+        return self
+    
+    def set_recognition_service(self, recognition_service):
+        """
+        Attach a recognition service to a running pipeline (e.g. once it has loaded)
+        
+        Frames are displayed from start(); results follow as soon as a service is set.
+        
+        Args:
+            recognition_service: RecognitionService
+        """
+        if recognition_service is None or recognition_service is self.recognition_service:
+            return
+        
+        with self._threads_lock:
+            self.recognition_service = recognition_service
+            if self._running and not any(t.name == "inference" for t in self._threads):
+                thread = threading.Thread(target=self._inference_loop, args=(self._frames, self._results),
+                                          name="inference", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+    
+    def stop(self, timeout: float = 2.0):
+        """Stop the pipeline threads (the frame source is left open)"""
+        self._running = False
+        self._frames.close()
+        self._results.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=timeout)
+        self._threads = []
+    
+    def _capture_loop(self, frames: LatestSlot, results: LatestSlot):
+        """Capture stage: keep reading, overwrite the frame slot"""
+        while self._running and not frames.closed:
+            ret, frame = self.frame_source.read()
+            if not ret:
+                print(f"⚠️  Pipeline '{self.stream_id}': frame source stopped")
+                break
+            
+            frames.put((frame, time.time()))
+            self.stats['frames_captured'] += 1
+        
+        if not frames.closed:
+            self._running = False
+        frames.close()
+        results.close()
+    
+    def _inference_loop(self, frames: LatestSlot, results_slot: LatestSlot):
+        """Inference stage: always process the newest captured frame"""
+        last_seq = frames.seq  # frames shown before a service was attached are not "dropped"
+        while self._running and not frames.closed:
+            seq, item = frames.get(last_seq, timeout=0.5)
+            if item is None:
+                continue
+            
+            frame, capture_time = item
+            self.stats['frames_dropped'] += max(0, seq - last_seq - 1)
+            last_seq = seq
+            
+            start_time = time.time()
+            try:
+                if self.use_tracking:
+                    results = self.recognition_service.track_faces(frame, stream_id=self.stream_id)
+                else:
+                    results = self.recognition_service.recognize_faces(frame)
+            except Exception as e:
+                print(f"⚠️  Pipeline '{self.stream_id}' inference error: {e}")
+                results = []
+            
+            now = time.time()
+            inferred = self.stats['frames_inferred']
+            self.stats['avg_inference_time'] = (self.stats['avg_inference_time'] * inferred + (now - start_time)) / (inferred + 1)
+            self.stats['frames_inferred'] = inferred + 1
+            self.stats['last_result_latency'] = now - capture_time
+            
+            results_slot.put((results, seq, capture_time))
+    
+    def read(self, timeout: float = 2.0,
+             max_result_age: float = None) -> Tuple[bool, Optional[np.ndarray], List[Dict]]:
+        """
+        Display stage: wait for the next frame and pair it with the newest results
+        
+        The results were computed on an older frame; result_age and
+        result_frames_behind tell how much older (boxes may be off by the
+        motion in between).
+        
+        Args:
+            timeout: Maximum seconds to wait for a frame
+            max_result_age: Drop results computed on a frame captured more than
+                this many seconds before the displayed one (None = keep all)
+        
+        Returns:
+            Tuple of (success, newest frame, newest recognition results)
+        """
+        seq, item = self._frames.get(self._last_display_seq, timeout)
+        if item is None:
+            return False, None, []
+        
+        frame, capture_time = item
+        self._last_display_seq = seq
+        _, result_item = self._results.peek()
+        if result_item is None:
+            self.result_age = self.result_frames_behind = None
+            return True, frame, []
+        
+        results, result_seq, result_capture_time = result_item
+        self.result_age = max(0.0, capture_time - result_capture_time)
+        self.result_frames_behind = max(0, seq - result_seq)
+        if max_result_age is not None and self.result_age > max_result_age:
+            results = []
+        return True, frame, results
+    
+    def get_statistics(self) -> Dict:
+        """Get pipeline statistics"""
+        return dict(self.stats)
+
+
+# Example usage
+if __name__ == "__main__":
+    print("Recognition Pipeline Module - Week 8 Final Project")
+    print("="*60)
+    
+    class SlowService:
+        """Stand-in for RecognitionService with 200 ms inference"""
+        def track_faces(self, frame, stream_id="default"):
+            time.sleep(0.2)
+            return [{'name': 'Demo', 'bbox': (10, 10, 50, 50)}]
+    
+    class SyntheticCamera:
+        """30 FPS frame source"""
+        def read(self):
+            time.sleep(1 / 30)
+            return True, np.zeros((480, 640, 3), dtype=np.uint8)
+    
+    pipeline = RecognitionPipeline(SlowService(), SyntheticCamera()).start()
+    displayed = 0
+    end_time = time.time() + 2.0
+    while time.time() < end_time:
+        ok, frame, results = pipeline.read()
+        displayed += ok
+    pipeline.stop()
+    
+    stats = pipeline.get_statistics()
+    print(f"✅ Displayed {displayed} frames, inferred {stats['frames_inferred']}, "
+          f"dropped {stats['frames_dropped']} stale frames")
+    print(f"   Result latency: {stats['last_result_latency'] * 1000:.0f} ms")
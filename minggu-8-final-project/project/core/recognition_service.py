@@ -14,10 +14,10 @@ import sys
 import os
 import pickle
 import json
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, NamedTuple, Optional, Sequence, Tuple
 from pathlib import Path
 from datetime import datetime
-import mediapipe as mp
+import importlib.util
 
 # NOTE: We use MediaPipe directly, no need for external face_detector
 # If you need FaceDetector class from Week 2, uncomment below:
@@ -26,16 +26,56 @@ import mediapipe as mp
 # sys.path.insert(0, week2_path)
 # from face_detector import FaceDetector
 
-# Import Teachable Machine recognizer
+# Import gallery index (exact / approximate nearest-neighbour search), binary store,
+# landmark encoding, detection preprocessing and box tracking
 try:
-    from .teachable_recognizer import TeachableMachineRecognizer
-    TEACHABLE_MACHINE_AVAILABLE = True
+    from .face_index import normalize_rows, load_or_build_index
+    from .encoding_store import EncodingStore
+    from .face_recognizer import landmarks_to_encoding
+    from .image_utils import prepare_detection_input
+    from .face_tracker import FaceTracker
+    from .concurrency import PerThreadPool, ThreadLocalCounters
 except ImportError:
-    TEACHABLE_MACHINE_AVAILABLE = False
+    # Fallback for direct execution
+    from face_index import normalize_rows, load_or_build_index
+    from encoding_store import EncodingStore
+    from face_recognizer import landmarks_to_encoding
+    from image_utils import prepare_detection_input
+    from face_tracker import FaceTracker
+    from concurrency import PerThreadPool, ThreadLocalCounters
+
+# Teachable Machine recognizer needs TensorFlow: check without importing it,
+# the module is loaded only when a service is created in Teachable Machine mode
+TEACHABLE_MACHINE_AVAILABLE = importlib.util.find_spec("tensorflow") is not None
+if not TEACHABLE_MACHINE_AVAILABLE:
     print("⚠️  Teachable Machine module not available")
 
+
+def _load_teachable_recognizer():
+    """Import TeachableMachineRecognizer (and TensorFlow) on first use"""
+    try:
+        from .teachable_recognizer import TeachableMachineRecognizer
+    except ImportError:
+        # Fallback for direct execution
+        from teachable_recognizer import TeachableMachineRecognizer
+    return TeachableMachineRecognizer
+
 print(f"🔍 Using MediaPipe for detection AND recognition")
 
+# Face Mesh pipeline modes: one pass per detected face, or one pass per frame
+MESH_MODES = ("per_roi", "full_frame", "union_roi")
+
+
+class Gallery(NamedTuple):
+    """Known faces, published as one immutable snapshot (replaced whole on reload)"""
+    matrix: np.ndarray  # L2-normalized float32 rows
+    names: Sequence[str]  # name per row
+    metadata: Sequence[Dict]  # metadata dict per row
+    index: Optional[object]  # search index over matrix (None if empty)
+
+
+EMPTY_GALLERY = Gallery(np.zeros((0, 0), dtype=np.float32), [], [], None)
+
 
 class RecognitionService:
     """
@@ -43,11 +83,25 @@ class RecognitionService:
     Supports both MediaPipe encoding and Teachable Machine models
     """
     
+    # Matching threads read this reference once per call, so a reload never
+    # pairs the new index with the old names
+    gallery = EMPTY_GALLERY
+    
     def __init__(self, dataset_path: str = "dataset", tolerance: float = 0.6,
                  use_teachable_machine: bool = False, 
                  teachable_model_path: str = None,
                  teachable_labels_path: str = None,
-                 teachable_confidence: float = 0.7):
+                 teachable_confidence: float = 0.7,
+                 index_type: str = "brute_force",
+                 index_params: Dict = None,
+                 mesh_mode: str = "per_roi",
+                 max_detection_size: int = 640,
+                 frame_skip: int = 1,
+                 teachable_batch_size: int = 8,
+                 teachable_backend: str = "keras",
+                 teachable_num_threads: int = None,
+                 teachable_warmup: bool = True,
+                 teachable_recognizer=None):
         """
         Initialize recognition service
         
@@ -58,32 +112,68 @@ class RecognitionService:
             teachable_model_path: Path to keras_model.h5
             teachable_labels_path: Path to labels.txt
             teachable_confidence: Confidence threshold for Teachable Machine (default: 0.7)
+            index_type: Gallery search backend, 'brute_force' (exact), 'ivf' or 'prototype' (approximate)
+            index_params: Backend parameters, e.g. {'n_lists': 256, 'n_probe': 8} for 'ivf'
+                or {'shortlist_k': 5} for 'prototype'
+            mesh_mode: 'per_roi' (Face Mesh on each face crop), 'full_frame' (one Face Mesh
+                pass per frame) or 'union_roi' (one pass on the region around all faces)
+            max_detection_size: Longest side of the downscaled detection input; faces
+                are still cropped from the full-resolution frame (None or 0 = no downscaling)
+            frame_skip: track_faces() runs detection + recognition every N frames and
+                tracks boxes in between (1 = every frame)
+            teachable_batch_size: Maximum faces per Teachable Machine forward pass
+            teachable_backend: Teachable Machine inference backend, 'keras' or 'tflite'
+            teachable_num_threads: TFLite interpreter threads (None = TFLite default)
+            teachable_warmup: Warm up the Teachable Machine model at load time
+            teachable_recognizer: Already loaded TeachableMachineRecognizer (e.g. from
+                the ModelManager cache), used instead of the model paths
         """
+        if mesh_mode not in MESH_MODES:
+            raise ValueError(f"Unknown mesh mode: {mesh_mode}. Use one of {list(MESH_MODES)}")
+        
         self.dataset_path = Path(dataset_path)
         self.encodings_file = self.dataset_path / "encodings.pkl"
+        self.encoding_store = EncodingStore(self.dataset_path)
+        self.index_file = self.dataset_path / "encodings_index.npz"
         self.tolerance = tolerance
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.mesh_mode = mesh_mode
+        self.max_detection_size = max_detection_size
+        self.frame_skip = max(1, int(frame_skip))
+        self.trackers = {}  # stream_id -> FaceTracker, one per video source
         self.use_teachable_machine = use_teachable_machine
         
+        # MediaPipe is imported here, not at module level, to keep startup fast
+        import mediapipe as mp
+        
         # Initialize MediaPipe Face Detection (optimized)
+        # MediaPipe graphs are not thread-safe: each calling thread gets its own
         self.mp_face_detection = mp.solutions.face_detection
-        self.face_detection = self.mp_face_detection.FaceDetection(
-            model_selection=0,  # 0 for close-range (2m), 1 for full-range (5m)
-            min_detection_confidence=0.3  # Lower = more sensitive
-        )
+        self._detection_pool = PerThreadPool(self._create_face_detection)
+        self._detection_pool.get()  # load now so errors surface at startup
         
         print("✅ MediaPipe Face Detection loaded (Confidence: 0.3 - More Sensitive)")
         
         # Initialize recognition method
         self.teachable_recognizer = None
         
-        if use_teachable_machine and TEACHABLE_MACHINE_AVAILABLE:
+        if use_teachable_machine and teachable_recognizer is not None:
+            self.teachable_recognizer = teachable_recognizer
+            print(f"✅ Teachable Machine mode enabled")
+        elif use_teachable_machine and TEACHABLE_MACHINE_AVAILABLE:
             # Use Teachable Machine for recognition
             if teachable_model_path and teachable_labels_path:
                 try:
+                    TeachableMachineRecognizer = _load_teachable_recognizer()
                     self.teachable_recognizer = TeachableMachineRecognizer(
                         model_path=teachable_model_path,
                         labels_path=teachable_labels_path,
-                        confidence_threshold=teachable_confidence
+                        confidence_threshold=teachable_confidence,
+                        max_batch_size=teachable_batch_size,
+                        backend=teachable_backend,
+                        num_threads=teachable_num_threads,
+                        warmup=teachable_warmup
                     )
                     print(f"✅ Teachable Machine mode enabled")
                 except Exception as e:
@@ -99,32 +189,122 @@ class RecognitionService:
         # Initialize MediaPipe Face Mesh if not using Teachable Machine
         if not self.use_teachable_machine or self.teachable_recognizer is None:
             self.mp_face_mesh = mp.solutions.face_mesh
-            self.face_mesh = self.mp_face_mesh.FaceMesh(
-                static_image_mode=False,
-                max_num_faces=5,
-                refine_landmarks=True,
-                min_detection_confidence=0.3,
-                min_tracking_confidence=0.3
-            )
-            print("✅ MediaPipe Face Mesh loaded (for encoding)")
+            self._mesh_pool = PerThreadPool(self._create_face_mesh)
+            self._mesh_pool.get()
+            self._crop_mesh_pool = PerThreadPool(self._create_crop_face_mesh)
+            print(f"✅ MediaPipe Face Mesh loaded (for encoding, {mesh_mode})")
             
             # Load encodings from pickle file
-            self.known_encodings = []
-            self.known_names = []
-            self.known_metadata = []
             self._load_encodings_from_file()
         
-        # Statistics tracking
+        # Statistics tracking (per-thread counters, summed when read)
         self.stats = {
             'total_processed': 0,
             'total_recognized': 0,
             'total_unknown': 0,
-            'avg_processing_time': 0
+            'avg_processing_time': 0,
+            'identity_cache_hits': 0  # tracked faces not re-recognized (track_faces)
         }
         
         mode = "Teachable Machine" if self.use_teachable_machine and self.teachable_recognizer else "MediaPipe"
         print(f"✅ RecognitionService initialized ({mode} mode)")
     
+    def _create_face_detection(self):
+        """Create a Face Detection graph (one per calling thread)"""
+        return self.mp_face_detection.FaceDetection(
+            model_selection=0,  # 0 for close-range (2m), 1 for full-range (5m)
+            min_detection_confidence=0.3  # Lower = more sensitive
+        )
+    
+    def _create_face_mesh(self):
+        """
+        Create a Face Mesh graph (one per calling thread)
+        
+        Tracking mode carries landmarks over from the previous input, which only
+        holds while the input region stays put; the union_roi crop moves with the
+        faces every frame, so that mode detects landmarks on every frame instead.
+        """
+        return self.mp_face_mesh.FaceMesh(
+            static_image_mode=self.mesh_mode == "union_roi",
+            max_num_faces=5,
+            refine_landmarks=True,
+            min_detection_confidence=0.3,
+            min_tracking_confidence=0.3
+        )
+    
+    def _create_crop_face_mesh(self):
+        """Create a static-image Face Mesh graph for single face crops (one per calling thread)"""
+        return self.mp_face_mesh.FaceMesh(
+            static_image_mode=True,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.3
+        )
+    
+    @property
+    def known_matrix(self) -> np.ndarray:
+        """Gallery matrix of the current snapshot"""
+        return self.gallery.matrix
+    
+    # Same matrix under the name older callers use
+    known_encodings = known_matrix
+    
+    @property
+    def known_names(self) -> Sequence[str]:
+        """Name per gallery row of the current snapshot"""
+        return self.gallery.names
+    
+    @property
+    def known_metadata(self) -> Sequence[Dict]:
+        """Metadata per gallery row of the current snapshot"""
+        return self.gallery.metadata
+    
+    @property
+    def gallery_index(self):
+        """Search index of the current snapshot"""
+        return self.gallery.index
+    
+    @property
+    def face_detection(self):
+        """Face Detection graph of the calling thread"""
+        return self._detection_pool.get()
+    
+    @face_detection.setter
+    def face_detection(self, graph):
+        # Injected graph is shared by all threads
+        self._detection_pool = PerThreadPool(lambda: graph)
+    
+    @property
+    def face_mesh(self):
+        """Face Mesh graph of the calling thread (tracking state is per stream thread)"""
+        return self._mesh_pool.get()
+    
+    @face_mesh.setter
+    def face_mesh(self, graph):
+        self._mesh_pool = PerThreadPool(lambda: graph)
+    
+    @property
+    def crop_face_mesh(self):
+        """Static-image Face Mesh graph of the calling thread (full_frame / union_roi fallback)"""
+        return self._crop_mesh_pool.get()
+    
+    @crop_face_mesh.setter
+    def crop_face_mesh(self, graph):
+        self._crop_mesh_pool = PerThreadPool(lambda: graph)
+    
+    @property
+    def stats(self) -> Dict:
+        """Statistics summed over all calling threads"""
+        totals = self._stats.snapshot()
+        processing_time = totals.pop('processing_time', 0.0)
+        if totals['total_processed'] > 0:
+            totals['avg_processing_time'] = processing_time / totals['total_processed']
+        return totals
+    
+    @stats.setter
+    def stats(self, initial: Dict):
+        self._stats = ThreadLocalCounters(dict(initial, processing_time=0.0))
+    
     def _recognize_faces_teachable_machine(self, image: np.ndarray, return_frames: bool = False) -> List[Dict]:
         """
         Recognize faces using Teachable Machine model
@@ -141,43 +321,33 @@ class RecognitionService:
         if image is None or image.size == 0:
             return results
         
-        # Convert BGR to RGB for MediaPipe
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        h, w = image.shape[:2]
-        
         # Step 1: Detect faces with MediaPipe
-        detection_results = self.face_detection.process(rgb_image)
-        
-        if not detection_results.detections:
-            return results
+        faces = self._detect_face_rois(image)
         
         # Step 2: Process each detected face with Teachable Machine
-        for detection in detection_results.detections:
-            # Get bounding box
-            bbox = detection.location_data.relative_bounding_box
-            x = int(bbox.xmin * w)
-            y = int(bbox.ymin * h)
-            width = int(bbox.width * w)
-            height = int(bbox.height * h)
-            
-            # Ensure coordinates are within image bounds
-            x = max(0, x)
-            y = max(0, y)
-            width = min(width, w - x)
-            height = min(height, h - y)
-            
-            if width <= 0 or height <= 0:
-                continue
-            
-            # Extract face ROI
-            face_roi = image[y:y+height, x:x+width]
-            
-            if face_roi.size == 0:
-                continue
-            
-            # Recognize using Teachable Machine
-            name, confidence = self.teachable_recognizer.recognize_face(face_roi)
+        results = self._match_faces_teachable_machine(faces, return_frames)
+        
+        self._stats.add('total_processed', len(results))
+        return results
+    
+    def _match_faces_teachable_machine(self, faces: List[Tuple[Tuple[int, int, int, int], np.ndarray]],
+                                       return_frames: bool = False) -> List[Dict]:
+        """
+        Classify detected faces with the Teachable Machine model
+        
+        Args:
+            faces: List of (bbox, face_roi) tuples
+            return_frames: If True, return cropped face images
             
+        Returns:
+            List of recognition results, in the same order as faces
+        """
+        results = []
+        
+        # Classify every face in one batched forward pass
+        predictions = self.teachable_recognizer.recognize_faces_batch([face_roi for _, face_roi in faces])
+        
+        for ((x, y, width, height), face_roi), (name, confidence) in zip(faces, predictions):
             if name:
                 result = {
                     'name': name,
@@ -186,7 +356,7 @@ class RecognitionService:
                     'metadata': {},
                     'face_image': face_roi if return_frames else None
                 }
-                self.stats['total_recognized'] += 1
+                self._stats.add('total_recognized')
             else:
                 result = {
                     'name': 'Unknown',
@@ -195,24 +365,46 @@ class RecognitionService:
                     'metadata': {},
                     'face_image': face_roi if return_frames else None
                 }
-                self.stats['total_unknown'] += 1
+                self._stats.add('total_unknown')
             
             results.append(result)
         
-        self.stats['total_processed'] += len(results)
         return results
     
-    def _extract_face_encoding_mediapipe(self, image: np.ndarray) -> Optional[np.ndarray]:
+    def _recognize_face_rois(self, image: np.ndarray,
+                             faces: List[Tuple[Tuple[int, int, int, int], np.ndarray]],
+                             return_frames: bool = False) -> List[Dict]:
+        """
+        Recognize already detected faces with the active method
+        
+        Args:
+            image: Full frame (BGR format from cv2)
+            faces: List of (bbox, face_roi) tuples from _detect_face_rois
+            return_frames: If True, return cropped face images
+            
+        Returns:
+            List of recognition results, in the same order as faces
+        """
+        if self.use_teachable_machine and self.teachable_recognizer is not None:
+            return self._match_faces_teachable_machine(faces, return_frames)
+        
+        return self._match_faces(faces, self._encode_faces(image, faces), return_frames)
+    
+    def _extract_face_encoding_mediapipe(self, image: np.ndarray, face_mesh=None) -> Optional[np.ndarray]:
         """
         Extract face encoding using MediaPipe Face Mesh landmarks
-        Returns 468 landmarks x 3 coordinates = 1404 dimensional vector
+        Returns 468 landmarks x 3 coordinates = 1404 dimensional float32 vector
+        
+        Args:
+            image: Face crop (BGR format from cv2)
+            face_mesh: Face Mesh graph to use (default: the calling thread's face_mesh)
         """
         try:
             # Convert BGR to RGB
             rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
             # Process with Face Mesh
-            results = self.face_mesh.process(rgb_image)
+            results = (face_mesh or self.face_mesh).process(rgb_image)
             
             if not results.multi_face_landmarks:
                 return None
@@ -220,86 +412,272 @@ class RecognitionService:
             # Get first face landmarks
             face_landmarks = results.multi_face_landmarks[0]
             
-            # Extract landmarks as encoding (468 landmarks x 3 coords)
-            encoding = []
-            for landmark in face_landmarks.landmark:
-                encoding.extend([landmark.x, landmark.y, landmark.z])
-            
-            return np.array(encoding)
+            # Extract landmarks as float32 encoding (468 landmarks x 3 coords)
+            return landmarks_to_encoding(face_landmarks)
             
         except Exception as e:
             return None
     
+    def _encode_faces(self, image: np.ndarray,
+                      faces: List[Tuple[Tuple[int, int, int, int], np.ndarray]]) -> List[Optional[np.ndarray]]:
+        """
+        Encode detected faces according to mesh_mode
+        
+        Args:
+            image: Full frame (BGR format from cv2)
+            faces: List of (bbox, face_roi) tuples from _detect_face_rois
+            
+        Returns:
+            Encoding per face (None if no landmarks were found)
+        """
+        if self.mesh_mode == "per_roi" or not faces:
+            return [self._extract_face_encoding_mediapipe(face_roi) for _, face_roi in faces]
+        
+        encodings = self._extract_face_encodings_frame(image, faces)
+        
+        # Faces the frame pass missed (e.g. beyond max_num_faces) fall back to their
+        # crop on a static-image graph, so crops never reach the frame graph's tracking
+        missed = [i for i, encoding in enumerate(encodings) if encoding is None]
+        if missed:
+            crop_mesh = self.crop_face_mesh
+            for i in missed:
+                encodings[i] = self._extract_face_encoding_mediapipe(faces[i][1], crop_mesh)
+        return encodings
+    
+    def _extract_face_encodings_frame(self, image: np.ndarray,
+                                      faces: List[Tuple[Tuple[int, int, int, int], np.ndarray]],
+                                      min_iou: float = 0.3) -> List[Optional[np.ndarray]]:
+        """
+        Encode all detected faces with a single Face Mesh pass
+        
+        Landmark sets are assigned to detector boxes by IoU, then re-expressed
+        relative to their box so encodings stay comparable to per-ROI ones.
+        
+        Args:
+            image: Full frame (BGR format from cv2)
+            faces: List of (bbox, face_roi) tuples from _detect_face_rois
+            min_iou: Minimum IoU between landmark extent and detector box
+            
+        Returns:
+            Encoding per face (None if no landmark set was assigned)
+        """
+        encodings = [None] * len(faces)
+        boxes = np.array([bbox for bbox, _ in faces], dtype=np.float32)
+        
+        # Mesh input: full frame, or the union of boxes with a 25% margin
+        h, w = image.shape[:2]
+        x1, y1 = 0, 0
+        x2, y2 = w, h
+        if self.mesh_mode == "union_roi":
+            margin = 0.25 * boxes[:, 2:].max()
+            x1 = int(max(0, boxes[:, 0].min() - margin))
+            y1 = int(max(0, boxes[:, 1].min() - margin))
+            x2 = int(min(w, (boxes[:, 0] + boxes[:, 2]).max() + margin))
+            y2 = int(min(h, (boxes[:, 1] + boxes[:, 3]).max() + margin))
+        region_w, region_h = x2 - x1, y2 - y1
+        
+        try:
+            rgb_region = cv2.cvtColor(image[y1:y2, x1:x2], cv2.COLOR_BGR2RGB)
+            results = self.face_mesh.process(rgb_region)
+        except Exception:
+            return encodings
+        
+        if not results.multi_face_landmarks:
+            return encodings
+        
+        # Landmarks in frame pixels; z shares the x scale in MediaPipe
+        landmark_sets = []
+        for face_landmarks in results.multi_face_landmarks:
+            points = landmarks_to_encoding(face_landmarks).reshape(-1, 3)
+            points *= (region_w, region_h, region_w)
+            points += (x1, y1, 0.0)
+            landmark_sets.append(points)
+        
+        # IoU between landmark extents (M) and detector boxes (N)
+        mins = np.array([p[:, :2].min(axis=0) for p in landmark_sets])
+        maxs = np.array([p[:, :2].max(axis=0) for p in landmark_sets])
+        box_mins = boxes[:, :2]
+        box_maxs = boxes[:, :2] + boxes[:, 2:]
+        inter = np.clip(np.minimum(maxs[:, None], box_maxs[None]) - np.maximum(mins[:, None], box_mins[None]), 0, None)
+        inter_area = inter[..., 0] * inter[..., 1]
+        mesh_area = np.prod(maxs - mins, axis=1)
+        box_area = np.prod(boxes[:, 2:], axis=1)
+        iou = inter_area / (mesh_area[:, None] + box_area[None] - inter_area + 1e-6)
+        
+        # Greedy one-to-one assignment, best overlap first
+        while iou.size and iou.max() >= min_iou:
+            mesh_idx, face_idx = np.unravel_index(int(np.argmax(iou)), iou.shape)
+            x, y, bw, bh = boxes[face_idx]
+            points = (landmark_sets[mesh_idx] - (x, y, 0.0)) / (bw, bh, bw)
+            encodings[face_idx] = points.astype(np.float32).reshape(-1)
+            iou[mesh_idx, :] = -1.0
+            iou[:, face_idx] = -1.0
+        
+        return encodings
+    
     def _load_encodings_from_file(self):
         """
-        Load person encodings from pickle file
+        Load person encodings from the memory-mapped binary store
+        
+        An encodings.pkl newer than the store is migrated to it once.
         """
-        if not self.encodings_file.exists():
-            print("⚠️  No encodings file found")
-            print(f"   Looking for: {self.encodings_file.absolute()}")
-            print("   💡 Run DatasetManager.generate_encodings() first")
-            return
+        if self.encodings_file.exists() and self.encodings_file.stat().st_mtime > self.encoding_store.mtime():
+            try:
+                self.encoding_store.migrate_from_pickle(self.encodings_file)
+            except Exception as e:
+                print(f"⚠️  Could not migrate {self.encodings_file.name} to binary store: {e}")
         
         try:
-            with open(self.encodings_file, 'rb') as f:
-                data = pickle.load(f)
-            
-            self.known_encodings = [np.array(enc) for enc in data["encodings"]]
-            self.known_names = data["names"]
-            self.known_metadata = data.get("metadata", [])
-            
-            print(f"✅ Loaded {len(self.known_names)} encodings from file")
-            print(f"   Model: {data.get('model', 'Unknown')}")
-            print(f"   Generated: {data.get('generated_at', 'Unknown')}\n")
-            
+            data = self.encoding_store.load(mmap=True)
+            if data is None and self.encodings_file.exists():
+                data = self._load_encodings_from_pickle()
         except Exception as e:
             print(f"⚠️  Warning: Could not load encodings from file: {e}")
             print("   Encodings will be generated on first use")
+            return
+        
+        if data is None:
+            print("⚠️  No encodings file found")
+            print(f"   Looking for: {self.encoding_store.matrix_file.absolute()}")
+            print("   💡 Run DatasetManager.generate_encodings() first")
+            return
+        
+        # Gallery rows are already L2-normalized float32, used in place (no copy)
+        known_matrix = data["matrix"]
+        
+        index_params = dict(self.index_params)
+        if self.index_type == 'prototype':
+            # Two-stage matching: shortlist by person prototype, re-rank raw encodings
+            index_params.update(
+                labels=data["label_codes"],
+                prototypes=data.get("prototypes"),
+                prototype_labels=data.get("prototype_codes")
+            )
+        
+        gallery_index = load_or_build_index(
+            known_matrix,
+            index_path=self.index_file,
+            source_file=self.encoding_store.meta_file if self.encoding_store.exists() else self.encodings_file,
+            index_type=self.index_type,
+            **index_params
+        ) if len(known_matrix) > 0 else None
+        
+        # Publish the new gallery in one assignment (other threads may be matching)
+        self.gallery = Gallery(known_matrix, data["names"], data["metadata"], gallery_index)
+        
+        print(f"✅ Loaded {len(self.known_names)} encodings from file")
+        print(f"   Model: {data.get('model') or 'Unknown'}")
+        print(f"   Generated: {data.get('generated_at') or 'Unknown'}\n")
     
-    def reload_encodings(self):
+    def _load_encodings_from_pickle(self) -> Dict:
         """
-        Reload encodings from file (useful after adding new persons)
+        Load legacy encodings.pkl into memory (used when migration is not possible)
         """
-        print("🔄 Reloading encodings...")
-        self._load_encodings_from_file()
+        with open(self.encodings_file, 'rb') as f:
+            data = pickle.load(f)
+        
+        return {
+            "matrix": self._build_gallery_matrix(data["encodings"]),
+            "names": data["names"],
+            "metadata": data.get("metadata", []),
+            "label_codes": data["names"],
+            "prototypes": data.get("prototypes"),
+            "prototype_codes": data.get("prototype_names"),
+            "model": data.get("model"),
+            "generated_at": data.get("generated_at")
+        }
     
-    def recognize_faces(self, image: np.ndarray, return_frames: bool = False) -> List[Dict]:
+    @staticmethod
+    def _build_gallery_matrix(encodings: List[np.ndarray]) -> np.ndarray:
         """
-        Recognize faces in an image using MediaPipe or Teachable Machine
+        Stack known encodings into one contiguous, L2-normalized float32 matrix
         
         Args:
-            image: Input image (BGR format from cv2)
-            return_frames: If True, return cropped face images
+            encodings: List of 1-D face encodings
             
         Returns:
-            List of recognition results
+            Matrix of shape (num_encodings, encoding_dim)
         """
-        start_time = time.time()
-        results = []
+        if len(encodings) == 0:
+            return np.zeros((0, 0), dtype=np.float32)
         
-        if image is None or image.size == 0:
-            return results
+        return normalize_rows(encodings)
+    
+    def _match_encoding(self, face_encoding: np.ndarray) -> Tuple[Optional[int], float]:
+        """
+        Find the closest known encoding using cosine distance
         
-        # Use Teachable Machine if enabled
-        if self.use_teachable_machine and self.teachable_recognizer is not None:
-            return self._recognize_faces_teachable_machine(image, return_frames)
+        Args:
+            face_encoding: Face encoding to match (1404-d)
+            
+        Returns:
+            Tuple of (best_index, best_distance) or (None, inf) if gallery is empty
+        """
+        best_match, best_distance, _ = self.match_encodings_batch([face_encoding])[0]
+        return best_match, best_distance
+    
+    def match_encodings_batch(self, face_encodings: List[np.ndarray],
+                              gallery: Gallery = None) -> List[Tuple[Optional[int], float, float]]:
+        """
+        Match many face encodings against the gallery in one matrix-matrix product
         
-        # Otherwise use MediaPipe encoding method
-        # Check if we have loaded encodings
-        if len(self.known_encodings) == 0:
-            return results
+        Args:
+            face_encodings: List of face encodings (1404-d each)
+            gallery: Snapshot to match against (default: the current one); pass
+                the snapshot whose names / metadata the indices will be looked up in
+            
+        Returns:
+            List of (best_index, distance, confidence) per encoding.
+            best_index is None if the gallery is empty; confidence is 0.0
+            when the distance is outside tolerance.
+        """
+        if len(face_encodings) == 0:
+            return []
+        
+        index = (self.gallery if gallery is None else gallery).index
+        if index is None or len(index) == 0:
+            return [(None, float('inf'), 0.0) for _ in face_encodings]
         
-        # Convert BGR to RGB for MediaPipe
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        # All faces scored against the gallery index in one call
+        best_matches, best_distances = index.search(face_encodings, k=1)
+        
+        matches = []
+        for best_match, best_distance in zip(best_matches[:, 0], best_distances[:, 0]):
+            if best_match < 0:
+                matches.append((None, float('inf'), 0.0))
+                continue
+            
+            best_distance = float(best_distance)
+            if best_distance <= self.tolerance:
+                confidence = max(0.0, min(1.0, 1.0 - (best_distance / self.tolerance)))
+            else:
+                confidence = 0.0
+            matches.append((int(best_match), best_distance, confidence))
+        
+        return matches
+    
+    def _detect_face_rois(self, image: np.ndarray) -> List[Tuple[Tuple[int, int, int, int], np.ndarray]]:
+        """
+        Detect faces with MediaPipe and crop them from the image
+        
+        Args:
+            image: Input image (BGR format from cv2)
+            
+        Returns:
+            List of (bbox, face_roi) tuples with bbox as (x, y, w, h)
+        """
+        faces = []
+        
+        # Detect on a downscaled RGB copy; MediaPipe boxes are relative, so they
+        # map back to the full-resolution frame the ROIs are cropped from
+        rgb_image, _ = prepare_detection_input(image, self.max_detection_size)
         h, w = image.shape[:2]
         
-        # Step 1: Detect faces with MediaPipe
         detection_results = self.face_detection.process(rgb_image)
         
         if not detection_results.detections:
-            return results
+            return faces
         
-        # Step 2: Process each detected face
         for detection in detection_results.detections:
             # Get bounding box
             bbox = detection.location_data.relative_bounding_box
@@ -323,75 +701,315 @@ class RecognitionService:
             if face_roi.size == 0:
                 continue
             
-            # Generate encoding using MediaPipe landmarks
-            face_encoding = self._extract_face_encoding_mediapipe(face_roi)
+            faces.append(((x, y, width, height), face_roi))
+        
+        return faces
+    
+    def detect_faces(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Detect faces without recognizing them (safe to call from any thread)
+        
+        Args:
+            image: Input image (BGR format from cv2)
             
-            if face_encoding is None:
+        Returns:
+            List of bounding boxes as (x, y, w, h)
+        """
+        if image is None or image.size == 0:
+            return []
+        return [bbox for bbox, _ in self._detect_face_rois(image)]
+    
+    def _match_faces(self, faces: List[Tuple[Tuple[int, int, int, int], np.ndarray]],
+                     face_encodings: List[Optional[np.ndarray]],
+                     return_frames: bool = False) -> List[Dict]:
+        """
+        Match encoded faces against the gallery and build result dicts
+        
+        Args:
+            faces: List of (bbox, face_roi) tuples
+            face_encodings: Encoding per face (None if encoding failed)
+            return_frames: If True, return cropped face images
+            
+        Returns:
+            List of recognition results, in the same order as faces
+        """
+        gallery = self.gallery  # one snapshot for indices, names and metadata
+        encoded_indices = [i for i, enc in enumerate(face_encodings) if enc is not None]
+        matches = self.match_encodings_batch([face_encodings[i] for i in encoded_indices], gallery)
+        match_by_face = dict(zip(encoded_indices, matches))
+        
+        results = []
+        for i, (bbox, face_roi) in enumerate(faces):
+            if i not in match_by_face:
                 results.append({
                     'name': 'Unknown',
                     'confidence': 0.0,
-                    'bbox': (x, y, width, height),
+                    'bbox': bbox,
                     'metadata': {},
                     'face_image': face_roi if return_frames else None
                 })
                 continue
             
-            # Compare with known encodings using cosine similarity
-            best_match = None
-            best_distance = float('inf')
-            
-            for idx, known_encoding in enumerate(self.known_encodings):
-                # Normalize vectors for cosine similarity
-                face_norm = face_encoding / (np.linalg.norm(face_encoding) + 1e-6)
-                known_norm = known_encoding / (np.linalg.norm(known_encoding) + 1e-6)
-                
-                # Cosine distance = 1 - cosine similarity
-                similarity = np.dot(face_norm, known_norm)
-                distance = 1.0 - similarity
-                
-                if distance < best_distance:
-                    best_distance = distance
-                    best_match = idx
+            best_match, best_distance, confidence = match_by_face[i]
             
             # Check if match is within tolerance
             if best_match is not None and best_distance <= self.tolerance:
-                confidence = 1.0 - (best_distance / self.tolerance)
-                confidence = max(0.0, min(1.0, confidence))
-                
                 result = {
-                    'name': self.known_names[best_match],
+                    'name': gallery.names[best_match],
                     'confidence': confidence,
                     'distance': best_distance,
-                    'bbox': (x, y, width, height),
-                    'metadata': self.known_metadata[best_match] if best_match < len(self.known_metadata) else {},
+                    'bbox': bbox,
+                    'metadata': gallery.metadata[best_match] if best_match < len(gallery.metadata) else {},
                     'face_image': face_roi if return_frames else None
                 }
                 
-                self.stats['total_recognized'] += 1
+                self._stats.add('total_recognized')
             else:
                 result = {
                     'name': 'Unknown',
                     'confidence': 0.0,
-                    'distance': best_distance if best_match is not None else float('inf'),
-                    'bbox': (x, y, width, height),
+                    'distance': best_distance,
+                    'bbox': bbox,
                     'metadata': {},
                     'face_image': face_roi if return_frames else None
                 }
                 
-                self.stats['total_unknown'] += 1
+                self._stats.add('total_unknown')
             
             results.append(result)
         
-        # Update stats
-        processing_time = time.time() - start_time
-        self.stats['total_processed'] += len(results)
+        return results
+    
+    def _update_processing_stats(self, num_results: int, processing_time: float):
+        """Update processed count and processing time (average computed in stats)"""
+        self._stats.add('total_processed', num_results)
+        self._stats.add('processing_time', processing_time)
+    
+    def warm_up(self, frame_shape: Tuple[int, int, int] = (480, 640, 3)) -> float:
+        """
+        Run the MediaPipe graphs once on a blank frame
+        
+        The first process() call of a graph allocates its buffers; doing it here
+        keeps that stall away from the first live frame. The graphs belong to
+        the calling thread; release_thread_resources() hands them to the next
+        new thread (e.g. a pipeline's inference thread).
+        
+        Args:
+            frame_shape: Shape of the camera frames
+            
+        Returns:
+            Warm-up time in seconds
+        """
+        start_time = time.time()
+        frame = np.zeros(frame_shape, dtype=np.uint8)
+        
+        self._detect_face_rois(frame)
+        if hasattr(self, '_mesh_pool'):
+            self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        
+        return time.time() - start_time
+    
+    def release_thread_resources(self):
+        """
+        Give the calling thread's graphs / interpreter back to their pools
+        
+        Call from a loader thread after warm_up() so the next new thread takes
+        over the warmed-up instances without waiting for the loader to exit.
+        """
+        self._detection_pool.release()
+        if hasattr(self, '_mesh_pool'):
+            self._mesh_pool.release()
+            self._crop_mesh_pool.release()
+        if self.teachable_recognizer is not None:
+            self.teachable_recognizer.release_thread_resources()
+    
+    def reload_encodings(self):
+        """
+        Reload encodings from file (useful after adding new persons)
+        """
+        print("🔄 Reloading encodings...")
+        self._load_encodings_from_file()
+    
+    def recognize_faces(self, image: np.ndarray, return_frames: bool = False) -> List[Dict]:
+        """
+        Recognize faces in an image using MediaPipe or Teachable Machine
         
-        if self.stats['total_processed'] > 0:
-            old_avg = self.stats['avg_processing_time']
-            self.stats['avg_processing_time'] = (old_avg * (self.stats['total_processed'] - len(results)) + processing_time) / self.stats['total_processed']
+        Args:
+            image: Input image (BGR format from cv2)
+            return_frames: If True, return cropped face images
+            
+        Returns:
+            List of recognition results
+        """
+        start_time = time.time()
+        results = []
+        
+        if image is None or image.size == 0:
+            return results
+        
+        # Use Teachable Machine if enabled
+        if self.use_teachable_machine and self.teachable_recognizer is not None:
+            return self._recognize_faces_teachable_machine(image, return_frames)
+        
+        # Otherwise use MediaPipe encoding method
+        # Check if we have loaded encodings
+        if len(self.known_encodings) == 0:
+            return results
+        
+        # Step 1: Detect faces with MediaPipe
+        faces = self._detect_face_rois(image)
+        
+        if not faces:
+            return results
+        
+        # Step 2: Generate encodings using MediaPipe landmarks
+        face_encodings = self._encode_faces(image, faces)
+        
+        # Step 3: Match every face in the frame against the gallery at once
+        results = self._match_faces(faces, face_encodings, return_frames)
+        
+        # Update stats
+        self._update_processing_stats(len(results), time.time() - start_time)
         
         return results
     
+    def track_faces(self, image: np.ndarray, return_frames: bool = False,
+                    stream_id: str = "default") -> List[Dict]:
+        """
+        Recognize faces in a video stream with frame skipping and identity caching
+        
+        Detection runs every frame_skip frames; in between, the boxes are moved by
+        a template tracker. On detection frames only faces whose track has no
+        confirmed identity, is due for periodic re-verification or whose crop
+        changed are recognized; the others reuse their cached identity.
+        
+        Args:
+            image: Input frame (BGR format from cv2)
+            return_frames: If True, return cropped face images
+            stream_id: Video source key; each stream has its own tracks and should
+                be fed from one thread
+            
+        Returns:
+            List of recognition results, each with a 'track_id'
+        """
+        if image is None or image.size == 0:
+            return []
+        
+        # MediaPipe mode without gallery: nothing to recognize (same as recognize_faces)
+        if not (self.use_teachable_machine and self.teachable_recognizer is not None) \
+                and len(self.known_encodings) == 0:
+            return []
+        
+        tracker = self.trackers.get(stream_id)
+        if tracker is None:
+            tracker = self.trackers.setdefault(stream_id, FaceTracker())
+        
+        if tracker.frame_index % self.frame_skip == 0:
+            start_time = time.time()
+            faces = self._detect_face_rois(image)
+            tracks = tracker.update(image, [(bbox, None) for bbox, _ in faces])
+            
+            # Recognize only faces without a valid cached identity
+            pending = [i for i, track in enumerate(tracks) if tracker.needs_recognition(track, start_time)]
+            if pending:
+                results = self._recognize_face_rois(image, [faces[i] for i in pending], return_frames)
+                for i, result in zip(pending, results):
+                    tracker.record_recognition(tracks[i], result, start_time)
+                self._update_processing_stats(len(results), time.time() - start_time)
+            self._stats.add('identity_cache_hits', len(tracks) - len(pending))
+        else:
+            tracks = tracker.propagate(image)
+        
+        tracked_results = []
+        for track in tracks:
+            result = dict(track.result, bbox=track.bbox, track_id=track.track_id, face_image=None)
+            if return_frames:
+                x, y, w, h = track.bbox
+                result['face_image'] = image[max(0, y):y+h, max(0, x):x+w]
+            tracked_results.append(result)
+        
+        return tracked_results
+    
+    def set_teachable_recognizer(self, recognizer) -> bool:
+        """
+        Switch to another Teachable Machine model without stopping the camera
+        
+        The recognizer reference is swapped in one assignment: a frame being
+        classified finishes with the old model, the next one uses the new model.
+        Tracked identities of the old model are dropped.
+        
+        Args:
+            recognizer: Loaded TeachableMachineRecognizer
+            
+        Returns:
+            True if switched, False if the service is not in Teachable Machine mode
+        """
+        if not self.use_teachable_machine or self.teachable_recognizer is None or recognizer is None:
+            return False
+        
+        self.teachable_recognizer = recognizer
+        self.reset_tracking()
+        return True
+    
+    def reset_tracking(self, stream_id: str = None):
+        """
+        Drop tracked faces (e.g. when a camera is stopped)
+        
+        Args:
+            stream_id: Stream to reset (None = all streams)
+        """
+        if stream_id is None:
+            self.trackers.clear()
+        else:
+            self.trackers.pop(stream_id, None)
+    
+    def recognize_faces_batch(self, images: List[np.ndarray], return_frames: bool = False) -> List[List[Dict]]:
+        """
+        Recognize faces in several frames, matching all faces in one call
+        
+        Args:
+            images: List of input images (BGR format from cv2)
+            return_frames: If True, return cropped face images
+            
+        Returns:
+            List of recognition results per image
+        """
+        start_time = time.time()
+        batch_results = [[] for _ in images]
+        teachable = self.use_teachable_machine and self.teachable_recognizer is not None
+        
+        if not teachable and len(self.known_encodings) == 0:
+            return batch_results
+        
+        # Detect and encode faces of every frame, remembering which frame they came from
+        all_faces = []
+        all_encodings = []
+        frame_indices = []
+        for frame_idx, image in enumerate(images):
+            if image is None or image.size == 0:
+                continue
+            
+            faces = self._detect_face_rois(image)
+            all_faces.extend(faces)
+            if not teachable:
+                all_encodings.extend(self._encode_faces(image, faces))
+            frame_indices.extend([frame_idx] * len(faces))
+        
+        if not all_faces:
+            return batch_results
+        
+        # Single gallery match / batched classification for all faces across all frames
+        if teachable:
+            all_results = self._match_faces_teachable_machine(all_faces, return_frames)
+        else:
+            all_results = self._match_faces(all_faces, all_encodings, return_frames)
+        for frame_idx, result in zip(frame_indices, all_results):
+            batch_results[frame_idx].append(result)
+        
+        self._update_processing_stats(len(all_results), time.time() - start_time)
+        
+        return batch_results
+    
     def recognize_from_file(self, image_path: str) -> List[Dict]:
         """
         Recognize faces from image file
@@ -535,8 +1153,10 @@ class RecognitionService:
             **self.stats,
             'known_persons': len(set(self.known_names)),
             'known_encodings': len(self.known_encodings),
+            'index_type': self.index_type,
+            'model_ready': self.teachable_recognizer.ready if self.teachable_recognizer else True,
             'dataset_path': str(self.dataset_path.absolute()),
-            'encodings_file': str(self.encodings_file)
+            'encodings_file': str(self.encoding_store.matrix_file)
         }
     
     def save_log(self, results: List[Dict], log_file: str = "logs/recognition_log.json"):
@@ -4,16 +4,134 @@ Week 8 Final Project - Teachable Machine Integration
 
 This module provides face recognition using Teachable Machine Keras models.
 Integrates custom trained models from Google Teachable Machine platform.
+
+Two inference backends:
+- keras: compiled tf.function over the Keras model
+- tflite: TFLite interpreter (XNNPACK on CPU), converted once from the .h5
+  and cached next to it in the model folder
+
+Post-training quantized TFLite variants (dynamic-range, float16, full-int8)
+are loaded the same way as the plain TFLite model.
 """
 
 import numpy as np
 import cv2
 import os
+import threading
+import time
 from typing import List, Tuple, Optional, Dict
 from pathlib import Path
 import tensorflow as tf
 from tensorflow import keras
 
+try:
+    from .concurrency import PerThreadPool
+except ImportError:
+    # Fallback for direct execution
+    from concurrency import PerThreadPool
+
+# Inference backends supported by TeachableMachineRecognizer
+BACKENDS = ("keras", "tflite")
+
+# Post-training quantization variants of the TFLite model
+QUANTIZATION_VARIANTS = ("dynamic", "float16", "int8")
+
+# Model input size (standard Teachable Machine format)
+INPUT_SIZE = (224, 224)
+
+
+def preprocess_into(image: np.ndarray, out: np.ndarray, input_size: Tuple[int, int] = INPUT_SIZE):
+    """
+    Preprocess one BGR image into a slot of a float32 batch tensor
+    
+    Args:
+        image: Input image (BGR format from OpenCV)
+        out: float32 array of shape (224, 224, 3) to write into
+        input_size: Model input size (width, height)
+    """
+    # Resize to model input size (224x224), then convert BGR to RGB
+    resized = cv2.resize(image, input_size, interpolation=cv2.INTER_AREA)
+    rgb_image = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+    
+    # Normalize to [0, 1] range directly into the batch slot
+    np.multiply(rgb_image, np.float32(1.0 / 255.0), out=out)
+
+
+def tflite_model_path(model_path: str, variant: str = None) -> Path:
+    """
+    Cache location of the TFLite conversion of a Keras model
+    
+    Args:
+        model_path: Path to keras_model.h5
+        variant: Quantization variant (None = unquantized float32)
+        
+    Returns:
+        Path of the .tflite file in the same folder
+    """
+    model_path = Path(model_path)
+    if variant:
+        return model_path.with_name(f"{model_path.stem}_{variant}.tflite")
+    return model_path.with_suffix(".tflite")
+
+
+def convert_to_tflite(model_path: str, output_path: str = None, variant: str = None,
+                      calibration_images: List[str] = None) -> Path:
+    """
+    Convert a Keras model to TFLite, reusing the cached file while it is up to date
+    
+    Args:
+        model_path: Path to keras_model.h5
+        output_path: Output .tflite path (default: next to the .h5)
+        variant: None (float32), 'dynamic' (int8 weights), 'float16' (float16 weights)
+            or 'int8' (int8 weights and activations, needs calibration_images)
+        calibration_images: Image files for int8 calibration (representative dataset)
+        
+    Returns:
+        Path to the .tflite file
+    """
+    if variant is not None and variant not in QUANTIZATION_VARIANTS:
+        raise ValueError(f"Unknown quantization variant: {variant}. Use one of {list(QUANTIZATION_VARIANTS)}")
+    if variant == "int8" and not calibration_images:
+        raise ValueError("int8 quantization needs calibration images")
+    
+    model_path = Path(model_path)
+    output_path = Path(output_path) if output_path else tflite_model_path(model_path, variant)
+    
+    if output_path.exists() and output_path.stat().st_mtime >= model_path.stat().st_mtime:
+        return output_path
+    
+    print(f"🔄 Converting {model_path.name} to TFLite ({variant or 'float32'})...")
+    model = keras.models.load_model(model_path, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    
+    if variant is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        def representative_dataset():
+            sample = np.empty((1, *INPUT_SIZE, 3), dtype=np.float32)
+            for image_path in calibration_images:
+                image = cv2.imread(str(image_path))
+                if image is not None:
+                    preprocess_into(image, sample[0])
+                    yield [sample]
+        
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    
+    tflite_model = converter.convert()
+    
+    # Write to a temp file first so a crash never leaves a truncated cache
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    temp_path.write_bytes(tflite_model)
+    os.replace(temp_path, output_path)
+    
+    print(f"✅ TFLite model saved: {output_path} ({len(tflite_model) / 1024 / 1024:.1f} MB)")
+    return output_path
+
 
 class TeachableMachineRecognizer:
     """
@@ -21,23 +139,64 @@ class TeachableMachineRecognizer:
     Supports image classification from Google Teachable Machine
     """
     
-    def __init__(self, model_path: str, labels_path: str, confidence_threshold: float = 0.7):
+    def __init__(self, model_path: str, labels_path: str, confidence_threshold: float = 0.7,
+                 max_batch_size: int = 8, backend: str = "keras", num_threads: int = None,
+                 warmup: bool = True, warmup_batch_sizes: List[int] = None):
         """
         Initialize Teachable Machine recognizer
         
         Args:
-            model_path: Path to keras_model.h5
+            model_path: Path to keras_model.h5 (or to a .tflite file, which implies
+                the tflite backend)
             labels_path: Path to labels.txt
             confidence_threshold: Minimum confidence for recognition (default 0.7)
+            max_batch_size: Maximum faces per forward pass in recognize_faces_batch (default 8)
+            backend: 'keras' or 'tflite' (converted from the .h5 once, cached in the model folder)
+            num_threads: TFLite interpreter threads (None = TFLite default)
+            warmup: Run warm_up() before returning (otherwise ready stays False
+                until warm_up() is called)
+            warmup_batch_sizes: Batch sizes to warm up (default: 1 and max_batch_size;
+                the tflite backend always warms up both of its input shapes)
         """
         self.model_path = Path(model_path)
         self.labels_path = Path(labels_path)
         self.confidence_threshold = confidence_threshold
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.backend = "tflite" if self.model_path.suffix == ".tflite" else backend
+        self.num_threads = num_threads or None
+        self.model = None
+        self.tflite_path = None
+        self.warmup_batch_sizes = sorted({max(1, min(int(size), self.max_batch_size))
+                                          for size in (warmup_batch_sizes or (1, self.max_batch_size))})
+        
+        # Ready state: set by warm_up() once every batch size has run
+        self.ready = False
+        self.warmup_time = None
+        self.warmup_latency = {}
         
-        # Load Keras model
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}. Use one of {list(BACKENDS)}")
+        
+        # TFLite runs single faces at batch size 1 and several faces padded to
+        # max_batch_size: both input shapes stay allocated and are warmed up
+        if self.backend == "tflite":
+            self.warmup_batch_sizes = sorted(set(self.warmup_batch_sizes) | {1, self.max_batch_size})
+        
+        # Per-thread state: batch input tensor and TFLite interpreters by batch size
+        # (those of exited threads are reused, so the warmed-up ones reach the inference thread)
+        self._local = threading.local()
+        self._interpreters = PerThreadPool(dict)
+        
+        # Load model
         try:
-            self.model = keras.models.load_model(self.model_path, compile=False)
-            print(f"✅ Teachable Machine model loaded: {self.model_path}")
+            if self.backend == "tflite":
+                self.tflite_path = self.model_path if self.model_path.suffix == ".tflite" \
+                    else convert_to_tflite(self.model_path)
+                self._tflite_interpreter()
+                print(f"✅ Teachable Machine model loaded (TFLite): {self.tflite_path}")
+            else:
+                self.model = keras.models.load_model(self.model_path, compile=False)
+                print(f"✅ Teachable Machine model loaded: {self.model_path}")
         except Exception as e:
             raise RuntimeError(f"Failed to load model: {e}")
         
@@ -46,12 +205,174 @@ class TeachableMachineRecognizer:
         print(f"✅ Loaded {len(self.class_names)} classes: {', '.join(self.class_names)}")
         
         # Model expects 224x224x3 input (standard Teachable Machine format)
-        self.input_size = (224, 224)
+        self.input_size = INPUT_SIZE
+        
+        # Compiled inference function (replaces model.predict for live frames)
+        self._infer = None
+        if self.model is not None:
+            self._compile_inference()
+        
+        if warmup:
+            self.warm_up()
         
         print(f"✅ TeachableMachineRecognizer initialized")
+        print(f"   Backend: {self.backend}")
         print(f"   Input size: {self.input_size}")
+        print(f"   Max batch size: {self.max_batch_size}")
         print(f"   Confidence threshold: {confidence_threshold}")
     
+    def _compile_inference(self):
+        """
+        Trace the model into a graph function
+        
+        model.predict() builds a data adapter and runs its batch loop on every
+        call; a traced function with a fixed (None, 224, 224, 3) float32 input
+        signature is traced once (see warm_up) and then only executes the forward pass.
+        """
+        try:
+            model = self.model
+            self._infer = tf.function(
+                lambda x: model(x, training=False),
+                input_signature=[tf.TensorSpec([None, *self.input_size, 3], tf.float32)]
+            )
+        except Exception as e:
+            print(f"⚠️  Could not compile inference function, using model.predict: {e}")
+            self._infer = None
+    
+    def _create_tflite_interpreter(self, batch_size: int = 1) -> Tuple[object, Dict, Dict]:
+        """
+        Create and allocate a TFLite interpreter for a fixed input batch size
+        
+        Raises:
+            RuntimeError, ValueError: If the model input cannot be resized
+        """
+        # XNNPACK is the default CPU delegate for float models
+        interpreter = tf.lite.Interpreter(model_path=str(self.tflite_path), num_threads=self.num_threads)
+        if batch_size != 1:
+            input_details = interpreter.get_input_details()[0]
+            interpreter.resize_tensor_input(input_details['index'], [batch_size, *input_details['shape'][1:]])
+        interpreter.allocate_tensors()
+        return (
+            interpreter,
+            interpreter.get_input_details()[0],
+            interpreter.get_output_details()[0]
+        )
+    
+    def _tflite_interpreter(self, batch_size: int = 1) -> Optional[Tuple[object, Dict, Dict]]:
+        """
+        TFLite interpreter of the calling thread for an input batch size
+        
+        Each thread keeps one allocated interpreter per batch size (1 and
+        max_batch_size), so alternating between one and several faces never
+        re-allocates tensors. Interpreters are not thread-safe.
+        
+        Args:
+            batch_size: Input batch size
+        
+        Returns:
+            Tuple of (interpreter, input tensor details, output tensor details),
+            or None if the model input cannot be batched
+        """
+        interpreters = self._interpreters.get()
+        if batch_size not in interpreters:
+            try:
+                interpreters[batch_size] = self._create_tflite_interpreter(batch_size)
+            except (RuntimeError, ValueError) as e:
+                if batch_size == 1:
+                    raise
+                print(f"⚠️  TFLite input cannot be batched, running per sample: {e}")
+                interpreters[batch_size] = None
+        return interpreters[batch_size]
+    
+    def warm_up(self, repeats: int = 2) -> float:
+        """
+        Run dummy batches of every warm-up batch size, then mark the model ready
+        
+        The first forward pass traces the graph (keras) or sets up XNNPACK
+        (tflite) and allocates memory; running it here keeps that stall away from
+        the first person in front of the camera. Each size runs more than once so
+        the recorded latency is the steady-state one.
+        
+        Args:
+            repeats: Forward passes per batch size
+            
+        Returns:
+            Warm-up time in seconds
+        """
+        start_time = time.time()
+        buffer = self._batch_buffer()
+        buffer.fill(0.0)
+        
+        for size in self.warmup_batch_sizes:
+            for _ in range(max(1, repeats)):
+                pass_start = time.time()
+                self._predict(buffer[:size])
+                self.warmup_latency[size] = time.time() - pass_start
+        
+        self.warmup_time = time.time() - start_time
+        self.ready = True
+        
+        latencies = ", ".join(f"batch {size}: {latency * 1000:.0f} ms"
+                              for size, latency in self.warmup_latency.items())
+        print(f"✅ Model warmed up in {self.warmup_time * 1000:.0f} ms ({latencies})")
+        return self.warmup_time
+    
+    def release_thread_resources(self):
+        """Hand the calling thread's TFLite interpreter to the next new thread"""
+        self._interpreters.release()
+    
+    def _predict_tflite(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run the TFLite interpreter on a batch in a single invoke
+        
+        One face runs on the batch-size-1 interpreter; several faces are padded
+        to max_batch_size and run on that interpreter. Models whose input cannot
+        be resized run one invoke per sample.
+        """
+        num_samples = len(batch)
+        batch_size = 1 if num_samples == 1 else self.max_batch_size
+        state = self._tflite_interpreter(batch_size)
+        interpreter, input_details, output_details = state or self._tflite_interpreter(1)
+        
+        # Full-int8 models take and return quantized tensors: q = x / scale + zero_point
+        input_dtype = input_details.get('dtype', np.float32)
+        if input_dtype != np.float32:
+            scale, zero_point = input_details['quantization']
+            info = np.iinfo(input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(input_dtype)
+        
+        if state is not None:
+            interpreter.set_tensor(input_details['index'], self._padded_input(batch, batch_size))
+            interpreter.invoke()
+            outputs = interpreter.get_tensor(output_details['index'])[:num_samples]
+        else:
+            outputs = []
+            for sample in batch:
+                interpreter.set_tensor(input_details['index'], sample[np.newaxis])
+                interpreter.invoke()
+                outputs.append(interpreter.get_tensor(output_details['index'])[0])
+            outputs = np.asarray(outputs)
+        
+        if output_details.get('dtype', np.float32) != np.float32:
+            scale, zero_point = output_details['quantization']
+            outputs = (outputs.astype(np.float32) - zero_point) * scale
+        return outputs.astype(np.float32, copy=False)
+    
+    def _padded_input(self, batch: np.ndarray, batch_size: int) -> np.ndarray:
+        """
+        Batch padded to batch_size rows, in a per-thread buffer
+        
+        Padding rows keep whatever the previous batch left there; their
+        outputs are discarded.
+        """
+        if len(batch) == batch_size:
+            return batch
+        buffer = getattr(self._local, 'tflite_input', None)
+        if buffer is None or buffer.shape[0] != batch_size or buffer.dtype != batch.dtype:
+            buffer = self._local.tflite_input = np.zeros((batch_size, *batch.shape[1:]), dtype=batch.dtype)
+        buffer[:len(batch)] = batch
+        return buffer
+    
     def _load_labels(self) -> List[str]:
         """Load class labels from labels.txt"""
         labels = []
@@ -82,19 +403,53 @@ class TeachableMachineRecognizer:
         Returns:
             Preprocessed image ready for model input
         """
-        # Convert BGR to RGB
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
-        # Resize to model input size (224x224)
-        resized = cv2.resize(rgb_image, self.input_size, interpolation=cv2.INTER_AREA)
+        batch = np.empty((1, *self.input_size, 3), dtype=np.float32)
+        self._preprocess_into(image, batch[0])
+        return batch
+    
+    def _preprocess_into(self, image: np.ndarray, out: np.ndarray):
+        """
+        Preprocess one BGR image into a slot of a batch tensor
         
-        # Normalize to [0, 1] range
-        normalized = resized.astype(np.float32) / 255.0
+        Args:
+            image: Input image (BGR format from OpenCV)
+            out: float32 array of shape (224, 224, 3) to write into
+        """
+        preprocess_into(image, out, self.input_size)
+    
+    def _batch_buffer(self) -> np.ndarray:
+        """Preallocated (max_batch_size, 224, 224, 3) input tensor of the calling thread"""
+        buffer = getattr(self._local, 'batch_buffer', None)
+        if buffer is None:
+            buffer = self._local.batch_buffer = np.empty(
+                (self.max_batch_size, *self.input_size, 3), dtype=np.float32
+            )
+        return buffer
+    
+    def _predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run the model on a preprocessed batch
         
-        # Add batch dimension
-        batch = np.expand_dims(normalized, axis=0)
+        Args:
+            batch: float32 array of shape (N, 224, 224, 3)
+            
+        Returns:
+            Class probabilities of shape (N, num_classes)
+        """
+        if self.backend == "tflite":
+            return self._predict_tflite(batch)
+        if self._infer is not None:
+            return np.asarray(self._infer(batch))
+        return np.asarray(self.model.predict(batch, verbose=0))
+    
+    def _scores_to_result(self, scores: np.ndarray) -> Tuple[Optional[str], float]:
+        """Best class and confidence, or (None, confidence) below the threshold"""
+        class_index = int(np.argmax(scores))
+        confidence = float(scores[class_index])
         
-        return batch
+        if confidence >= self.confidence_threshold:
+            return self.class_names[class_index], confidence
+        return None, confidence
     
     def recognize_face(self, image: np.ndarray, face_location: Tuple[int, int, int, int] = None) -> Tuple[Optional[str], float]:
         """
@@ -123,18 +478,10 @@ class TeachableMachineRecognizer:
             preprocessed = self.preprocess_image(face_crop)
             
             # Run prediction
-            predictions = self.model.predict(preprocessed, verbose=0)
-            
-            # Get class with highest confidence
-            class_index = np.argmax(predictions[0])
-            confidence = float(predictions[0][class_index])
+            predictions = self._predict(preprocessed)
             
-            # Check if confidence meets threshold
-            if confidence >= self.confidence_threshold:
-                person_name = self.class_names[class_index]
-                return person_name, confidence
-            else:
-                return None, confidence
+            # Get class with highest confidence, checked against the threshold
+            return self._scores_to_result(predictions[0])
                 
         except Exception as e:
             print(f"⚠️  Recognition failed: {e}")
@@ -144,16 +491,35 @@ class TeachableMachineRecognizer:
         """
         Recognize multiple faces in batch
         
+        Faces are preprocessed into one preallocated (N, 224, 224, 3) tensor and
+        classified with a single forward pass per max_batch_size faces.
+        
         Args:
             images: List of face images (BGR format)
             
         Returns:
-            List of (person_name, confidence) tuples
+            List of (person_name, confidence) tuples, (None, 0.0) for empty images
         """
-        results = []
-        for image in images:
-            result = self.recognize_face(image)
-            results.append(result)
+        results = [(None, 0.0)] * len(images)
+        valid = [i for i, image in enumerate(images) if image is not None and image.size > 0]
+        buffer = self._batch_buffer()
+        
+        for start in range(0, len(valid), self.max_batch_size):
+            chunk = valid[start:start + self.max_batch_size]
+            batch = buffer[:len(chunk)]
+            
+            try:
+                for slot, i in enumerate(chunk):
+                    self._preprocess_into(images[i], batch[slot])
+                
+                predictions = self._predict(batch)
+            except Exception as e:
+                print(f"⚠️  Batch recognition failed: {e}")
+                continue
+            
+            for i, scores in zip(chunk, predictions):
+                results[i] = self._scores_to_result(scores)
+        
         return results
     
     def get_all_predictions(self, image: np.ndarray, face_location: Tuple[int, int, int, int] = None) -> Dict[str, float]:
@@ -183,7 +549,7 @@ class TeachableMachineRecognizer:
             preprocessed = self.preprocess_image(face_crop)
             
             # Run prediction
-            predictions = self.model.predict(preprocessed, verbose=0)
+            predictions = self._predict(preprocessed)
             
             # Create dictionary of all predictions
             result = {}
@@ -209,6 +575,13 @@ class TeachableMachineRecognizer:
             'num_classes': len(self.class_names),
             'classes': self.class_names,
             'input_size': self.input_size,
+            'backend': self.backend,
+            'tflite_path': str(self.tflite_path) if self.tflite_path else None,
+            'num_threads': self.num_threads,
+            'max_batch_size': self.max_batch_size,
+            'ready': self.ready,
+            'warmup_time': self.warmup_time,
+            'warmup_latency': dict(self.warmup_latency),
             'confidence_threshold': self.confidence_threshold
         }
 
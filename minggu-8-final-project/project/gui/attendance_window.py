@@ -13,6 +13,11 @@ from datetime import datetime
 import threading
 import numpy as np
 
+from core.camera_broker import get_camera_broker
+from core.recognition_pipeline import RecognitionPipeline
+
+# Recognition results computed on a frame older than this (seconds) are not drawn
+MAX_RESULT_AGE = 1.0
 
 
 class AttendanceWindow:
@@ -233,8 +238,10 @@ class AttendanceWindow:
     def start_webcam(self):
         """Start webcam"""
         try:
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
+            # Shared camera: one device handle and capture thread for all windows
+            try:
+                self.cap = get_camera_broker(0).subscribe()
+            except RuntimeError:
                 messagebox.showerror("Webcam Error", "Cannot open webcam")
                 return
             
@@ -245,16 +252,21 @@ class AttendanceWindow:
     
     def update_webcam(self):
         """Update webcam with recognition"""
+        # Recognition runs in the pipeline's inference thread on the newest
+        # frame; this loop draws its latest results on every displayed frame
+        pipeline = RecognitionPipeline(
+            self.main_window.recognition_service, self.cap, stream_id="attendance"
+        ).start()
+        
         while self.webcam_running:
             try:
-                ret, frame = self.cap.read()
+                ret, frame, results = pipeline.read(max_result_age=MAX_RESULT_AGE)
                 if not ret:
                     break
+                frame = frame.copy()  # broker frames are shared and read-only; boxes are drawn on a copy
                 
                 # Face recognition
                 if self.main_window.recognition_service:
-                    results = self.main_window.recognition_service.recognize_faces(frame)
-                    
                     if results and len(results) > 0:
                         # Get first recognized person
                         result = results[0]
@@ -311,11 +323,15 @@ class AttendanceWindow:
                 # Update label
                 self.webcam_label.imgtk = imgtk
                 self.webcam_label.configure(image=imgtk)
-                
-                time.sleep(0.03)
             except Exception as e:
                 print(f"Webcam error: {e}")
                 break
+        
+        # Tracking state is dropped only once the inference thread has stopped
+        # using it (track_faces must not run against a reset tracker)
+        pipeline.stop()
+        if self.main_window.recognition_service:
+            self.main_window.recognition_service.reset_tracking("attendance")
     
     def update_recognition_ui(self, result):
         """Update recognition UI"""
@@ -23,6 +23,9 @@ sys.path.insert(0, str(parent_dir))
 from core.recognition_service import RecognitionService
 from core.attendance_system import AttendanceSystem
 from core.model_manager import ModelManager
+from core.encoding_store import EncodingStore
+from core.camera_broker import get_camera_broker
+from core.recognition_pipeline import RecognitionPipeline
 
 # Import configuration
 try:
@@ -33,6 +36,18 @@ except ImportError:
     print("⚠️  Config module not available, using default settings")
 
 
+# Background service initialization stages (shown in the status bar)
+INIT_STAGES = (
+    "Scanning models",
+    "Loading recognition engine",
+    "Warming up recognition engine",
+    "Opening attendance log"
+)
+
+# Recognition results computed on a frame older than this (seconds) are not drawn
+MAX_RESULT_AGE = 1.0
+
+
 class MainWindow:
     """Main application window"""
     
@@ -48,10 +63,17 @@ class MainWindow:
         self.root.bind("<F11>", self.toggle_fullscreen)
         self.root.bind("<Escape>", self.exit_fullscreen)
         
-        # Backend services
+        # Backend services (built in the background, see initialize_services)
         self.recognition_service = None
         self.attendance_system = None
-        self.initialize_services()
+        self.services_ready = False
+        self.pipeline = None
+        self.teachable_options = {}  # recognizer settings, reused when switching models
+        self.preload_next_model = True
+        
+        # Initialize model manager (ensure correct path)
+        models_path = Path(__file__).parent.parent / "models"
+        self.model_manager = ModelManager(str(models_path))
         
         # Webcam
         self.cap = None
@@ -62,22 +84,34 @@ class MainWindow:
         self.create_menu()
         self.create_ui()
         
-        # Start webcam
+        # Start webcam: preview shows frames while the services are loading
         self.start_webcam()
+        
+        # Load models and services without blocking the Tk thread
+        self.init_thread = threading.Thread(target=self.initialize_services, daemon=True)
+        self.init_thread.start()
+    
+    def report_init_progress(self, stage: str):
+        """Show a service initialization stage (called from the init thread)"""
+        index = INIT_STAGES.index(stage) + 1
+        print(f"⏳ [{index}/{len(INIT_STAGES)}] {stage}...")
+        self.root.after(0, lambda: self._show_init_progress(stage, index))
+    
+    def _show_init_progress(self, stage: str, index: int):
+        """Update status bar and log with an initialization stage"""
+        self.status_bar.config(text=f"Loading ({index}/{len(INIT_STAGES)}): {stage}... | Webcam: Active")
+        self.log_message(f"{stage}...")
     
     def initialize_services(self):
-        """Initialize backend services"""
+        """Initialize backend services (runs in a background thread)"""
         try:
             # Set paths relative to project folder (not global root)
             project_root = Path(__file__).parent.parent
             dataset_path = project_root / "dataset"
             dataset_path.mkdir(exist_ok=True)
             
-            # Initialize model manager (ensure correct path)
-            models_path = Path(__file__).parent.parent / "models"
-            self.model_manager = ModelManager(str(models_path))
-            
             # Debug: list available models
+            self.report_init_progress("Scanning models")
             available_models = self.model_manager.list_models()
             print(f"📦 Found {len(available_models)} Teachable Machine model(s)")
             for model in available_models:
@@ -86,45 +120,187 @@ class MainWindow:
             # Load configuration
             use_teachable = True
             teachable_conf = 0.7
+            teachable_batch_size = 8
+            teachable_backend = "keras"
+            teachable_num_threads = None
+            teachable_variant = None
+            teachable_warmup = True
+            max_detection_size = 640
+            frame_skip = 1
+            service_kwargs = {}
             
             if CONFIG_AVAILABLE:
                 config = Config()
                 use_teachable = config.recognition.use_teachable_machine
                 teachable_conf = config.recognition.teachable_confidence
+                teachable_batch_size = config.recognition.teachable_batch_size
+                teachable_backend = config.recognition.teachable_backend
+                teachable_num_threads = config.recognition.teachable_num_threads or None
+                teachable_variant = config.recognition.teachable_variant or None
+                teachable_warmup = config.recognition.teachable_warmup
+                self.preload_next_model = config.performance.preload_next_model
+                self.model_manager.set_cache_limits(config.performance.model_cache_size,
+                                                    config.performance.model_cache_memory_mb)
+                max_detection_size = config.performance.max_detection_size
+                frame_skip = config.performance.frame_skip
+                index_params = {}
+                if config.recognition.index_type == 'ivf':
+                    index_params = {'n_probe': config.recognition.index_n_probe}
+                elif config.recognition.index_type == 'prototype':
+                    index_params = {'shortlist_k': config.recognition.index_shortlist_k}
+                service_kwargs = {
+                    'index_type': config.recognition.index_type,
+                    'index_params': index_params,
+                    'mesh_mode': config.recognition.mesh_mode
+                }
+            service_kwargs['max_detection_size'] = max_detection_size
+            service_kwargs['frame_skip'] = frame_skip
+            self.teachable_options = {
+                'backend': teachable_backend,
+                'variant': teachable_variant,
+                'confidence_threshold': teachable_conf,
+                'max_batch_size': teachable_batch_size,
+                'num_threads': teachable_num_threads,
+                'warmup': teachable_warmup
+            }
             
             # Get active model from model manager
+            self.report_init_progress("Loading recognition engine")
             if use_teachable:
                 active_model = self.model_manager.get_active_model()
                 
                 if active_model:
-                    model_paths = self.model_manager.get_model_path(active_model['id'])
-                    if model_paths:
+                    # Loaded through the model cache so switching back to it is instant
+                    recognizer = self.load_teachable_recognizer(active_model['id'])
+                    if recognizer:
                         print(f"🎓 Using Teachable Machine model: {active_model['name']}")
-                        self.recognition_service = RecognitionService(
+                        recognition_service = RecognitionService(
                             dataset_path=str(dataset_path),
                             use_teachable_machine=True,
-                            teachable_model_path=model_paths[0],
-                            teachable_labels_path=model_paths[1],
-                            teachable_confidence=teachable_conf
+                            teachable_recognizer=recognizer,
+                            max_detection_size=max_detection_size,
+                            frame_skip=frame_skip
                         )
                     else:
-                        print("⚠️  Model files not found, using MediaPipe")
-                        self.recognition_service = RecognitionService(dataset_path=str(dataset_path))
+                        print("⚠️  Model could not be loaded, using MediaPipe")
+                        recognition_service = RecognitionService(dataset_path=str(dataset_path), **service_kwargs)
                 else:
                     print("⚠️  No Teachable Machine models found, using MediaPipe")
-                    self.recognition_service = RecognitionService(dataset_path=str(dataset_path))
+                    recognition_service = RecognitionService(dataset_path=str(dataset_path), **service_kwargs)
             else:
                 # Use MediaPipe mode
-                self.recognition_service = RecognitionService(dataset_path=str(dataset_path))
+                recognition_service = RecognitionService(dataset_path=str(dataset_path), **service_kwargs)
+            
+            # First detection / mesh pass allocates the graphs: pay it before going live
+            self.report_init_progress("Warming up recognition engine")
+            warm_up_time = recognition_service.warm_up()
+            print(f"✅ Recognition engine warm ({warm_up_time * 1000:.0f} ms)")
             
             # Set log_dir relative to project folder
+            self.report_init_progress("Opening attendance log")
             log_dir = project_root / "logs"
-            self.attendance_system = AttendanceSystem(dataset_path=str(dataset_path), log_dir=str(log_dir))
+            attendance_system = AttendanceSystem(
+                dataset_path=str(dataset_path),
+                log_dir=str(log_dir),
+                recognition_service=recognition_service  # one engine for the whole app
+            )
             
             print("✅ Services initialized")
+            if recognition_service.teachable_recognizer is not None and self.preload_next_model:
+                self.model_manager.preload(**self.teachable_options)
+            
+            # Warmed-up graphs go to the pipeline's inference thread (this thread is done with them)
+            recognition_service.release_thread_resources()
+            self.root.after(0, lambda: self.on_services_ready(recognition_service, attendance_system))
         except Exception as e:
-            messagebox.showerror("Initialization Error", f"Failed to initialize: {str(e)}")
             print(f"Error details: {e}")
+            error = str(e)
+            self.root.after(0, lambda: self.on_services_failed(error))
+    
+    def on_services_ready(self, recognition_service, attendance_system):
+        """Switch the UI to ready state once the engine is warm (Tk thread)"""
+        self.recognition_service = recognition_service
+        self.attendance_system = attendance_system
+        self.services_ready = True
+        
+        # Recognition overlays switch on in the running preview
+        if self.pipeline is not None:
+            self.pipeline.set_recognition_service(recognition_service)
+        
+        for button in self.action_buttons:
+            button.config(state=tk.NORMAL)
+        self.status_bar.config(text="Ready | Webcam: Active | Dataset: Loaded")
+        self.log_message("System initialized successfully")
+        if recognition_service.teachable_recognizer is not None:
+            model_info = recognition_service.teachable_recognizer.get_model_info()
+            if model_info['ready']:
+                self.log_message(f"Model warm-up: {model_info['warmup_time'] * 1000:.0f} ms")
+            else:
+                self.log_message("Model warm-up disabled: first recognition may be slow")
+        self.log_message("Ready for operations")
+        self.refresh_stats()
+    
+    def load_teachable_recognizer(self, model_id: str):
+        """
+        Get a Teachable Machine recognizer from the model cache (loads on a miss)
+        
+        Args:
+            model_id: Model identifier
+            
+        Returns:
+            TeachableMachineRecognizer or None if the model could not be loaded
+        """
+        try:
+            return self.model_manager.get_recognizer(model_id, **self.teachable_options)
+        except Exception as e:
+            print(f"⚠️  Failed to load Teachable Machine model {model_id}: {e}")
+            return None
+    
+    def switch_model(self, model_id: str) -> bool:
+        """
+        Switch the running recognition service to another model
+        
+        The model is loaded in the background (instant if cached); the camera
+        keeps running on the current model until the swap.
+        
+        Args:
+            model_id: Model identifier
+            
+        Returns:
+            True if a switch was started, False if a restart is needed
+            (services still loading or MediaPipe mode)
+        """
+        service = self.recognition_service
+        if service is None or service.teachable_recognizer is None:
+            return False
+        
+        self.log_message(f"Switching model: {model_id}...")
+        
+        def load():
+            recognizer = self.load_teachable_recognizer(model_id)
+            if recognizer is not None:
+                recognizer.release_thread_resources()
+            self.root.after(0, lambda: self.on_model_loaded(model_id, recognizer))
+        
+        threading.Thread(target=load, name=f"switch-{model_id}", daemon=True).start()
+        return True
+    
+    def on_model_loaded(self, model_id: str, recognizer):
+        """Swap in a loaded model (Tk thread)"""
+        if recognizer is None or not self.recognition_service.set_teachable_recognizer(recognizer):
+            self.log_message(f"Could not switch to model {model_id}")
+            return
+        
+        cache_info = self.model_manager.get_cache_info()
+        self.log_message(f"Model switched: {model_id} ({len(cache_info['models'])} model(s) cached)")
+        if self.preload_next_model:
+            self.model_manager.preload(**self.teachable_options)
+    
+    def on_services_failed(self, error: str):
+        """Report a service initialization error (Tk thread)"""
+        self.status_bar.config(text="Initialization failed | Webcam: Active")
+        self.log_message(f"Initialization failed: {error}")
+        messagebox.showerror("Initialization Error", f"Failed to initialize: {error}")
     
     def create_menu(self):
         """Create menu bar"""
@@ -207,7 +383,7 @@ class MainWindow:
         # Bottom status bar
         self.status_bar = tk.Label(
             self.root,
-            text="Ready | Webcam: Active | Dataset: Loaded",
+            text="Starting... | Webcam: Active",
             bd=1,
             relief=tk.SUNKEN,
             anchor=tk.W
@@ -262,8 +438,10 @@ class MainWindow:
             ("📊 View Reports", self.open_reports, "#FF9800"),
         ]
         
+        # Enabled once the services are loaded (on_services_ready)
+        self.action_buttons = []
         for text, command, color in buttons:
-            tk.Button(
+            button = tk.Button(
                 btn_frame,
                 text=text,
                 command=command,
@@ -274,8 +452,11 @@ class MainWindow:
                 fg="white",
                 cursor="hand2",
                 relief=tk.RAISED,
-                bd=2
-            ).pack(pady=5)
+                bd=2,
+                state=tk.DISABLED
+            )
+            button.pack(pady=5)
+            self.action_buttons.append(button)
     
     def create_status_frame(self, parent):
         """Create status info frame"""
@@ -300,15 +481,15 @@ class MainWindow:
         )
         self.status_text.pack(fill=tk.BOTH, expand=True)
         
-        self.log_message("System initialized successfully")
-        self.log_message("Webcam started")
-        self.log_message("Ready for operations")
+        self.log_message("Loading services in background")
     
     def start_webcam(self):
         """Start webcam preview"""
         try:
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
+            # Shared camera: one device handle and capture thread for all windows
+            try:
+                self.cap = get_camera_broker(0).subscribe()
+            except RuntimeError:
                 messagebox.showerror("Webcam Error", "Cannot open webcam")
                 return
             
@@ -319,37 +500,36 @@ class MainWindow:
             messagebox.showerror("Webcam Error", f"Failed to start webcam: {str(e)}")
     
     def update_webcam(self):
-        """Update webcam feed"""
+        """Update webcam feed (display stage of the recognition pipeline)"""
+        # Capture and recognition run in their own threads; this loop only
+        # shows the newest frame with the newest results
+        pipeline = self.pipeline = RecognitionPipeline(self.recognition_service, self.cap, stream_id="main").start()
+        if self.recognition_service is not None:
+            # Services may have become ready while the pipeline was created
+            pipeline.set_recognition_service(self.recognition_service)
+        
         while self.webcam_running:
             try:
-                ret, frame = self.cap.read()
+                ret, frame, results = pipeline.read(max_result_age=MAX_RESULT_AGE)
                 if not ret:
                     break
+                frame = frame.copy()  # broker frames are shared and read-only; boxes are drawn on a copy
                 
-                # Detect faces using recognition service
-                if self.recognition_service:
-                    try:
-                        results = self.recognition_service.recognize_faces(frame)
-                        
-                        # Draw bounding boxes
-                        for result in results:
-                            bbox = result.get('bbox')
-                            if bbox:
-                                x, y, w, h = bbox
-                                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                                cv2.putText(
-                                    frame,
-                                    "Face",
-                                    (x, y-10),
-                                    cv2.FONT_HERSHEY_SIMPLEX,
-                                    0.5,
-                                    (0, 255, 0),
-                                    2
-                                )
-                    except Exception as e:
-                        print(f"Recognition error: {e}")
-                        import traceback
-                        traceback.print_exc()
+                # Draw bounding boxes
+                for result in results:
+                    bbox = result.get('bbox')
+                    if bbox:
+                        x, y, w, h = bbox
+                        cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                        cv2.putText(
+                            frame,
+                            "Face",
+                            (x, y-10),
+                            cv2.FONT_HERSHEY_SIMPLEX,
+                            0.5,
+                            (0, 255, 0),
+                            2
+                        )
                 
                 # Convert to PhotoImage
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -362,13 +542,13 @@ class MainWindow:
                 self.webcam_label.configure(image=imgtk)
                 
                 self.current_frame = frame
-                
-                time.sleep(0.03)  # ~30 FPS
             except Exception as e:
                 print(f"Webcam loop error: {e}")
                 import traceback
                 traceback.print_exc()
                 break
+        
+        pipeline.stop()
     
     def get_today_stats(self):
         """Get today's statistics"""
@@ -386,10 +566,14 @@ class MainWindow:
             check_ins = len([r for r in records if r['type'] == 'check_in'])
             check_outs = len([r for r in records if r['type'] == 'check_out'])
             
-            # Get total persons from dataset
-            encodings_file = Path("dataset/encodings.pkl")
+            # Get total persons from dataset (persons table of the encodings store)
+            encodings_store = EncodingStore(Path(__file__).parent.parent / "dataset")
+            encodings_file = encodings_store.dataset_path / "encodings.pkl"
             total_persons = 0
-            if encodings_file.exists():
+            if encodings_store.exists():
+                data = encodings_store.load()
+                total_persons = len(set(person['name'] for person in data['persons']))
+            elif encodings_file.exists():
                 import pickle
                 with open(encodings_file, 'rb') as f:
                     data = pickle.load(f)
@@ -482,7 +666,8 @@ class MainWindow:
             # Ask to set as active
             if messagebox.askyesno("Set Active", "Set this model as active?"):
                 self.model_manager.set_active_model(model_id)
-                messagebox.showinfo("Success", "Model set as active. Please restart the application.")
+                if not self.switch_model(model_id):
+                    messagebox.showinfo("Success", "Model set as active. Please restart the application.")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to import model: {e}")
     
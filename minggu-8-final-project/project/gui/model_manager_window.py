@@ -118,7 +118,7 @@ class ModelManagerWindow:
         tk.Button(
             button_frame,
             text="Refresh",
-            command=self.load_models,
+            command=self.refresh_models,
             bg="#9E9E9E",
             fg="white",
             font=("Arial", 10),
@@ -133,6 +133,11 @@ class ModelManagerWindow:
             width=15
         ).pack(side=tk.RIGHT, padx=5)
     
+    def refresh_models(self):
+        """Rescan the models folder (picks up models copied in by hand)"""
+        self.model_manager.invalidate_registry()
+        self.load_models()
+    
     def load_models(self):
         """Load models list"""
         # Clear tree
@@ -184,10 +189,11 @@ class ModelManagerWindow:
             return
         
         if self.model_manager.set_active_model(model_id):
-            messagebox.showinfo(
-                "Success",
-                "Model set as active!\n\nPlease restart the application to use this model."
-            )
+            if self.main_window.switch_model(model_id):
+                message = "Model set as active!\n\nRecognition switches to it as soon as it is loaded."
+            else:
+                message = "Model set as active!\n\nPlease restart the application to use this model."
+            messagebox.showinfo("Success", message)
             self.load_models()
         else:
             messagebox.showerror("Error", "Failed to set active model")
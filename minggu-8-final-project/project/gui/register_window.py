@@ -13,6 +13,8 @@ import time
 from pathlib import Path
 import numpy as np
 
+from core.camera_broker import get_camera_broker
+
 
 class RegisterWindow:
     """Register person window"""
@@ -184,8 +186,10 @@ class RegisterWindow:
     def start_webcam(self):
         """Start webcam"""
         try:
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
+            # Shared camera: one device handle and capture thread for all windows
+            try:
+                self.cap = get_camera_broker(0).subscribe()
+            except RuntimeError:
                 messagebox.showerror("Webcam Error", "Cannot open webcam")
                 return
             
@@ -204,32 +208,12 @@ class RegisterWindow:
                 ret, frame = self.cap.read()
                 if not ret:
                     break
+                frame = frame.copy()  # broker frames are shared and read-only; boxes are drawn on a copy
                 
-                # Detect faces using MediaPipe directly
+                # Detect faces (the service gives this thread its own detection graph)
                 faces = []
                 if self.main_window.recognition_service:
-                    # Convert to RGB for MediaPipe
-                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    detection_results = self.main_window.recognition_service.face_detection.process(rgb_frame)
-                    
-                    # Convert MediaPipe detections to (x, y, w, h) format
-                    if detection_results.detections:
-                        h, w = frame.shape[:2]
-                        for detection in detection_results.detections:
-                            bbox = detection.location_data.relative_bounding_box
-                            x = int(bbox.xmin * w)
-                            y = int(bbox.ymin * h)
-                            width = int(bbox.width * w)
-                            height = int(bbox.height * h)
-                            
-                            # Ensure coordinates are within bounds
-                            x = max(0, x)
-                            y = max(0, y)
-                            width = min(width, w - x)
-                            height = min(height, h - y)
-                            
-                            if width > 0 and height > 0:
-                                faces.append((x, y, width, height))
+                    faces = self.main_window.recognition_service.detect_faces(frame)
                 
                 # Auto capture if enabled
                 if self.is_capturing and faces and len(self.captured_photos) < self.target_photos:
@@ -315,9 +299,8 @@ class RegisterWindow:
         
         # Check active model for existing classes
         try:
-            from ..core.model_manager import ModelManager
-            model_manager = ModelManager(models_dir=str(Path(__file__).parent.parent / "models"))
-            active_model = model_manager.get_active_model()
+            # Shared manager: its cached registry answers without rescanning models/
+            active_model = self.main_window.model_manager.get_active_model()
             
             if active_model and 'classes' in active_model:
                 existing_classes = active_model['classes']
@@ -6,12 +6,18 @@ Complete integration of all modules from Week 1-7.
 """
 
 import sys
+import os
+import time
+import importlib.util
 from pathlib import Path
 import tkinter as tk
 from tkinter import messagebox
 import logging
 from datetime import datetime
 
+# Debug mode: --debug flag or FACE_ATTENDANCE_DEBUG=1 (prints startup time breakdown)
+DEBUG = '--debug' in sys.argv or os.environ.get('FACE_ATTENDANCE_DEBUG') == '1'
+
 # Add core modules to path
 # When running as PyInstaller .exe, use the exe's directory for data folders
 if getattr(sys, 'frozen', False):
@@ -35,7 +41,7 @@ if sys.stdout.encoding != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
 logging.basicConfig(
-    level=logging.INFO,
+    level=logging.DEBUG if DEBUG else logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.FileHandler(log_dir / 'app.log', encoding='utf-8'),
@@ -46,10 +52,53 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class StartupTimer:
+    """
+    Measure how long each startup stage takes
+    """
+    
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
+        self.stages = []
+    
+    def mark(self, stage: str):
+        """
+        Record the time since the previous mark
+        
+        Args:
+            stage: Name of the stage that just finished
+        """
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last_time))
+        self.last_time = now
+    
+    def report(self):
+        """Log the startup time breakdown"""
+        logger.info("⏱️  Startup time breakdown:")
+        for stage, seconds in self.stages:
+            logger.info(f"   {stage:<30s} {seconds * 1000:8.1f} ms")
+        logger.info(f"   {'Total':<30s} {(self.last_time - self.start_time) * 1000:8.1f} ms")
+
+
+startup_timer = StartupTimer()
+
+
+def _find_module(module_name: str) -> bool:
+    """Check that a module exists without executing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ImportError:
+        return False
+
+
 def check_requirements():
     """
     Check if all required dependencies are installed.
     
+    Uses _find_module, so nothing is imported (importing MediaPipe or
+    TensorFlow just to check takes seconds).
+    
     Returns:
         list: List of missing dependencies (empty if all OK)
     """
@@ -66,9 +115,7 @@ def check_requirements():
     }
     
     for module_name, package_name in required.items():
-        try:
-            __import__(module_name)
-        except ImportError:
+        if not _find_module(module_name):
             missing.append(package_name)
     
     return missing
@@ -113,12 +160,7 @@ def check_core_modules():
         'core.attendance_system',
     ]
     
-    missing = []
-    for module_name in required_modules:
-        try:
-            __import__(module_name)
-        except ImportError:
-            missing.append(module_name)
+    missing = [module_name for module_name in required_modules if not _find_module(module_name)]
     
     return len(missing) == 0, missing
 
@@ -137,12 +179,7 @@ def check_gui_modules():
         'gui.reports_window',
     ]
     
-    missing = []
-    for module_name in required_modules:
-        try:
-            __import__(module_name)
-        except ImportError:
-            missing.append(module_name)
+    missing = [module_name for module_name in required_modules if not _find_module(module_name)]
     
     return len(missing) == 0, missing
 
@@ -196,6 +233,7 @@ def initialize_application():
         )
         return False
     logger.info("✅ All dependencies installed")
+    startup_timer.mark("Dependency check")
     
     # Check directory structure
     check_directory_structure()
@@ -220,6 +258,7 @@ def initialize_application():
         logger.error("Please ensure all Week 7 modules are in gui/ folder")
         return False
     logger.info("✅ GUI modules available")
+    startup_timer.mark("Directory / module checks")
     
     logger.info("="*60)
     logger.info("🚀 Application initialized successfully!")
@@ -240,6 +279,7 @@ def main():
     try:
         # Import main window (after all checks pass)
         from gui.main_window import MainWindow
+        startup_timer.mark("Import GUI modules")
         
         # Create Tkinter root
         root = tk.Tk()
@@ -261,8 +301,12 @@ def main():
         
         # Create main window
         app = MainWindow(root)
+        startup_timer.mark("Create main window")
         
         logger.info("Application window created")
+        if DEBUG:
+            # Time until Tk has drawn the first screen
+            root.after_idle(lambda: (startup_timer.mark("First screen drawn"), startup_timer.report()))
         logger.info(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
         # Start event loop
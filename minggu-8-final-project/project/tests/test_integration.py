@@ -10,6 +10,7 @@ from pathlib import Path
 import time
 import cv2
 import numpy as np
+import pytest
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
@@ -217,6 +218,1155 @@ def test_recognition_service():
         return False
 
 
+def test_gallery_matching():
+    """Test 6b: Vectorized gallery matching"""
+    print("\n" + "="*60)
+    print("TEST 6b: Gallery Matching")
+    print("="*60)
+    
+    from core.recognition_service import RecognitionService, Gallery
+    from core.face_index import BruteForceIndex
+    
+    rng = np.random.default_rng(0)
+    encodings = [rng.normal(size=1404) for _ in range(50)]
+    query = encodings[17] + rng.normal(scale=0.01, size=1404)
+    
+    matrix = RecognitionService._build_gallery_matrix(encodings)
+    print(f"✅ Gallery matrix: {matrix.shape} {matrix.dtype}")
+    
+    # Reference: the original per-encoding Python loop
+    query_norm = query / (np.linalg.norm(query) + 1e-6)
+    loop_distances = [
+        1.0 - np.dot(query_norm, enc / (np.linalg.norm(enc) + 1e-6))
+        for enc in encodings
+    ]
+    
+    distances = 1.0 - matrix @ query_norm.astype(np.float32)
+    assert int(np.argmin(distances)) == int(np.argmin(loop_distances)) == 17
+    assert np.allclose(distances, loop_distances, atol=1e-4)
+    print("✅ Matrix matching agrees with loop matching")
+    
+    # Batched matching: several faces scored in one call
+    service = RecognitionService.__new__(RecognitionService)
+    service.tolerance = 0.6
+    service.gallery = Gallery(matrix, [f"person_{i}" for i in range(len(matrix))],
+                              [{} for _ in range(len(matrix))], BruteForceIndex().build(matrix))
+    queries = [encodings[3], encodings[42], rng.normal(size=1404)]
+    matches = service.match_encodings_batch(queries)
+    assert [m[0] for m in matches[:2]] == [3, 42]
+    assert matches[0][2] > 0.99 and matches[2][2] == 0.0
+    assert all(service._match_encoding(q)[0] == m[0] for q, m in zip(queries, matches))
+    print(f"✅ Batched matching: {len(matches)} faces in one call")
+    
+    # A reload during matching: indices are resolved in the snapshot they came from
+    class ReloadingIndex(BruteForceIndex):
+        def search(self, queries, k=1):
+            found = super().search(queries, k)
+            service.gallery = Gallery(matrix[:2], ["new_0", "new_1"], [{}, {}], BruteForceIndex().build(matrix[:2]))
+            return found
+    
+    service.stats = {'total_processed': 0, 'total_recognized': 0, 'total_unknown': 0,
+                     'avg_processing_time': 0, 'identity_cache_hits': 0}
+    service.gallery = service.gallery._replace(index=ReloadingIndex().build(matrix))
+    result, = service._match_faces([((0, 0, 1, 1), None)], [encodings[42]])
+    assert result['name'] == "person_42" and service.known_names == ["new_0", "new_1"]
+    print("✅ Gallery reload mid-match: names taken from the snapshot that was searched")
+    
+    # Landmark extraction: float32 buffer filled without per-landmark list.extend
+    from types import SimpleNamespace
+    from core.face_recognizer import landmarks_to_encoding
+    points = rng.random((478, 3))
+    face_landmarks = SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z) for x, y, z in points])
+    encoding = landmarks_to_encoding(face_landmarks)
+    assert encoding.dtype == np.float32 and encoding.shape == (1434,)
+    assert np.allclose(encoding, points.reshape(-1), atol=1e-6)
+    buffer = np.empty(1434, dtype=np.float32)
+    assert landmarks_to_encoding(face_landmarks.landmark, out=buffer) is buffer
+    assert np.array_equal(landmarks_to_encoding(points), encoding)
+    print("✅ Landmark encoding: float32, preallocated buffer")
+    
+    print("\n✅ Gallery matching tests passed")
+
+
+def test_face_index():
+    """Test 6c: Exact and approximate gallery indexes"""
+    print("\n" + "="*60)
+    print("TEST 6c: Face Index")
+    print("="*60)
+    
+    import tempfile
+    from core.face_index import (normalize_rows, create_index, compute_prototypes,
+                                 load_or_build_index, load_index)
+    
+    # Clustered gallery: 40 persons x 25 photos
+    rng = np.random.default_rng(1)
+    persons = rng.normal(size=(40, 1404))
+    gallery = normalize_rows(np.repeat(persons, 25, axis=0) + rng.normal(scale=0.05, size=(1000, 1404)))
+    queries = gallery[::50] + rng.normal(scale=0.01, size=(20, 1404)).astype(np.float32)
+    
+    exact = create_index('brute_force').build(gallery)
+    exact_ids, exact_distances = exact.search(queries, k=3)
+    assert exact_ids.shape == (20, 3) and np.all(np.diff(exact_distances, axis=1) >= 0)
+    assert exact.search(queries[5])[0][0, 0] == exact_ids[5, 0]
+    print(f"✅ Brute-force index: {len(exact)} encodings")
+    
+    ivf = create_index('ivf', n_lists=16, n_probe=2).build(gallery)
+    ivf_ids, _ = ivf.search(queries, k=1)
+    recall = np.mean(ivf_ids[:, 0] == exact_ids[:, 0])
+    assert recall >= 0.9
+    print(f"✅ IVF index recall@1: {recall:.0%}")
+    
+    # Probing every list is exact
+    ivf.n_probe = 16
+    assert np.array_equal(ivf.search(queries, k=1)[0][:, 0], exact_ids[:, 0])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = Path(tmp) / "encodings_index.npz"
+        load_or_build_index(gallery, index_path, index_type='ivf', n_lists=16)
+        loaded = load_index(index_path, gallery, index_type='ivf', n_lists=16, n_probe=2)
+        assert loaded is not None and np.array_equal(loaded.list_ids, ivf.list_ids)
+        assert load_index(index_path, gallery[:10], index_type='ivf') is None
+    print("✅ Index persisted and reloaded")
+    
+    # Two-stage prototype matching returns exact distances for shortlisted persons
+    labels = np.repeat(np.arange(40), 25)
+    prototypes, prototype_labels = compute_prototypes(gallery, labels, per_person=3)
+    assert len(prototypes) == 120
+    proto = create_index('prototype', labels=labels, prototypes=prototypes,
+                         prototype_labels=prototype_labels, shortlist_k=3).build(gallery)
+    proto_ids, proto_distances = proto.search(queries, k=1)
+    assert np.array_equal(proto_ids[:, 0], exact_ids[:, 0])
+    assert np.allclose(proto_distances[:, 0], exact_distances[:, 0], atol=1e-5)
+    centroids, _ = compute_prototypes(gallery, labels)
+    assert centroids.shape == (40, 1404)
+    print(f"✅ Prototype index: {len(prototypes)} prototypes, shortlist 3/40 persons")
+    
+    # FaceRecognizer accepts every index type (prototype labels = known names)
+    from core.face_recognizer import FaceRecognizer
+    with pytest.raises(ValueError):
+        FaceRecognizer(index_type='hnsw')
+    recognizer = FaceRecognizer.__new__(FaceRecognizer)
+    recognizer.tolerance = 0.6
+    recognizer.index_type = 'prototype'
+    recognizer.index_params = {'shortlist_k': 3}
+    recognizer.known_face_encodings = list(gallery)
+    recognizer.known_face_names = [f"person_{label}" for label in labels]
+    recognizer.known_face_metadata = [{} for _ in labels]
+    recognizer._index = None
+    name, confidence, _ = recognizer.recognize_face(queries[5])
+    assert name == f"person_{labels[exact_ids[5, 0]]}" and confidence > 0
+    print("✅ FaceRecognizer: prototype index over known names, unknown index type rejected")
+    
+    print("\n✅ Face index tests passed")
+
+
+def test_encoding_store():
+    """Test 6d: Memory-mapped encodings store"""
+    print("\n" + "="*60)
+    print("TEST 6d: Encoding Store")
+    print("="*60)
+    
+    import pickle
+    import tempfile
+    from core.encoding_store import EncodingStore
+    
+    rng = np.random.default_rng(2)
+    names = ["Alice"] * 3 + ["Bob"] * 2
+    legacy = {
+        "model": "mediapipe",
+        "generated_at": "2026-01-01T00:00:00",
+        "encodings": [rng.normal(size=1404) for _ in names],
+        "names": names,
+        "metadata": [
+            {"person_id": name.lower(), "employee_id": None, "department": "HR" if i == 2 else "IT",
+             "image_file": f"{name.lower()}_{i:03d}.jpg"}
+            for i, name in enumerate(names)
+        ],
+        "prototypes": rng.normal(size=(2, 1404)),
+        "prototype_names": ["Alice", "Bob"]
+    }
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(Path(tmp) / "encodings.pkl", 'wb') as f:
+            pickle.dump(legacy, f)
+        
+        store = EncodingStore(tmp)
+        assert store.migrate_from_pickle(Path(tmp) / "encodings.pkl") == 5
+        
+        data = store.load(mmap=True)
+        matrix = data["matrix"]
+        assert isinstance(matrix, np.memmap) and matrix.dtype == np.float32
+        assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0, atol=1e-4)
+        print(f"✅ Memory-mapped gallery: {matrix.shape}")
+        
+        # One person per person_id even if a row's metadata differs (department of row 2)
+        assert list(data["names"]) == names and len(data["persons"]) == 2
+        assert list(data["person_codes"]) == [0, 0, 0, 1, 1]
+        assert data["metadata"][4] == legacy["metadata"][4]
+        assert list(data["prototype_codes"]) == [0, 1] and data["prototype_names"] == ["Alice", "Bob"]
+        print("✅ Names, metadata and prototypes restored from sidecar")
+        
+        # Two registered people sharing a name stay two persons with one label
+        namesakes = [
+            {"person_id": "alice", "employee_id": "E1", "department": "IT", "image_file": "a.jpg"},
+            {"person_id": "alice_2", "employee_id": "E2", "department": "HR", "image_file": "b.jpg"},
+        ]
+        namesakes_store = EncodingStore(Path(tmp) / "namesakes")
+        namesakes_store.save(rng.normal(size=(2, 1404)), ["Alice", "Alice"], namesakes,
+                             prototypes=rng.normal(size=(1, 1404)), prototype_names=["Alice"])
+        loaded = namesakes_store.load()
+        assert list(loaded["person_codes"]) == [0, 1] and list(loaded["label_codes"]) == [0, 0]
+        assert list(loaded["metadata"]) == namesakes and loaded["prototype_names"] == ["Alice"]
+        print("✅ Same-named people keep their own person_id / employee_id / department")
+        del loaded
+        
+        # Saving while the gallery is mapped writes a new version instead of replacing the file
+        mapped_file = Path(matrix.filename)
+        expected = np.array(matrix)
+        store.save(legacy["encodings"][:2], names[:2], legacy["metadata"][:2])
+        assert store.matrix_file != mapped_file and np.array_equal(matrix, expected)
+        reloaded = store.load()
+        assert len(reloaded["matrix"]) == 2 and "prototypes" not in reloaded
+        assert sorted(p.name for p in Path(tmp).glob("*.npy")) == ["encodings.2.npy", "person_codes.2.npy"]
+        print(f"✅ Re-save published {store.matrix_file.name}; mapped {mapped_file.name} untouched, then removed")
+        del data, matrix, reloaded
+    
+    print("\n✅ Encoding store tests passed")
+
+
+def test_incremental_encodings():
+    """Test 6e: Incremental encoding generation"""
+    print("\n" + "="*60)
+    print("TEST 6e: Incremental Encodings")
+    print("="*60)
+    
+    import tempfile
+    import core.dataset_manager as dataset_manager
+    
+    class CountingRecognizer:
+        """Encodes an image as its per-channel mean; counts calls"""
+        calls = 0
+        
+        def encode_face(self, image):
+            CountingRecognizer.calls += 1
+            return image.reshape(-1, 3).mean(axis=0) + 1.0
+    
+    original = dataset_manager.FaceRecognizer
+    dataset_manager.FaceRecognizer = CountingRecognizer
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = dataset_manager.DatasetManager(tmp)
+            for name in ("Alice", "Bob"):
+                person_id = manager.add_person(name)
+                for i in range(3):
+                    image = np.full((8, 8, 3), 40 * i + len(name), dtype=np.uint8)
+                    cv2.imwrite(str(Path(tmp) / person_id / f"{person_id}_{i:03d}.png"), image)
+            
+            assert manager.generate_encodings() == 6 and CountingRecognizer.calls == 6
+            
+            # New person + one deleted image: only the new images are encoded
+            carol = manager.add_person("Carol")
+            cv2.imwrite(str(Path(tmp) / carol / "carol_000.png"), np.zeros((8, 8, 3), np.uint8))
+            (Path(tmp) / "bob" / "bob_002.png").unlink()
+            CountingRecognizer.calls = 0
+            assert manager.generate_encodings() == 6 and CountingRecognizer.calls == 1
+            assert manager.encoding_stats == {"reused": 5, "encoded": 1, "failed": 0, "removed": 1}
+            print("✅ Re-run encoded 1 new image, dropped 1 deleted image")
+            
+            encodings, names, metadata = manager.load_encodings()
+            assert list(names) == ["Alice"] * 3 + ["Bob"] * 2 + ["Carol"]
+            assert metadata[4]["image_file"] == "bob_001.png"
+            del encodings
+            
+            # Changed content is re-encoded; full mode ignores the cache
+            cv2.imwrite(str(Path(tmp) / "alice" / "alice_000.png"), np.ones((8, 8, 3), np.uint8))
+            CountingRecognizer.calls = 0
+            manager.generate_encodings()
+            assert CountingRecognizer.calls == 1
+            CountingRecognizer.calls = 0
+            manager.generate_encodings(incremental=False)
+            assert CountingRecognizer.calls == 6
+            print("✅ Changed image re-encoded, full rebuild available")
+            
+            # Process pool merges in the same order (patched class needs fork)
+            import multiprocessing
+            if multiprocessing.get_start_method() == "fork":
+                serial = np.array(manager.load_encodings()[0])
+                (Path(tmp) / "alice" / "broken.jpg").write_bytes(b"not an image")
+                assert manager.generate_encodings(incremental=False, workers=2) == 6
+                assert np.array_equal(np.array(manager.load_encodings()[0]), serial)
+                assert list(manager.encoding_errors) == ["alice/broken.jpg"]
+                manager.generate_encodings(workers=2)
+                assert manager.encoding_stats == {"reused": 6, "encoded": 0, "failed": 1, "removed": 0}
+                print("✅ workers=2 matches serial order, per-image errors captured")
+    finally:
+        dataset_manager.FaceRecognizer = original
+    
+    print("\n✅ Incremental encoding tests passed")
+
+
+def test_frame_mesh():
+    """Test 6f: Single Face Mesh pass assigned to detector boxes"""
+    print("\n" + "="*60)
+    print("TEST 6f: Full-Frame Face Mesh")
+    print("="*60)
+    
+    from types import SimpleNamespace
+    from core.recognition_service import RecognitionService
+    
+    rng = np.random.default_rng(3)
+    frame_w, frame_h = 640, 480
+    boxes = [(60, 80, 120, 150), (380, 120, 100, 130)]
+    relative = [rng.uniform(0.1, 0.9, size=(478, 3)) for _ in boxes]
+    
+    class FakeFaceMesh:
+        """Returns both landmark sets (in reverse order) in frame-normalized coordinates"""
+        calls = 0
+        
+        def process(self, rgb_image):
+            FakeFaceMesh.calls += 1
+            sets = []
+            for (x, y, w, h), points in reversed(list(zip(boxes, relative))):
+                sets.append(SimpleNamespace(landmark=[
+                    SimpleNamespace(x=(x + px * w) / frame_w, y=(y + py * h) / frame_h, z=pz * w / frame_w)
+                    for px, py, pz in points
+                ]))
+            return SimpleNamespace(multi_face_landmarks=sets)
+    
+    service = RecognitionService.__new__(RecognitionService)
+    service.mesh_mode = "full_frame"
+    service.face_mesh = FakeFaceMesh()
+    
+    image = np.zeros((frame_h, frame_w, 3), dtype=np.uint8)
+    faces = [(box, image[box[1]:box[1] + box[3], box[0]:box[0] + box[2]]) for box in boxes]
+    faces.append(((560, 400, 40, 40), image[400:440, 560:600]))  # no landmarks here
+    
+    encodings = service._extract_face_encodings_frame(image, faces)
+    assert FakeFaceMesh.calls == 1 and encodings[2] is None
+    for encoding, points in zip(encodings, relative):
+        assert encoding.dtype == np.float32
+        assert np.allclose(encoding, points.reshape(-1), atol=1e-4)
+    print("✅ One mesh pass, landmark sets assigned by IoU in box coordinates")
+    
+    # The face the frame pass missed is encoded on the static crop graph only
+    class CropMesh:
+        crops = []
+        
+        def process(self, rgb_image):
+            CropMesh.crops.append(rgb_image.shape)
+            return SimpleNamespace(multi_face_landmarks=None)
+    
+    service.crop_face_mesh = CropMesh()
+    encodings = service._encode_faces(image, faces)
+    assert FakeFaceMesh.calls == 2 and CropMesh.crops == [(40, 40, 3)] and encodings[2] is None
+    print("✅ Missed face falls back to the static crop graph, frame graph sees full frames only")
+    
+    # The union crop moves every frame: its graph must not track across frames
+    service.mp_face_mesh = SimpleNamespace(FaceMesh=lambda **options: options)
+    assert service._create_face_mesh()['static_image_mode'] is False
+    service.mesh_mode = "union_roi"
+    assert service._create_face_mesh()['static_image_mode'] is True
+    print("✅ union_roi Face Mesh runs in static image mode, full_frame keeps tracking")
+    
+    print("\n✅ Full-frame Face Mesh tests passed")
+
+
+def test_detection_downscale():
+    """Test 6g: Detection on a downscaled copy, crops from full resolution"""
+    print("\n" + "="*60)
+    print("TEST 6g: Detection Downscaling")
+    print("="*60)
+    
+    from types import SimpleNamespace
+    from core.image_utils import prepare_detection_input
+    from core.recognition_service import RecognitionService
+    
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    frame[270:540, 480:720] = (0, 0, 255)
+    
+    rgb, scale = prepare_detection_input(frame, 640)
+    assert rgb.shape == (360, 640, 3) and abs(scale - 1 / 3) < 1e-6
+    assert tuple(rgb[150, 200]) == (255, 0, 0)  # BGR → RGB
+    assert prepare_detection_input(frame[:480, :640], 640)[1] == 1.0
+    print(f"✅ 1920x1080 → {rgb.shape[1]}x{rgb.shape[0]} RGB (scale {scale:.3f})")
+    
+    class FakeFaceDetection:
+        """Reports one face (relative box) and records the input size"""
+        def process(self, rgb_image):
+            self.input_shape = rgb_image.shape
+            box = SimpleNamespace(xmin=0.25, ymin=0.25, width=0.125, height=0.25)
+            return SimpleNamespace(detections=[SimpleNamespace(
+                location_data=SimpleNamespace(relative_bounding_box=box))])
+    
+    service = RecognitionService.__new__(RecognitionService)
+    service.max_detection_size = 640
+    service.face_detection = FakeFaceDetection()
+    (bbox, face_roi), = service._detect_face_rois(frame)
+    assert service.face_detection.input_shape[:2] == (360, 640)
+    assert bbox == (480, 270, 240, 270) and face_roi.shape == (270, 240, 3)
+    print("✅ Boxes mapped back to full resolution, ROI cropped from original frame")
+    
+    # DatasetManager passes its configured size to the capture detector
+    import tempfile
+    import core.dataset_manager as dataset_manager
+    
+    class RecordingDetector:
+        def __init__(self, max_detection_size=640):
+            RecordingDetector.size = max_detection_size
+    
+    class ClosedCapture:
+        def __init__(self, camera_id):
+            pass
+        
+        def isOpened(self):
+            return False
+    
+    original = dataset_manager.FaceDetector, dataset_manager.cv2.VideoCapture
+    dataset_manager.FaceDetector = RecordingDetector
+    dataset_manager.cv2.VideoCapture = ClosedCapture
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = dataset_manager.DatasetManager(tmp, max_detection_size=320)
+            person_id = manager.add_person("Alice")
+            try:
+                manager.capture_faces(person_id)
+            except RuntimeError:
+                pass
+            assert RecordingDetector.size == 320
+    finally:
+        dataset_manager.FaceDetector, dataset_manager.cv2.VideoCapture = original
+    print("✅ DatasetManager capture detector uses max_detection_size=320")
+    
+    print("\n✅ Detection downscaling tests passed")
+
+
+def test_frame_tracking():
+    """Test 6h: Frame skipping, box tracking and per-track identity cache"""
+    print("\n" + "="*60)
+    print("TEST 6h: Frame Skip Tracking")
+    print("="*60)
+    
+    from core.recognition_service import RecognitionService, Gallery
+    
+    rng = np.random.default_rng(4)
+    scene = cv2.GaussianBlur(rng.integers(0, 255, size=(720, 1280, 3), dtype=np.uint8), (0, 0), 6)
+    
+    service = RecognitionService.__new__(RecognitionService)
+    service.use_teachable_machine = False
+    service.gallery = Gallery(np.zeros((1, 1404), dtype=np.float32), ["Alice"], [{}], None)
+    service.stats = {'total_processed': 0, 'total_recognized': 0, 'total_unknown': 0,
+                     'avg_processing_time': 0, 'identity_cache_hits': 0}
+    service.frame_skip = 3
+    service.trackers = {}
+    detections = []
+    recognitions = []
+    
+    def fake_detect(image):
+        x = 400 + 8 * 3 * len(detections)  # face moves 8 px per frame
+        detections.append(x)
+        return [((x, 200, 160, 200), image[200:400, x:x+160])]
+    
+    def fake_recognize(image, faces, return_frames=False):
+        recognitions.extend(faces)
+        return [{'name': 'Alice', 'confidence': 0.9, 'bbox': bbox, 'metadata': {'person_id': 'alice'}}
+                for bbox, _ in faces]
+    
+    service._detect_face_rois = fake_detect
+    service._recognize_face_rois = fake_recognize
+    
+    track_ids = []
+    for frame_idx in range(12):
+        frame = np.roll(scene, 8 * frame_idx, axis=1)
+        results = service.track_faces(frame, stream_id="test")
+        assert len(results) == 1 and results[0]['name'] == 'Alice'
+        assert abs(results[0]['bbox'][0] - (400 + 8 * frame_idx)) <= 2
+        track_ids.append(results[0]['track_id'])
+    
+    # Detections on frames 0, 3, 6, 9; identity confirmed after 2 recognitions
+    assert len(detections) == 4 and len(recognitions) == 2 and len(set(track_ids)) == 1
+    assert service.stats['identity_cache_hits'] == 2
+    assert abs(results[0]['confidence'] - 0.9) < 1e-6 and results[0]['metadata']['person_id'] == 'alice'
+    print(f"✅ 12 frames, {len(detections)} detections, {len(recognitions)} recognitions, "
+          f"track {track_ids[0]} followed the face")
+    
+    # A different face in the same box is re-verified
+    tracker = service.trackers["test"]
+    track = tracker.tracks[0]
+    assert not tracker.needs_recognition(track)
+    track.template = cv2.flip(track.template, 0)
+    assert tracker.needs_recognition(track)
+    print("✅ Confirmed identity cached, re-verified when the crop changes")
+    
+    # A track lost between detections keeps its identity votes for the next detection frame
+    identity, hits, bbox = track.identity, track.identity.hits, track.bbox
+    noise = rng.integers(0, 255, size=scene.shape, dtype=np.uint8)
+    assert tracker.propagate(noise) == [] and tracker.lost_tracks == [track]
+    tracker.update(scene, [(bbox, None)])
+    assert tracker.tracks == [track] and track.identity is identity and identity.hits == hits
+    print("✅ Track lost on a skipped frame re-associated with its cached identity")
+    
+    service.reset_tracking("test")
+    assert "test" not in service.trackers
+    
+    print("\n✅ Frame skip tracking tests passed")
+
+
+def test_camera_broker():
+    """Test 6i: Shared camera broker"""
+    print("\n" + "="*60)
+    print("TEST 6i: Camera Broker")
+    print("="*60)
+    
+    import threading
+    from core.camera_broker import CameraBroker
+    
+    class FakeCapture:
+        """Synthetic 30 FPS camera"""
+        opened = 0
+        released = 0
+        
+        def __init__(self):
+            FakeCapture.opened += 1
+            self.count = 0
+        
+        def isOpened(self):
+            return True
+        
+        def read(self):
+            time.sleep(1 / 30)
+            self.count += 1
+            return True, np.full((48, 64, 3), self.count % 256, dtype=np.uint8)
+        
+        def release(self):
+            FakeCapture.released += 1
+    
+    class FakeBroker(CameraBroker):
+        def _open_capture(self):
+            return FakeCapture()
+    
+    broker = FakeBroker(0)
+    main_view = broker.subscribe()
+    attendance_view = broker.subscribe()
+    assert FakeCapture.opened == 1 and broker.subscriber_count == 2
+    
+    ok, frame = main_view.read()
+    assert ok and not frame.flags.writeable
+    seq = main_view._last_seq
+    ok, frame_b = attendance_view.read()
+    assert ok and (frame_b is frame or attendance_view._last_seq > seq)
+    print("✅ One device, read-only frames shared by 2 subscribers")
+    
+    main_view.release()
+    assert broker.is_running and attendance_view.read()[0]
+    attendance_view.release()
+    assert not broker.is_running and FakeCapture.released == 1
+    assert attendance_view.read() == (False, None)
+    print("✅ Device released when the last subscriber leaves")
+    
+    # Resubscribing while the last subscriber is still closing waits for the old device
+    class CountingCapture(FakeCapture):
+        open_now = 0
+        max_open = 0
+        
+        def __init__(self):
+            super().__init__()
+            CountingCapture.open_now += 1
+            CountingCapture.max_open = max(CountingCapture.max_open, CountingCapture.open_now)
+        
+        def read(self):
+            time.sleep(0.2)
+            return super().read()
+        
+        def release(self):
+            CountingCapture.open_now -= 1
+    
+    class CountingBroker(CameraBroker):
+        def _open_capture(self):
+            return CountingCapture()
+    
+    broker = CountingBroker(0)
+    view = broker.subscribe()
+    assert view.read()[0]
+    closer = threading.Thread(target=view.release)
+    closer.start()
+    while broker.is_running:
+        time.sleep(0.001)
+    view = broker.subscribe()
+    closer.join()
+    assert CountingCapture.max_open == 1 and view.read()[0]
+    view.release()
+    assert CountingCapture.open_now == 0
+    print("✅ Quick resubscribe reopens the device only after the old one is released")
+    
+    print("\n✅ Camera broker tests passed")
+
+
+def test_recognition_pipeline():
+    """Test 6j: Latest-frame-wins recognition pipeline"""
+    print("\n" + "="*60)
+    print("TEST 6j: Recognition Pipeline")
+    print("="*60)
+    
+    from core.recognition_pipeline import RecognitionPipeline
+    
+    class SlowService:
+        """Inference 5x slower than capture"""
+        def track_faces(self, frame, stream_id="default"):
+            time.sleep(0.15)
+            return [{'name': 'Alice', 'bbox': (0, 0, 10, 10), 'frame_id': int(frame[0, 0, 0])}]
+    
+    class FakeSource:
+        """Synthetic 30 FPS source, frame value = frame number"""
+        def __init__(self):
+            self.count = 0
+        
+        def read(self):
+            time.sleep(1 / 30)
+            self.count += 1
+            return True, np.full((48, 64, 3), self.count % 256, dtype=np.uint8)
+    
+    pipeline = RecognitionPipeline(SlowService(), FakeSource(), stream_id="test").start()
+    displayed = 0
+    end_time = time.time() + 1.2
+    while time.time() < end_time:
+        ok, frame, results = pipeline.read()
+        assert ok
+        displayed += 1
+    pipeline.stop()
+    assert not pipeline.is_running
+    
+    stats = pipeline.get_statistics()
+    assert stats['frames_inferred'] >= 2 and stats['frames_dropped'] > 0
+    assert displayed > 2 * stats['frames_inferred']
+    print(f"✅ Displayed {displayed} frames, inferred {stats['frames_inferred']}, "
+          f"dropped {stats['frames_dropped']}")
+    
+    # Results come from a recent frame, not from the back of a queue
+    assert stats['last_result_latency'] < 0.15 + 2 / 30 + 0.1
+    print(f"✅ Result latency bounded: {stats['last_result_latency'] * 1000:.0f} ms")
+    
+    # Restart after stop(): fresh slots, results lag reported, stale results dropped on request
+    pipeline.start()
+    end_time = time.time() + 1.0
+    results = []
+    while time.time() < end_time and not results:
+        ok, frame, results = pipeline.read()
+        assert ok
+    assert results and pipeline.result_frames_behind >= 0 and pipeline.result_age >= 0
+    assert results[0]['frame_id'] == (int(frame[0, 0, 0]) - pipeline.result_frames_behind) % 256
+    ok, frame, results = pipeline.read(max_result_age=0.0)
+    assert ok and (results == []) == (pipeline.result_age > 0)
+    pipeline.stop()
+    assert not pipeline.is_running
+    print(f"✅ Restarted after stop(); boxes {pipeline.result_frames_behind} frame(s) behind the display")
+    
+    # Preview first, recognition attached once the service has loaded
+    pipeline = RecognitionPipeline(None, FakeSource(), stream_id="test").start()
+    ok, frame, results = pipeline.read()
+    assert ok and results == []
+    pipeline.set_recognition_service(SlowService())
+    pipeline.set_recognition_service(pipeline.recognition_service)  # idempotent
+    end_time = time.time() + 1.0
+    while time.time() < end_time and not results:
+        ok, frame, results = pipeline.read()
+    pipeline.stop()
+    assert results and results[0]['name'] == 'Alice'
+    assert pipeline.get_statistics()['frames_dropped'] < 10
+    print("✅ Preview runs without a service, overlays start once it is attached")
+    
+    print("\n✅ Recognition pipeline tests passed")
+
+
+def test_concurrent_recognition():
+    """Test 6k: Recognition service shared by several threads"""
+    print("\n" + "="*60)
+    print("TEST 6k: Concurrent Recognition")
+    print("="*60)
+    
+    import threading
+    from types import SimpleNamespace
+    from core.recognition_service import RecognitionService
+    from core.concurrency import PerThreadPool
+    
+    class FakeFaceDetection:
+        """Fails if two threads are inside process() at the same time"""
+        def __init__(self):
+            self.busy = False
+            self.owners = set()
+        
+        def process(self, rgb_image):
+            assert not self.busy, "graph used by two threads at once"
+            self.busy = True
+            self.owners.add(threading.get_ident())
+            time.sleep(0.001)
+            self.busy = False
+            box = SimpleNamespace(xmin=0.25, ymin=0.25, width=0.5, height=0.5)
+            return SimpleNamespace(detections=[SimpleNamespace(
+                location_data=SimpleNamespace(relative_bounding_box=box))])
+    
+    service = RecognitionService.__new__(RecognitionService)
+    service.max_detection_size = 640
+    service._detection_pool = PerThreadPool(FakeFaceDetection)
+    service.stats = {'total_processed': 0, 'total_recognized': 0, 'total_unknown': 0,
+                     'avg_processing_time': 0, 'identity_cache_hits': 0}
+    
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    errors = []
+    
+    def worker():
+        try:
+            for _ in range(50):
+                assert service.detect_faces(frame) == [(40, 30, 80, 60)]
+                service._update_processing_stats(1, 0.01)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert not errors, errors[0] if errors else None
+    graphs = [graph for _, graph in service._detection_pool._owners]
+    assert all(len(graph.owners) == 1 for graph in graphs)
+    print(f"✅ 4 threads, {len(graphs)} detection graph(s), never shared concurrently")
+    
+    assert service.stats['total_processed'] == 200
+    assert abs(service.stats['avg_processing_time'] - 0.01) < 1e-9
+    print("✅ Per-thread statistics add up (200 faces, avg 10 ms)")
+    
+    # Graphs of finished threads are reused, not recreated
+    created = len(service._detection_pool)
+    worker_thread = threading.Thread(target=worker)
+    worker_thread.start()
+    worker_thread.join()
+    assert len(service._detection_pool) == created and not errors
+    print("✅ Graph of an exited thread reused by a new thread")
+    
+    # A released instance is handed over while its thread is still running
+    pool = PerThreadPool(object)
+    instance = pool.get()
+    pool.release()
+    taken = []
+    taker = threading.Thread(target=lambda: taken.append(pool.get()))
+    taker.start()
+    taker.join()
+    assert taken == [instance] and len(pool) == 1
+    print("✅ Released instance taken over by a new thread without waiting for exit")
+    
+    # Warm-up runs the calling thread's graph once on a blank frame
+    assert service.warm_up(frame_shape=(120, 160, 3)) >= 0
+    assert threading.get_ident() in service.face_detection.owners
+    print("✅ warm_up() primes the detection graph")
+    
+    print("\n✅ Concurrent recognition tests passed")
+
+
+def test_teachable_batching():
+    """Test 6l: Batched and compiled Teachable Machine classification"""
+    print("\n" + "="*60)
+    print("TEST 6l: Teachable Machine Batching")
+    print("="*60)
+    
+    import threading
+    pytest.importorskip("tensorflow")  # TeachableMachineRecognizer imports TensorFlow
+    from core.teachable_recognizer import TeachableMachineRecognizer
+    
+    class FakeModel:
+        """Scores class 0 by mean brightness, records batch sizes"""
+        def __init__(self):
+            self.batch_sizes = []
+        
+        def predict(self, batch, verbose=0):
+            assert batch.dtype == np.float32 and batch.shape[1:] == (224, 224, 3)
+            self.batch_sizes.append(len(batch))
+            brightness = batch.mean(axis=(1, 2, 3))
+            return np.stack([brightness, 1.0 - brightness], axis=1)
+    
+    recognizer = TeachableMachineRecognizer.__new__(TeachableMachineRecognizer)
+    recognizer.model = FakeModel()
+    recognizer.class_names = ['Bright', 'Dark']
+    recognizer.confidence_threshold = 0.7
+    recognizer.input_size = (224, 224)
+    recognizer.max_batch_size = 3
+    recognizer._local = threading.local()
+    recognizer.backend = 'keras'
+    recognizer._infer = None  # model.predict path
+    
+    faces = [np.full((100 + 10 * i, 90, 3), value, dtype=np.uint8)
+             for i, value in enumerate([250, 10, 128, 240, 5])]
+    faces.insert(2, np.zeros((0, 0, 3), dtype=np.uint8))
+    
+    results = recognizer.recognize_faces_batch(faces)
+    assert recognizer.model.batch_sizes == [3, 2]
+    print(f"✅ {len(faces)} faces in {len(recognizer.model.batch_sizes)} forward passes (max batch 3)")
+    
+    assert [name for name, _ in results] == ['Bright', 'Dark', None, None, 'Bright', 'Dark']
+    assert results[2] == (None, 0.0)
+    singles = [recognizer.recognize_face(face) for face in faces if face.size > 0]
+    assert all(abs(a[1] - b[1]) < 1e-6 for a, b in zip([r for r in results if r != (None, 0.0)], singles))
+    print("✅ Batched results match single-face recognition")
+    
+    # Compiled inference function replaces model.predict when available
+    compiled_calls = []
+    recognizer._infer = lambda batch: compiled_calls.append(len(batch)) or recognizer.model.predict(batch)
+    predict_calls = len(recognizer.model.batch_sizes)
+    assert recognizer.recognize_face(faces[0]) == results[0]
+    assert compiled_calls == [1] and len(recognizer.model.batch_sizes) == predict_calls + 1
+    print("✅ Live calls go through the compiled inference function")
+    
+    # Warm-up runs every batch size in use before the model is reported ready
+    recognizer.ready = False
+    recognizer.warmup_time = None
+    recognizer.warmup_latency = {}
+    recognizer.warmup_batch_sizes = [1, 3]
+    compiled_calls.clear()
+    warmup_time = recognizer.warm_up(repeats=2)
+    assert compiled_calls == [1, 1, 3, 3]
+    assert recognizer.ready and recognizer.warmup_time == warmup_time
+    assert set(recognizer.warmup_latency) == {1, 3}
+    print(f"✅ Warm-up ran batch sizes 1 and 3, model ready ({warmup_time * 1000:.1f} ms)")
+    
+    print("\n✅ Teachable Machine batching tests passed")
+
+
+def test_tflite_backend():
+    """Test 6m: TFLite inference backend"""
+    print("\n" + "="*60)
+    print("TEST 6m: TFLite Backend")
+    print("="*60)
+    
+    import threading
+    from core.concurrency import PerThreadPool
+    pytest.importorskip("tensorflow")  # TeachableMachineRecognizer imports TensorFlow
+    from core.teachable_recognizer import TeachableMachineRecognizer, tflite_model_path
+    
+    assert tflite_model_path("models/m1/keras_model.h5").as_posix() == "models/m1/keras_model.tflite"
+    print("✅ TFLite model cached next to keras_model.h5")
+    
+    class FakeInterpreter:
+        """Fixed-batch interpreter scoring class 0 by mean brightness"""
+        created = []
+        
+        def __init__(self, batch_size):
+            FakeInterpreter.created.append(batch_size)
+            self.invokes = 0
+            self.input_shape = (batch_size, 224, 224, 3)
+            self.tensors = {}
+        
+        def set_tensor(self, index, value):
+            assert value.shape == self.input_shape and value.dtype == np.float32
+            self.tensors[index] = value
+        
+        def invoke(self):
+            self.invokes += 1
+            brightness = self.tensors[0].mean(axis=(1, 2, 3))
+            self.tensors[1] = np.stack([brightness, 1.0 - brightness], axis=1).astype(np.float32)
+        
+        def get_tensor(self, index):
+            return self.tensors[index]
+    
+    recognizer = TeachableMachineRecognizer.__new__(TeachableMachineRecognizer)
+    recognizer.backend = 'tflite'
+    recognizer.class_names = ['Bright', 'Dark']
+    recognizer.confidence_threshold = 0.7
+    recognizer.input_size = (224, 224)
+    recognizer.max_batch_size = 4
+    recognizer._local = threading.local()
+    recognizer._create_tflite_interpreter = lambda batch_size=1: (
+        FakeInterpreter(batch_size), {'index': 0}, {'index': 1})
+    recognizer._interpreters = PerThreadPool(dict)
+    
+    faces = [np.full((120, 100, 3), value, dtype=np.uint8) for value in (250, 10, 128)]
+    results = recognizer.recognize_faces_batch(faces)
+    assert [name for name, _ in results] == ['Bright', 'Dark', None]
+    recognizer.recognize_faces_batch(faces[:1])
+    recognizer.recognize_faces_batch(faces[::-1][:2])
+    recognizer.recognize_faces_batch(faces[1:2])
+    interpreters = recognizer._interpreters.get()
+    assert FakeInterpreter.created == [4, 1] and sorted(interpreters) == [1, 4]
+    assert interpreters[4][0].invokes == 2 and interpreters[1][0].invokes == 2
+    print("✅ One invoke per batch on interpreters allocated once for batch 1 and max_batch_size")
+    
+    assert recognizer.recognize_face(faces[1]) == results[1]
+    assert set(recognizer.get_all_predictions(faces[0])) == {'Bright', 'Dark'}
+    print("✅ recognize_face / recognize_faces_batch / get_all_predictions via interpreter")
+    
+    # Interpreter warmed up by a loader thread is reused by the next thread
+    recognizer.ready = False
+    recognizer.warmup_latency = {}
+    recognizer.warmup_batch_sizes = [1, 4]
+    FakeInterpreter.created = []
+    recognizer._interpreters = PerThreadPool(dict)
+    loader = threading.Thread(target=recognizer.warm_up, kwargs={'repeats': 1})
+    loader.start()
+    loader.join()
+    assert recognizer.ready and FakeInterpreter.created == [1, 4]
+    worker = threading.Thread(target=recognizer.recognize_faces_batch, args=(faces,))
+    worker.start()
+    worker.join()
+    worker = threading.Thread(target=recognizer.recognize_face, args=(faces[0],))
+    worker.start()
+    worker.join()
+    assert len(recognizer._interpreters) == 1 and FakeInterpreter.created == [1, 4]
+    print("✅ Warm-up on loader thread, interpreter handed to the next thread")
+    
+    print("\n✅ TFLite backend tests passed")
+
+
+def test_quantized_variants():
+    """Test 6n: Quantized model variants"""
+    print("\n" + "="*60)
+    print("TEST 6n: Quantized Variants")
+    print("="*60)
+    
+    import tempfile
+    import threading
+    from core.concurrency import PerThreadPool
+    from core.model_manager import ModelManager
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        manager = ModelManager(models_dir=str(tmp / "models"))
+        model_dir = tmp / "models" / "m1"
+        model_dir.mkdir()
+        (model_dir / "keras_model.h5").write_bytes(b"h5")
+        (model_dir / "labels.txt").write_text("0 Alice\n1 Bob\n", encoding='utf-8')
+        (model_dir / "keras_model_int8.tflite").write_bytes(b"tflite")
+        manager.metadata["models"].append({"id": "m1", "variants": {"int8": str(model_dir / "keras_model_int8.tflite")}})
+        
+        for person in ("Alice", "Bob"):
+            (tmp / "dataset_export" / person).mkdir(parents=True)
+            for i in range(10):
+                (tmp / "dataset_export" / person / f"{person}_{i + 1:02d}.jpg").write_bytes(b"")
+        
+        calibration, holdout = manager._split_dataset_images(None, holdout_every=5)
+        assert len(calibration) == 16 and len(holdout) == 4
+        assert not set(calibration) & {path for path, _ in holdout}
+        assert {person for _, person in holdout} == {"Alice", "Bob"}
+        print("✅ dataset_export split: 16 calibration / 4 held-out photos, disjoint")
+        
+        # A separate evaluation folder is used in full (compare_variants eval_dir)
+        (tmp / "eval" / "Alice").mkdir(parents=True)
+        for i in range(3):
+            (tmp / "eval" / "Alice" / f"new_{i}.jpg").write_bytes(b"")
+        calibration, evaluation = manager._split_dataset_images(str(tmp / "eval"), 1)
+        assert not calibration and [person for _, person in evaluation] == ["Alice"] * 3
+        print("✅ eval_dir: all 3 photos used for evaluation")
+        
+        model_path, _ = manager.get_model_path("m1", variant="int8")
+        assert model_path.endswith("keras_model_int8.tflite")
+        print("✅ get_model_path returns the quantized variant")
+    
+    pytest.importorskip("tensorflow")  # TeachableMachineRecognizer imports TensorFlow
+    from core.teachable_recognizer import TeachableMachineRecognizer, tflite_model_path
+    assert tflite_model_path("m/keras_model.h5", "float16").name == "keras_model_float16.tflite"
+    
+    class Int8Interpreter:
+        """Full-int8 model: int8 in, int8 out (scale 1/255, zero point -128)"""
+        def set_tensor(self, index, value):
+            assert value.dtype == np.int8
+            self.value = value
+        
+        def invoke(self):
+            brightness = (self.value.astype(np.float32) + 128).mean(axis=(1, 2, 3)) / 255
+            self.output = np.round(np.stack([brightness, 1 - brightness], axis=1) * 255 - 128).astype(np.int8)
+        
+        def get_tensor(self, index):
+            return self.output
+    
+    recognizer = TeachableMachineRecognizer.__new__(TeachableMachineRecognizer)
+    recognizer.backend = 'tflite'
+    recognizer.class_names = ['Bright', 'Dark']
+    recognizer.confidence_threshold = 0.7
+    recognizer.input_size = (224, 224)
+    recognizer.max_batch_size = 4
+    recognizer._local = threading.local()
+    quantization = {'dtype': np.int8, 'quantization': (1 / 255, -128)}
+    recognizer._create_tflite_interpreter = lambda batch_size=1: (
+        Int8Interpreter(), dict(quantization, index=0), dict(quantization, index=1))
+    recognizer._interpreters = PerThreadPool(dict)
+    
+    name, confidence = recognizer.recognize_face(np.full((50, 50, 3), 230, dtype=np.uint8))
+    assert name == 'Bright' and abs(confidence - 230 / 255) < 0.01
+    print("✅ int8 model: input quantized, output dequantized")
+    
+    print("\n✅ Quantized variants tests passed")
+
+
+def test_lazy_imports():
+    """Test 6o: Heavy dependencies are not imported at startup"""
+    print("\n" + "="*60)
+    print("TEST 6o: Lazy Imports")
+    print("="*60)
+    
+    import subprocess
+    
+    # Fresh interpreter: this test process has imported everything already
+    project_dir = Path(__file__).parent.parent
+    code = (
+        "import sys; sys.path.insert(0, '.'); "
+        "import core, core.recognition_service, gui.main_window, main_app; "
+        "main_app.check_requirements(); main_app.check_core_modules(); "
+        "print(sorted(m for m in ('mediapipe', 'tensorflow') if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=project_dir,
+        capture_output=True, text=True, timeout=120
+    ).stdout.strip().splitlines()
+    assert output and output[-1] == "[]", output[-1:] or "no output"
+    print("✅ GUI, core and requirement checks load without MediaPipe / TensorFlow")
+    
+    print("\n✅ Lazy import tests passed")
+
+
+def test_model_cache():
+    """Test 6p: LRU cache of loaded models"""
+    print("\n" + "="*60)
+    print("TEST 6p: Model Cache")
+    print("="*60)
+    
+    import tempfile
+    import threading
+    from core.model_manager import ModelManager
+    from core.recognition_service import RecognitionService
+    
+    class FakeRecognizer:
+        """Stand-in for a loaded TeachableMachineRecognizer"""
+        def __init__(self, model_path, labels_path, **kwargs):
+            self.model_path = model_path
+            self.kwargs = kwargs
+    
+    class CountingManager(ModelManager):
+        """ModelManager with a slow fake loader that counts loads per model"""
+        def _create_recognizer(self, model_path, labels_path, **kwargs):
+            time.sleep(0.1)
+            model_id = Path(model_path).parent.name
+            self.loads[model_id] = self.loads.get(model_id, 0) + 1
+            return FakeRecognizer(model_path, labels_path, **kwargs)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = CountingManager(models_dir=tmp, cache_size=5, cache_memory_mb=2500 / 1024 / 1024)
+        manager.loads = {}
+        for model_id in ("m1", "m2", "m3"):
+            (Path(tmp) / model_id).mkdir()
+            (Path(tmp) / model_id / "keras_model.h5").write_bytes(b"0" * 1000)
+            (Path(tmp) / model_id / "labels.txt").write_text("0 Alice\n", encoding='utf-8')
+        
+        first = manager.get_recognizer("m1", confidence_threshold=0.5)
+        assert manager.get_recognizer("m1") is first and manager.loads == {"m1": 1}
+        assert first.kwargs == {'confidence_threshold': 0.5}
+        print("✅ Cached model returned without reloading")
+        
+        # 1000-byte models, 2500-byte budget: loading m3 evicts m2, never the active m1
+        assert manager.set_active_model("m1")
+        manager.get_recognizer("m2")
+        manager.get_recognizer("m3")
+        info = manager.get_cache_info()
+        assert info['models'] == ["m1", "m3"] and info['evictions'] == 1
+        print(f"✅ Memory budget enforced: cached {info['models']}, {info['memory_mb'] * 1024 * 1024:.0f} bytes")
+        
+        # Previously active model is the next likely one; a concurrent lookup waits for the preload
+        assert manager.set_active_model("m3")
+        assert manager.predict_next_model() == "m1"
+        assert manager.preload() is None  # already cached
+        manager.evict_model("m1")
+        thread = manager.preload()
+        preloaded = manager.get_recognizer("m1")
+        thread.join()
+        assert manager.loads["m1"] == 2 and manager.get_recognizer("m1") is preloaded
+        print("✅ Background preload of the next likely model, loaded once")
+    
+    # Switching is a reference swap on the running service
+    service = RecognitionService.__new__(RecognitionService)
+    service.use_teachable_machine = True
+    service.teachable_recognizer = first
+    service.trackers = {'camera': object()}
+    assert service.set_teachable_recognizer(preloaded)
+    assert service.teachable_recognizer is preloaded and service.trackers == {}
+    service.use_teachable_machine = False
+    assert not service.set_teachable_recognizer(first)
+    print("✅ RecognitionService swaps models in place, tracked identities reset")
+    
+    print("\n✅ Model cache tests passed")
+
+
+def test_model_registry():
+    """Test 6q: Cached model registry"""
+    print("\n" + "="*60)
+    print("TEST 6q: Model Registry")
+    print("="*60)
+    
+    import core.model_manager as model_manager_module
+    original_sha256 = model_manager_module._file_sha256
+    try:
+        import json
+        import tempfile
+        from core.model_manager import ModelManager
+        
+        hashed = []
+        model_manager_module._file_sha256 = lambda path: hashed.append(Path(path).name) or original_sha256(path)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for model_id in ("m1", "m2"):
+                (Path(tmp) / model_id).mkdir()
+                (Path(tmp) / model_id / "keras_model.h5").write_bytes(model_id.encode())
+                (Path(tmp) / model_id / "labels.txt").write_text("0 Alice\n1 Bob\n", encoding='utf-8')
+            
+            manager = ModelManager(models_dir=tmp, registry_check_interval=60)
+            scans = []
+            file_fingerprint = manager._file_fingerprint
+            manager._file_fingerprint = lambda: scans.append(1) or file_fingerprint()
+            
+            assert {m["id"] for m in manager.list_models()} == {"m1", "m2"}
+            assert manager.get_model("m1")["classes"] == ["Alice", "Bob"]
+            assert manager.get_active_model()["id"] in ("m1", "m2")
+            for _ in range(100):
+                manager.list_models()
+                manager.get_model("m2")
+            assert len(scans) == 1 and sorted(hashed) == ["keras_model.h5", "keras_model.h5", "labels.txt", "labels.txt"]
+            print("✅ One directory scan for 200+ lookups, files hashed once")
+            
+            saved = json.loads((Path(tmp) / "models_metadata.json").read_text(encoding='utf-8'))
+            assert all(m["classes"] and len(m["model_sha256"]) == 64 and m["labels_sha256"] for m in saved["models"])
+            print("✅ Class lists and file hashes stored in models_metadata.json")
+            
+            # Retrained labels: not seen until invalidated, then only that model is re-hashed
+            hashed.clear()
+            (Path(tmp) / "m2" / "labels.txt").write_text("0 Alice\n1 Bob\n2 Carol\n", encoding='utf-8')
+            assert manager.get_model("m2")["classes"] == ["Alice", "Bob"] and len(scans) == 1
+            manager.invalidate_registry()
+            assert manager.get_model("m2")["classes"] == ["Alice", "Bob", "Carol"]
+            assert sorted(hashed) == ["keras_model.h5", "labels.txt"] and len(scans) == 2
+            
+            # Default: model files re-checked once the interval has passed, stale recognizers dropped
+            polling = ModelManager(models_dir=tmp)
+            assert polling.registry_check_interval and polling.get_model("m1")["classes"] == ["Alice", "Bob"]
+            polling._recognizers[("m1", "keras", None)] = object()
+            polling._recognizer_sizes[("m1", "keras", None)] = 1
+            (Path(tmp) / "m1" / "labels.txt").write_text("0 Dave\n", encoding='utf-8')
+            polling._registry_checked -= polling.registry_check_interval
+            assert polling.get_model("m1")["classes"] == ["Dave"] and not polling.is_cached("m1")
+            
+            # Lookups return copies: callers cannot corrupt the registry
+            polling.list_models()[0]["classes"].append("Eve")
+            polling.get_model("m1")["classes"].clear()
+            assert polling.get_model("m1")["classes"] == ["Dave"]
+            assert sorted(len(m["classes"]) for m in polling.list_models()) == [1, 3]
+            
+            # A new manager reuses the stored metadata without hashing anything
+            hashed.clear()
+            assert ModelManager(models_dir=tmp).get_model("m2")["num_classes"] == 3 and hashed == []
+            
+            assert manager.delete_model("m1") and manager.get_model("m1") is None
+            print("✅ Registry follows retrained / new managers / deleted models")
+        
+        print("\n✅ Model registry tests passed")
+    finally:
+        model_manager_module._file_sha256 = original_sha256
+
+
 def test_attendance_system():
     """Test 7: Attendance system"""
     print("\n" + "="*60)
@@ -229,6 +1379,12 @@ def test_attendance_system():
         attendance = AttendanceSystem()
         print("✅ AttendanceSystem instantiated")
         
+        # No recognition engine until process_camera_attendance needs one
+        assert attendance._recognition is None
+        shared = object()
+        assert AttendanceSystem(recognition_service=shared).recognition is shared
+        print("✅ Recognition service injected / created lazily")
+        
         # Check log file
         if attendance.log_file.exists():
             print(f"✅ Log file exists: {attendance.log_file}")
@@ -364,19 +1520,39 @@ def main():
         ("Face Recognition", test_face_recognizer),
         ("Dataset Manager", test_dataset_manager),
         ("Recognition Service", test_recognition_service),
+        ("Gallery Matching", test_gallery_matching),
+        ("Face Index", test_face_index),
+        ("Encoding Store", test_encoding_store),
+        ("Incremental Encodings", test_incremental_encodings),
+        ("Full-Frame Face Mesh", test_frame_mesh),
+        ("Detection Downscaling", test_detection_downscale),
+        ("Frame Skip Tracking", test_frame_tracking),
+        ("Camera Broker", test_camera_broker),
+        ("Recognition Pipeline", test_recognition_pipeline),
+        ("Concurrent Recognition", test_concurrent_recognition),
+        ("Teachable Machine Batching", test_teachable_batching),
+        ("TFLite Backend", test_tflite_backend),
+        ("Quantized Variants", test_quantized_variants),
+        ("Lazy Imports", test_lazy_imports),
+        ("Model Cache", test_model_cache),
+        ("Model Registry", test_model_registry),
         ("Attendance System", test_attendance_system),
         ("GUI Modules", test_gui_modules),
         ("Integration Pipeline", test_integration_pipeline),
         ("Configuration", test_configuration),
     ]
     
+    # Tests either return True/False or raise (assertions); skipped tests count as None
     results = []
     for test_name, test_func in tests:
         try:
             passed = test_func()
-            results.append((test_name, passed))
+            results.append((test_name, passed is not False))
+        except pytest.skip.Exception as e:
+            print(f"\n⏭️  SKIPPED {test_name}: {e}")
+            results.append((test_name, None))
         except Exception as e:
-            print(f"\n❌ CRITICAL ERROR in {test_name}: {e}")
+            print(f"\n❌ CRITICAL ERROR in {test_name}: {e!r}")
             results.append((test_name, False))
     
     # Summary
@@ -387,14 +1563,15 @@ def main():
     print("="*80)
     
     passed_count = sum(1 for _, passed in results if passed)
-    total_count = len(results)
+    skipped_count = sum(1 for _, passed in results if passed is None)
+    total_count = len(results) - skipped_count
     
     for test_name, passed in results:
-        status = "✅ PASS" if passed else "❌ FAIL"
+        status = "⏭️  SKIP" if passed is None else "✅ PASS" if passed else "❌ FAIL"
         print(f"{status} - {test_name}")
     
     print("\n" + "="*80)
-    print(f" TOTAL: {passed_count}/{total_count} tests passed")
+    print(f" TOTAL: {passed_count}/{total_count} tests passed ({skipped_count} skipped)")
     print(f" TIME: {elapsed:.2f} seconds")
     print("="*80)
     